@@ -0,0 +1,135 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the syntax highlighter on a large script.
+
+Highlights a script of (by default) 10000 lines with the PyShow highlighter,
+and with the old highlighter that ran a separate regular expression for every
+keyword, for comparison. Also measures typing at the top of the script, which
+should only rehighlight the edited line. Runs without a display:
+
+    python Benchmarks/bench_highlighter.py [lines]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QRegularExpression
+from PyQt6.QtGui import (QGuiApplication, QTextDocument, QTextCharFormat,
+                         QSyntaxHighlighter, QTextCursor)
+from Core.PyShowLanguage import (PyShowEditorHighlighter, sectionList,
+                                 show_functions, template_functions,
+                                 resource_functions, actionList)
+
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    """The old highlighter, with one regular expression per rule."""
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.rules = []
+
+        keyword = QTextCharFormat()
+        for words in (sectionList, show_functions, template_functions,
+                      resource_functions, actionList):
+            for word in words:
+                self.rules.append((QRegularExpression("\\b" + word + "\\b"),
+                                   keyword))
+
+        self.rules.append((QRegularExpression("[0-9]"), keyword))
+        self.rules.append((QRegularExpression(r"(\"|').*?((?<!\\)(\1))"),
+                           keyword))
+        self.rules.append((QRegularExpression("((?<!('|\"))#)[^\n]*"),
+                           keyword))
+
+    def highlightBlock(self, text):
+        """Apply every rule to the text separately."""
+        for pattern, fmt in self.rules:
+            iterator = pattern.globalMatch(text)
+            while iterator.hasNext():
+                match = iterator.next()
+                self.setFormat(match.capturedStart(),
+                               match.capturedLength(),
+                               fmt)
+
+
+def script(lines):
+    """Return a script with the given number of lines."""
+    example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'Examples', 'Basic.script')
+    with open(example) as file:
+        source = file.read().splitlines()
+
+    return "\n".join(source[i % len(source)] for i in range(lines))
+
+
+def measure(highlighter_class, text):
+    """Return the time in seconds to highlight the whole text once."""
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document)
+
+    start = time.perf_counter()
+    highlighter.rehighlight()
+    return time.perf_counter() - start
+
+
+def measure_typing(highlighter_class, text, characters=100):
+    """Return the average time in seconds to type at the top of the text."""
+    document = QTextDocument()
+    document.setPlainText(text)
+    highlighter = highlighter_class(document)
+    highlighter.rehighlight()
+
+    cursor = QTextCursor(document)
+    cursor.movePosition(QTextCursor.MoveOperation.Start)
+    cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
+
+    start = time.perf_counter()
+    for _ in range(characters):
+        cursor.insertText("x")
+    return (time.perf_counter() - start)/characters
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    app = QGuiApplication(sys.argv)
+    text = script(lines)
+
+    new = measure(PyShowEditorHighlighter, text)
+    old = measure(LegacyHighlighter, text)
+
+    print("Highlighting %d lines" % lines)
+    print("  single pass:     %8.1f ms" % (new*1000))
+    print("  regex per rule:  %8.1f ms" % (old*1000))
+    print("  speedup:         %8.1fx" % (old/new))
+
+    new = measure_typing(PyShowEditorHighlighter, text)
+    old = measure_typing(LegacyHighlighter, text)
+
+    print("Typing at the top, per keystroke")
+    print("  single pass:     %8.3f ms" % (new*1000))
+    print("  regex per rule:  %8.3f ms" % (old*1000))
+
+
+if __name__ == '__main__':
+    main()
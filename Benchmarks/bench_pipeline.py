@@ -0,0 +1,223 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the whole path from script to slides.
+
+For a number of synthetic decks (see synthetic_deck.py), measures parsing,
+mapping the cursor to a frame, evaluating all frames, drawing a single frame,
+drawing all frames one after the other (only drawing what changed from the
+frame before) and exporting the whole deck as PNG images. Locating is timed
+for a fixed number of positions spread over the script, evaluating for all
+frames together. The results can be written to a JSON file, and compared
+with the results of an earlier run. Runs without a display:
+
+    python Benchmarks/bench_pipeline.py [--preset NAME] [--repeat N]
+                                        [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PyQt6.QtCore import QT_VERSION_STR
+from PyQt6.QtGui import QGuiApplication, QImage, QColor
+from Core.PyShowLanguage import ENGINE_VERSION, grammar, parse_script
+from Core.PyShowEvaluator import frames, locate, evaluate
+from Core.PyShowRenderer import render, image_to_png
+from Core.PyShowDiff import render_frames
+from Core.PyShowResources import resources
+from Core.PyShowDiagnostics import PyShowDiagnostics
+from synthetic_deck import deck, PRESETS
+
+# Number of cursor positions mapped to a frame in the locate benchmark
+LOCATE_POSITIONS = 10000
+
+# Size of the images of the resources, about that of a photo on a slide
+IMAGE_SIZE = (1200, 900)
+
+
+def measure(function, repeat):
+    """Return the timings of running a function repeatedly, in ms."""
+    durations = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start)*1000)
+
+    return {"min": min(durations),
+            "median": statistics.median(durations),
+            "repeat": repeat}
+
+
+def write_images(directory, count):
+    """Write the images used by the resources of a synthetic deck."""
+    os.makedirs(os.path.join(directory, 'images'), exist_ok=True)
+
+    for number in range(count):
+        image = QImage(IMAGE_SIZE[0], IMAGE_SIZE[1],
+                       QImage.Format.Format_RGB32)
+        image.fill(QColor.fromHsv(number*37 % 360, 160, 220))
+        image.save(os.path.join(directory, 'images', '%d.png' % number))
+
+
+def run_preset(sizes, repeat, directory):
+    """Return the measurements for a deck of the given sizes."""
+    # Only the images shown on a slide are written
+    write_images(directory, min(sizes["resources"], sizes["slides"]))
+    resources.directory = directory
+    resources.clear()
+
+    text = deck(**sizes)
+    expression = grammar()
+    show = parse_script(text, expression)
+    cursors = frames(show)
+
+    # Problems are collected separately, so they don't pile up in the
+    # collector of the application
+    diagnostics = PyShowDiagnostics()
+
+    step = max(len(text)//LOCATE_POSITIONS, 1)
+    positions = range(0, len(text), step)
+
+    states = [evaluate(show, cursor, diagnostics) for cursor in cursors]
+
+    # The frame with the most objects is the most expensive to draw
+    largest = max(states, key=lambda state: len(state["objects"]))
+
+    def steps():
+        for image in render_frames(states):
+            pass
+
+    def export():
+        # Exporting starts without decoded images, so it includes decoding
+        # every image once
+        resources.clear()
+        for image in render_frames(evaluate(show, cursor, diagnostics)
+                                   for cursor in cursors):
+            image_to_png(image)
+
+    results = {
+        "parse": measure(lambda: parse_script(text, expression), repeat),
+        "locate": measure(lambda: [locate(show, position)
+                                   for position in positions], repeat),
+        "evaluate": measure(lambda: [evaluate(show, cursor, diagnostics)
+                                     for cursor in cursors], repeat),
+        "render": measure(lambda: render(largest), repeat),
+        "steps": measure(steps, repeat),
+        # Exporting the whole deck takes long, so it runs only once
+        "export": measure(export, 1),
+    }
+
+    return {"sizes": sizes,
+            "lines": text.count("\n"),
+            "frames": len(cursors),
+            "positions": len(positions),
+            "diagnostics": len(diagnostics.entries()),
+            "results": results}
+
+
+def commit():
+    """Return the current git commit, if known."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=ROOT,
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print the change of every median compared with an earlier run."""
+    print("Compared with %s:" % (baseline.get("commit") or "baseline"))
+
+    for name, preset in report["presets"].items():
+        old = baseline["presets"].get(name)
+        if old is None:
+            continue
+
+        for step, timing in preset["results"].items():
+            if step not in old["results"]:
+                continue
+
+            before = old["results"][step]["median"]
+            after = timing["median"]
+            print("  %-10s %-9s %10.2f -> %10.2f ms  (%+6.1f%%)"
+                  % (name, step, before, after,
+                     (after - before)/before*100 if before else 0.0))
+
+
+def arguments():
+    """Return the command line arguments."""
+    parser = argparse.ArgumentParser(description="PyShow pipeline benchmark")
+    parser.add_argument('--preset', action='append', choices=PRESETS,
+                        help="deck to measure (default: all)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of runs of every measurement")
+    parser.add_argument('--output', help="write the results to a JSON file")
+    parser.add_argument('--compare', help="compare with an earlier JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = arguments()
+    app = QGuiApplication(sys.argv)
+
+    report = {"commit": commit(),
+              "engine": ENGINE_VERSION,
+              "python": platform.python_version(),
+              "qt": QT_VERSION_STR,
+              "platform": platform.platform(),
+              "presets": {}}
+
+    directory = tempfile.mkdtemp(prefix='pyshow-bench-')
+
+    for name in args.preset or PRESETS:
+        result = run_preset(PRESETS[name], args.repeat, directory)
+        report["presets"][name] = result
+
+        print("%s: %d lines, %d frames" % (name,
+                                          result["lines"],
+                                          result["frames"]))
+        for step, timing in result["results"].items():
+            print("  %-9s %10.2f ms (min %.2f)" % (step,
+                                                  timing["median"],
+                                                  timing["min"]))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Generator of synthetic PyShow scripts for benchmarks.
+
+The decks are made of a number of templates, a number of slides with a
+number of pauses each, bullet lists of a given length and a number of
+image resources, one of which is shown on every slide. Every combination is
+a valid script, so all of it can be parsed, evaluated and drawn, once the
+images exist (see write_images in bench_pipeline.py). To write a deck to a
+file:
+
+    python Benchmarks/synthetic_deck.py [templates] [slides] [pauses]
+                                        [bullets] [resources] > deck.script
+"""
+
+import sys
+
+COLORS = ['#500', '#050', '#005', '#FFF', '#333']
+FONTS = ['Arial', 'Times New Roman', 'Calibri']
+
+# Deck sizes used by the benchmarks
+PRESETS = {"small": dict(templates=2, slides=10, pauses=2,
+                         bullets=3, resources=0),
+           "templates": dict(templates=100, slides=200, pauses=1,
+                             bullets=3, resources=0),
+           "slides": dict(templates=5, slides=150, pauses=3,
+                          bullets=3, resources=0),
+           "bullets": dict(templates=2, slides=20, pauses=2,
+                           bullets=40, resources=0),
+           "resources": dict(templates=2, slides=50, pauses=1,
+                             bullets=3, resources=500)}
+
+
+def template(number, bullets, resources):
+    """Return the script of a template."""
+    items = ", ".join('"Point %d"' % i for i in range(bullets))
+
+    picture = ""
+    if resources:
+        picture = ("\taddImage('Picture', source='image0',\n"
+                   "\t\t\t x=1500, y=50, width=300)\n")
+
+    return ("beginTemplate('Template%d')\n"
+            "{\n"
+            "\tsetBackgroundColor('%s')\n"
+            "\taddTextBox('Title',\n"
+            "\t\t\t   text='Template %d',\n"
+            "\t\t\t   x=60, y=30, width=1500,\n"
+            "\t\t\t   fontname='%s', fontsize=90,\n"
+            "\t\t\t   decoration='b', alignment='left', color='#FFF')\n"
+            "\taddTextBox('Body',\n"
+            "\t\t\t   text='',\n"
+            "\t\t\t   x=60, y=200, width=1700, height=200,\n"
+            "\t\t\t   fontname='%s', fontsize=40, color='#EEE')\n"
+            "\taddBulletList('Points',\n"
+            "\t\t\t\t  text=[%s],\n"
+            "\t\t\t\t  x=200, y=400, width=1500, height=600,\n"
+            "\t\t\t\t  fontname='%s', fontsize=40, color='#FFF')\n"
+            "%s"
+            "}\n\n"
+            % (number,
+               COLORS[number % len(COLORS)],
+               number,
+               FONTS[number % len(FONTS)],
+               FONTS[(number+1) % len(FONTS)],
+               items,
+               FONTS[number % len(FONTS)],
+               picture))
+
+
+def slide(number, templates, pauses, bullets, resources):
+    """Return the commands of a slide, with its pauses."""
+    lines = ["\tnewSlide('Template%d')" % (number % templates),
+             "\tsetTextBox('Title', text='Slide %d')" % number]
+
+    if resources:
+        lines.append("\tsetImage('Picture', source='image%d')"
+                     % (number % resources))
+
+    for step in range(pauses):
+        # Every step shows a longer part of the list, like a build-up slide
+        shown = bullets*(step+1)//pauses
+        items = ", ".join('"Slide %d, point %d"' % (number, i)
+                          for i in range(shown))
+
+        lines.append("\tsetTextBox('Body', text='Step %d of slide %d')"
+                     % (step, number))
+        lines.append("\tsetBulletList('Points', text=[%s])" % items)
+        lines.append("\tpause()")
+
+    return "\n".join(lines) + "\n"
+
+
+def deck(templates=2, slides=10, pauses=2, bullets=3, resources=0):
+    """Return a synthetic script with the given size."""
+    parts = [template(number, bullets, resources)
+             for number in range(templates)]
+
+    if resources:
+        parts.append("resources()\n{\n")
+        parts.extend("\timage('image%d', 'images/%d.png')\n" % (i, i)
+                     for i in range(resources))
+        parts.append("}\n\n")
+
+    parts.append("beginShow()\n{\n")
+    parts.extend(slide(number, templates, pauses, bullets, resources)
+                 for number in range(slides))
+    parts.append("}\n")
+
+    return "".join(parts)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]]
+    sys.stdout.write(deck(*sizes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Classes to animate the change from one frame to the next.
+
+An animation never lays out text while it runs. Fades and pushes move the
+two rendered frames. Tweens first render everything that stays the same
+into one image, and every object that changes into an image of its own (a
+layer), and then only move and blend those images. Layers are cached, so
+going back and forth between frames doesn't render them again.
+"""
+
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import QPointF, QRectF, Qt
+from PyQt6.QtGui import QImage, QPainter
+from Core.PyShowRenderer import render, draw_object, freeze, SLIDE_SIZE
+from Core.PyShowDiff import diff
+
+# Layers are drawn from a bit above and left of the object, to the bottom
+# right of the slide, as text and bullets can be drawn outside the object
+LAYER_MARGIN = 20
+
+# At most this many layers are cached
+MAX_LAYERS = 32
+
+
+def ease(progress):
+    """Return the eased progress, starting and ending slowly."""
+    return progress*progress*(3 - 2*progress)
+
+
+def moved_only(before, after):
+    """Return whether an object only changed its position."""
+    return ({key: value for key, value in before.items() if key not in ("x", "y")} ==
+            {key: value for key, value in after.items() if key not in ("x", "y")})
+
+
+class PyShowLayerCache:
+    """Images of single objects on a transparent background."""
+
+    def __init__(self, size=MAX_LAYERS):
+        self._size = size
+        self._layers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def layer(self, entry, scale):
+        """Return the layer of an object, and its offset to the object."""
+        key = (freeze(entry), scale)
+
+        with self._lock:
+            if key in self._layers:
+                self._layers.move_to_end(key)
+                return self._layers[key]
+
+        margin = LAYER_MARGIN + entry.get("bullet_spacing", 0)
+        left = entry["x"] - margin
+        top = entry["y"] - LAYER_MARGIN
+
+        image = QImage(max(int((SLIDE_SIZE[0] - left)*scale), 1),
+                       max(int((SLIDE_SIZE[1] - top)*scale), 1),
+                       QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter()
+        painter.begin(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        painter.scale(scale, scale)
+        painter.translate(-left, -top)
+        draw_object(painter, entry)
+        painter.end()
+
+        layer = (image, QPointF(margin, LAYER_MARGIN))
+
+        with self._lock:
+            self._layers[key] = layer
+            if len(self._layers) > self._size:
+                self._layers.popitem(last=False)
+
+        return layer
+
+
+# The layers used by all animations
+layers = PyShowLayerCache()
+
+
+class PyShowTransition:
+    """The change from one frame to the next, drawn at any moment of it."""
+
+    def __init__(self, before, after, images, scale):
+        self.type = after["transition"]["type"]
+        self.duration = after["transition"]["duration"]/1000
+
+        self._before, self._after = images
+        self._scale = scale
+
+        if self.type == "tween":
+            self.prepare_tween(before, after)
+
+    def prepare_tween(self, before, after):
+        """Render the parts that stay the same, and the changing layers."""
+        old = before["objects"]
+        new = after["objects"]
+
+        # Objects exactly the same in both frames are not animated. They
+        # are drawn below the animated ones
+        changed = diff(before, after).changed
+        same = [name for name in new if name not in changed]
+
+        def still(state):
+            objects = OrderedDict((name, state["objects"][name])
+                                  for name in same)
+            return {"background_color": state["background_color"],
+                    "objects": objects}
+
+        self._still_before = render(still(before), self._scale)
+        if before["background_color"] == after["background_color"]:
+            self._still_after = self._still_before
+        else:
+            self._still_after = render(still(after), self._scale)
+
+        # Every changing object moves from its old to its new place. If
+        # anything else changed as well, the old look fades into the new
+        self._moving = []
+        for name, entry in new.items():
+            if name in same:
+                continue
+
+            previous = old.get(name)
+            if previous is None:
+                self._moving.append((entry, entry, None,
+                                     layers.layer(entry, self._scale)))
+            elif moved_only(previous, entry):
+                self._moving.append((previous, entry, None,
+                                     layers.layer(entry, self._scale)))
+            else:
+                self._moving.append((previous, entry,
+                                     layers.layer(previous, self._scale),
+                                     layers.layer(entry, self._scale)))
+
+        for name, entry in old.items():
+            if name not in new:
+                self._moving.append((entry, entry,
+                                     layers.layer(entry, self._scale), None))
+
+    def paint(self, painter, rect, progress):
+        """Draw the transition at a progress between 0 and 1 in rect."""
+        progress = ease(min(max(progress, 0.0), 1.0))
+        rect = QRectF(rect)
+
+        painter.save()
+        painter.setClipRect(rect)
+
+        if self.type == "fade":
+            painter.drawImage(rect, self._before)
+            painter.setOpacity(progress)
+            painter.drawImage(rect, self._after)
+        elif self.type == "push":
+            offset = rect.width()*progress
+            painter.drawImage(rect.translated(-offset, 0), self._before)
+            painter.drawImage(rect.translated(rect.width() - offset, 0),
+                              self._after)
+        else:
+            self.paint_tween(painter, rect, progress)
+
+        painter.restore()
+
+    def paint_tween(self, painter, rect, progress):
+        """Draw the still parts and move and blend the layers."""
+        painter.drawImage(rect, self._still_before)
+        if self._still_after is not self._still_before:
+            painter.setOpacity(progress)
+            painter.drawImage(rect, self._still_after)
+
+        # Size on the screen of a pixel in the images, and of the slide
+        ratio = rect.width()/max(self._before.width(), 1)
+        scale = self._scale*ratio
+
+        for old, new, old_layer, new_layer in self._moving:
+            x = old["x"] + (new["x"] - old["x"])*progress
+            y = old["y"] + (new["y"] - old["y"])*progress
+
+            # A new object fades in, a removed one fades out, and a changed
+            # one fades from the old look to the new
+            if old_layer is None:
+                fades = ((new_layer, progress if old is new else 1.0),)
+            elif new_layer is None:
+                fades = ((old_layer, 1 - progress),)
+            else:
+                fades = ((old_layer, 1 - progress), (new_layer, progress))
+
+            for (image, offset), opacity in fades:
+                painter.setOpacity(opacity)
+                painter.drawImage(QRectF(rect.x() + (x - offset.x())*scale,
+                                         rect.y() + (y - offset.y())*scale,
+                                         image.width()*ratio,
+                                         image.height()*ratio),
+                                  image)
+
+        painter.setOpacity(1.0)
@@ -0,0 +1,230 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class for saving a copy of the project in the background.
+
+The text of the editor is copied on the GUI thread, but compressing and
+writing the file happens in a worker thread, so the interface never has to
+wait for the disk. The same thread adds the cache to a saved project.
+Project files are always written to a temporary file that is renamed over
+the original afterwards, so a crash halfway through a save never leaves a
+broken file behind.
+"""
+
+import glob
+import io
+import os
+import tempfile
+import threading
+from zipfile import ZipFile, BadZipFile, ZIP_DEFLATED
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Time in ms between a change in the editor and the autosave. Changes made
+# while the timer is running do not restart it, so at most one autosave is
+# written per interval, no matter how fast the user types.
+AUTOSAVE_INTERVAL = 30000
+
+# Autosaves of untitled projects are named after the process writing them,
+# so two running instances of PyShow don't overwrite each other's work
+UNTITLED_AUTOSAVE = 'pyshow-untitled-%d.psp.autosave'
+
+
+def write_project(filename, files):
+    """Atomically write a project file containing the given files."""
+    # The files are a dict, or pairs of name and data made while writing,
+    # so large files don't all have to be in memory at once
+    if isinstance(files, dict):
+        files = files.items()
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    handle, tmpname = tempfile.mkstemp(prefix='.pyshow-',
+                                       suffix='.tmp',
+                                       dir=directory)
+
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            with ZipFile(file, 'w', ZIP_DEFLATED) as zip:
+                for name, data in files:
+                    zip.writestr(name, data)
+
+            # Make sure everything is on disk before the rename
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(tmpname, filename)
+    except BaseException:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+
+def autosave_name(filename):
+    """Return the name of the autosave file belonging to a project file."""
+    if filename:
+        return filename + '.autosave'
+
+    return os.path.join(tempfile.gettempdir(), UNTITLED_AUTOSAVE % os.getpid())
+
+
+def running(pid):
+    """Return whether a process with the given id is still running."""
+    if os.name == 'nt':
+        import ctypes
+        # Signals don't exist on Windows, so ask for a handle instead
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def untitled_autosaves():
+    """Return autosaves of untitled projects left behind, the newest first."""
+    autosaves = []
+
+    for filename in glob.glob(os.path.join(tempfile.gettempdir(),
+                                           UNTITLED_AUTOSAVE.replace('%d', '*'))):
+        try:
+            pid = int(os.path.basename(filename).split('-')[2].split('.')[0])
+        except (IndexError, ValueError):
+            continue
+
+        # Autosaves of running instances are still in use
+        if pid != os.getpid() and not running(pid):
+            autosaves.append(filename)
+
+    return sorted(autosaves, key=os.path.getmtime, reverse=True)
+
+
+def read_autosave(filename):
+    """Return the script text in an autosave file, or None if unreadable."""
+    try:
+        with ZipFile(filename, 'r') as zip:
+            with io.TextIOWrapper(zip.open('main.script'), encoding='utf-8') as script:
+                return script.read()
+    except (OSError, KeyError, BadZipFile, UnicodeDecodeError):
+        return None
+
+
+class PyShowAutosave(QObject):
+    """Saves a copy of the project periodically, without blocking the GUI."""
+
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, project):
+        super().__init__()
+
+        self._project = project
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(AUTOSAVE_INTERVAL)
+        self._timer.timeout.connect(self.run)
+
+        # The worker only keeps the newest snapshot per file. A newer one
+        # replaces an older one, so a slow disk just means fewer (but never
+        # stale) writes. Every job has the files to write, or a function
+        # making them, and whether it is an autosave
+        self._jobs = {}
+        self._writing = None
+        self._condition = threading.Condition()
+
+        self._worker = threading.Thread(target=self._work,
+                                        name='PyShowAutosave',
+                                        daemon=True)
+        self._worker.start()
+
+    def schedule(self):
+        """Arm the autosave timer, if it is not running already."""
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def run(self):
+        """Snapshot the editor text and hand it to the worker thread."""
+        if not self._project.opened or not self._project.changed():
+            return
+
+        text = self._project.text()
+        filename = autosave_name(self._project.filename())
+
+        with self._condition:
+            self._jobs[filename] = ({'main.script': text}, True)
+            self._condition.notify_all()
+
+    def write_later(self, filename, files):
+        """Write a project file in the worker thread, made by a function."""
+        with self._condition:
+            self._jobs[filename] = (files, False)
+            self._condition.notify_all()
+
+    def wait(self, filename):
+        """Cancel a pending write of a file, and wait for a running one."""
+        with self._condition:
+            self._jobs.pop(filename, None)
+
+            # A write that is already running has to finish first, or it
+            # would overwrite anything written to the file meanwhile
+            while self._writing == filename:
+                self._condition.wait()
+
+    def discard(self, filename):
+        """Stop any pending autosave and remove the autosave file."""
+        self._timer.stop()
+        filename = autosave_name(filename)
+        self.wait(filename)
+
+        if os.path.exists(filename):
+            try:
+                os.remove(filename)
+            except OSError as error:
+                self.failed.emit(str(error))
+
+    def _work(self):
+        """Write autosave files, one at a time. Runs in the worker thread."""
+        while True:
+            with self._condition:
+                while not self._jobs:
+                    self._condition.wait()
+
+                filename, (files, autosave) = self._jobs.popitem()
+                self._writing = filename
+
+            try:
+                if callable(files):
+                    files = files()
+
+                if files:
+                    write_project(filename, files)
+                    if autosave:
+                        self.saved.emit(filename)
+            except OSError as error:
+                self.failed.emit(str(error))
+            finally:
+                with self._condition:
+                    self._writing = None
+                    self._condition.notify_all()
@@ -0,0 +1,175 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions and class for standalone presentation bundles.
+
+A bundle is a single file with everything needed to present a show: the
+compiled script, the timeline, all images and, optionally, every frame
+rendered in advance. Images are stored decoded, in the format used for
+drawing, and only once, even when several files or resource names have
+the same content. Opening a bundle needs neither the script parser nor
+the editor, and images are only read when a slide needs them.
+"""
+
+import hashlib
+import json
+import os
+from zipfile import ZipFile
+from PyQt6.QtGui import QImage
+from Core.PyShowLanguage import ENGINE_VERSION, dump_compiled, load_compiled
+from Core.PyShowEvaluator import evaluate, resources as show_resources
+from Core.PyShowTimeline import PyShowTimeline
+from Core.PyShowRenderer import image_to_png, png_to_image, SLIDE_SIZE
+from Core.PyShowDiff import render_frames
+from Core.PyShowResources import resources
+from Core.PyShowAutosave import write_project
+from Core.PyShowDiagnostics import diagnostics
+
+# Version of the bundle format. Bundles are also only valid for the engine
+# version they were made with
+BUNDLE_VERSION = 1
+
+
+def bundle_files(text, show, title, scale):
+    """Return the names and data of all files in a bundle."""
+    timeline = PyShowTimeline()
+    timeline.update(text, show)
+
+    states = [evaluate(show, entry.cursor) for entry in timeline]
+
+    # Images can also be drawn from a file directly, without a resource, so
+    # the files of all image objects on the frames are stored as well
+    filenames = set(show_resources(show).values())
+    filenames.update(entry["file"]
+                     for state in states if state is not None
+                     for entry in state["objects"].values()
+                     if entry["type"] == "image" and entry.get("file"))
+
+    # Every image file is stored once, by the hash of its contents, and
+    # decoded in the format it is drawn in
+    images = {}
+    stored = {}
+    for filename in sorted(filenames):
+        try:
+            with open(os.path.join(resources.directory, filename), 'rb') as file:
+                data = file.read()
+        except OSError:
+            diagnostics.warning("image '%s' not found" % (filename))
+            continue
+
+        key = hashlib.sha1(data).hexdigest()
+
+        if key not in stored:
+            image = QImage.fromData(data)
+            if image.isNull():
+                diagnostics.warning("image '%s' can not be read" % (filename))
+                continue
+
+            image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+            stored[key] = {"data": "images/%s.raw" % (key),
+                           "width": image.width(),
+                           "height": image.height(),
+                           "stride": image.bytesPerLine()}
+
+            yield stored[key]["data"], image.constBits().asstring(image.sizeInBytes())
+
+        images[filename] = stored[key]
+
+    manifest = {"bundle": BUNDLE_VERSION,
+                "engine": ENGINE_VERSION,
+                "title": title,
+                "timeline": [[entry.number, entry.cursor, entry.loc, entry.title]
+                             for entry in timeline],
+                "images": images,
+                "frames": None}
+
+    # Frames are rendered one at a time, drawing only what changed since
+    # the frame before
+    if scale:
+        for number, image in enumerate(render_frames(states, scale)):
+            yield 'frames/%04d.png' % (number), image_to_png(image)
+
+        manifest["frames"] = {"width": int(SLIDE_SIZE[0]*scale),
+                              "height": int(SLIDE_SIZE[1]*scale)}
+
+    yield 'show.json', json.dumps(dump_compiled(show))
+    yield 'manifest.json', json.dumps(manifest)
+
+
+def build_bundle(filename, text, show, title='', scale=None):
+    """Write a bundle of a show, with frames rendered at a scale if given."""
+    write_project(filename, bundle_files(text, show, title, scale))
+
+
+class PyShowBundle:
+    """An opened bundle, ready to be presented."""
+
+    def __init__(self, filename):
+        self._zip = ZipFile(filename, 'r')
+
+        try:
+            manifest = json.loads(self._zip.read('manifest.json'))
+        except (KeyError, ValueError):
+            self._zip.close()
+            raise ValueError("'%s' is not a PyShow bundle" % (filename))
+
+        if (manifest.get("bundle") != BUNDLE_VERSION or
+                manifest.get("engine") != ENGINE_VERSION):
+            self._zip.close()
+            raise ValueError("'%s' was made by another version of PyShow"
+                             % (filename))
+
+        self.title = manifest["title"]
+        self.show = load_compiled(json.loads(self._zip.read('show.json')))
+
+        self.timeline = PyShowTimeline()
+        self.timeline.restore(manifest["timeline"])
+
+        self._frames = manifest["frames"]
+
+        # Images are read from the bundle when a slide first needs them
+        for name, entry in manifest["images"].items():
+            resources.provide(name, self.loader(entry))
+
+    def loader(self, entry):
+        """Return a function that reads an image from the bundle."""
+        def load():
+            data = self._zip.read(entry["data"])
+
+            # The image only refers to the data, so it is copied to own it
+            return QImage(data,
+                          entry["width"],
+                          entry["height"],
+                          entry["stride"],
+                          QImage.Format.Format_ARGB32_Premultiplied).copy()
+
+        return load
+
+    def frame(self, index, width):
+        """Return a frame rendered in advance at this width, or None."""
+        if self._frames is None or self._frames["width"] != width:
+            return None
+
+        try:
+            return png_to_image(self._zip.read('frames/%04d.png' % (index)))
+        except KeyError:
+            return None
+
+    def close(self):
+        """Close the bundle file."""
+        self._zip.close()
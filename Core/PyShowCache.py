@@ -0,0 +1,154 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions for the compiled artifacts cached inside a project file.
+
+When a project is saved, the compiled form of the script and small
+thumbnails of the frames are stored next to the script. Both are keyed by
+the hash of the script and the engine version, so opening the project can
+use them right away, while the script is checked again in the background.
+"""
+
+import json
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from Core.PyShowLanguage import (ENGINE_VERSION, script_hash, grammar,
+                                 parse_script, dump_compiled, load_compiled,
+                                 modules)
+from Core.PyShowEvaluator import frames, evaluate
+from Core.PyShowRenderer import image_to_png, png_to_image
+from Core.PyShowDiff import render_frames
+
+# Scale of the thumbnails compared to the slide size
+THUMBNAIL_SCALE = 0.1
+
+# At most this many thumbnails are stored, to keep saving fast
+MAX_THUMBNAILS = 100
+
+# The grammar is made once, on first use, as making it is not cheap. The
+# autosave worker and the validator can parse at the same time, so they
+# take turns using it
+_expression = None
+_expression_lock = threading.Lock()
+
+
+def parse(text, directory=None):
+    """Parse a script outside of the GUI thread, with the shared grammar."""
+    global _expression
+
+    with _expression_lock:
+        if _expression is None:
+            _expression = grammar()
+
+        return parse_script(text, _expression, directory)
+
+
+def build_cache(text, show):
+    """Return the cache files to store in a project with the given script."""
+    if show is None:
+        return {}
+
+    cursors = frames(show)[:MAX_THUMBNAILS]
+
+    # Consecutive frames are drawn by only drawing what changed
+    states = (evaluate(show, cursor) for cursor in cursors)
+
+    files = {}
+    for number, image in enumerate(render_frames(states, THUMBNAIL_SCALE)):
+        files['cache/thumbnails/%04d.png' % number] = image_to_png(image)
+
+    manifest = {"engine": ENGINE_VERSION,
+                "script": script_hash(text),
+                "frames": cursors}
+
+    files['cache/compiled.json'] = json.dumps(dump_compiled(show))
+    files['cache/manifest.json'] = json.dumps(manifest)
+
+    return files
+
+
+def project_files(text, directory):
+    """Return all files of a project with its cache, None if it has errors."""
+    from pyparsing import ParseException
+
+    try:
+        show = parse(text, directory)
+    except ParseException:
+        return None
+
+    files = build_cache(text, show)
+    files['main.script'] = text
+
+    return files
+
+
+def read_cache(zip, text):
+    """Return the cached show and thumbnails from a project, if valid."""
+    try:
+        manifest = json.loads(zip.read('cache/manifest.json'))
+    except (KeyError, ValueError):
+        return None
+
+    if (manifest.get("engine") != ENGINE_VERSION or
+            manifest.get("script") != script_hash(text)):
+        return None
+
+    try:
+        show = load_compiled(json.loads(zip.read('cache/compiled.json')))
+    except (KeyError, ValueError, TypeError):
+        return None
+
+    # The show is also out of date when an included file changed
+    if not modules.current(show):
+        return None
+
+    # Thumbnails are decoded lazily by whoever needs them
+    thumbnails = []
+    for number in range(len(manifest.get("frames", []))):
+        try:
+            thumbnails.append(zip.read('cache/thumbnails/%04d.png' % number))
+        except KeyError:
+            break
+
+    return show, thumbnails
+
+
+def thumbnail(data):
+    """Decode a thumbnail from the cache."""
+    return png_to_image(data)
+
+
+class PyShowCacheValidator(QObject):
+    """Checks a cached show against the script in a worker thread."""
+
+    invalid = pyqtSignal(str)
+
+    def validate(self, text, show):
+        """Parse the text again and compare it with the cached show."""
+        key = script_hash(text)
+
+        def work():
+            try:
+                valid = parse(text) == show
+            except Exception:
+                valid = False
+
+            if not valid:
+                self.invalid.emit(key)
+
+        threading.Thread(target=work, daemon=True).start()
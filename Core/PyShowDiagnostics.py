@@ -0,0 +1,106 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class for collecting warnings and errors about a script.
+
+Instead of printing, the parser, evaluator and interface report problems to
+a collector. Every problem has a location in the script text, so it can be
+shown at the right line. The collector only keeps the latest problems, and
+the same problem reported again (for example every time a frame is drawn)
+only increases its count, so reporting is cheap enough for the paint path.
+"""
+
+import threading
+from collections import namedtuple, OrderedDict
+
+# Levels of a diagnostic
+ERROR = "error"
+WARNING = "warning"
+
+# Sources of a diagnostic: the script itself, or the application
+SCRIPT = "script"
+APPLICATION = "application"
+
+# At most this many different diagnostics are kept
+MAX_DIAGNOSTICS = 500
+
+# A single problem. The location is the character position in the script
+# text, or None if the problem is not about a specific place in the script
+PyShowDiagnostic = namedtuple('PyShowDiagnostic',
+                              'level source message loc count')
+
+
+def line_of(text, loc):
+    """Return the line number (starting at 1) of a position in the text."""
+    return text.count("\n", 0, loc) + 1
+
+
+class PyShowDiagnostics:
+    """A bounded collection of diagnostics, without duplicates."""
+
+    def __init__(self, size=MAX_DIAGNOSTICS):
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Increased on every change, so a view only has to update when this
+        # number is different from the last time it looked
+        self.revision = 0
+
+    def report(self, level, message, loc=None, source=SCRIPT):
+        """Add a diagnostic, or count it again if it is already there."""
+        key = (level, source, message, loc)
+
+        with self._lock:
+            count = self._entries.pop(key, 0) + 1
+            self._entries[key] = count
+
+            # The oldest diagnostics are dropped first
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+            self.revision += 1
+
+    def error(self, message, loc=None, source=SCRIPT):
+        """Report an error."""
+        self.report(ERROR, message, loc, source)
+
+    def warning(self, message, loc=None, source=SCRIPT):
+        """Report a warning."""
+        self.report(WARNING, message, loc, source)
+
+    def entries(self):
+        """Return all diagnostics, the oldest first."""
+        with self._lock:
+            return [PyShowDiagnostic(*key, count)
+                    for key, count in self._entries.items()]
+
+    def clear(self, source=None):
+        """Remove all diagnostics, or only those from the given source."""
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[1] == source]:
+                    del self._entries[key]
+
+            self.revision += 1
+
+
+# The collector used by the application, unless another one is given
+diagnostics = PyShowDiagnostics()
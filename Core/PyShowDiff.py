@@ -0,0 +1,222 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions to find what changed between two evaluated states.
+
+Consecutive frames of a slide usually differ in a single object. The diff
+of two states lists the objects that changed, and the parts of the slide
+(the damage) that look different because of it. An image of the first
+frame only needs the damage drawn again to become an image of the second.
+"""
+
+import threading
+from collections import namedtuple, OrderedDict
+from PyQt6.QtCore import QRect, QRectF, Qt
+from PyQt6.QtGui import QColor, QPainter
+from Core.PyShowRenderer import (render, draw_object, bounds, layout, freeze,
+                                 SLIDE_SIZE)
+
+# The changed objects by name, and the damaged rectangles in slide
+# coordinates. Without damage, both states look the same
+PyShowDiff = namedtuple('PyShowDiff', 'changed damage')
+
+# Damage is made a bit larger, for antialiasing and glyphs that reach
+# outside of their bounding box, like italics
+DAMAGE_MARGIN = 8
+
+# If more than this part of the slide is damaged, drawing all of it again
+# is just as fast
+MAX_DAMAGE = 0.5
+
+# The bounds of at most this many objects are remembered
+MAX_BOUNDS = 2048
+
+_bounds = OrderedDict()
+_bounds_lock = threading.Lock()
+
+
+def object_bounds(entry):
+    """Return the damage an object makes when it appears or disappears."""
+    key = freeze(entry)
+
+    with _bounds_lock:
+        if key in _bounds:
+            _bounds.move_to_end(key)
+            return _bounds[key]
+
+    rect = margin(bounds(entry))
+
+    with _bounds_lock:
+        _bounds[key] = rect
+        if len(_bounds) > MAX_BOUNDS:
+            _bounds.popitem(last=False)
+
+    return rect
+
+
+def margin(rect):
+    """Return a damaged rectangle with the margin around it."""
+    return rect.adjusted(-DAMAGE_MARGIN, -DAMAGE_MARGIN,
+                         DAMAGE_MARGIN, DAMAGE_MARGIN)
+
+
+def object_damage(before, after):
+    """Return the damage of an object changing from before to after."""
+    if before is None:
+        return [object_bounds(after)]
+    if after is None:
+        return [object_bounds(before)]
+
+    # If only the text changed, only the lines and bullets that are not
+    # the same in both are damaged, like a bullet added to a list
+    if (before["type"] != "image" and
+            {key: value for key, value in before.items() if key != "text"} ==
+            {key: value for key, value in after.items() if key != "text"}):
+        def parts(entry):
+            return {(part.rect.getRect(), part.flags, part.text): part.bounds
+                    for part in layout(entry)}
+
+        old = parts(before)
+        new = parts(after)
+
+        return ([margin(old[key]) for key in old if key not in new] +
+                [margin(new[key]) for key in new if key not in old])
+
+    return [object_bounds(before), object_bounds(after)]
+
+
+def merge(rects):
+    """Return the rectangles, with the overlapping ones joined."""
+    merged = []
+
+    for rect in rects:
+        # Joining two rectangles can make the result overlap others
+        joined = True
+        while joined:
+            joined = False
+            for other in merged:
+                if other.intersects(rect):
+                    merged.remove(other)
+                    rect = rect.united(other)
+                    joined = True
+                    break
+
+        merged.append(rect)
+
+    return merged
+
+
+def diff(before, after, size=SLIDE_SIZE):
+    """Return the changed objects and the damage between two states."""
+    everything = [QRectF(0, 0, size[0], size[1])]
+
+    if before is None or after is None:
+        return PyShowDiff(None, everything)
+
+    old = before["objects"]
+    new = after["objects"]
+
+    changed = [name for name in new if old.get(name) != new[name]]
+    changed += [name for name in old if name not in new]
+
+    if before["background_color"] != after["background_color"]:
+        return PyShowDiff(changed, everything)
+
+    # Objects drawn in another order overlap each other differently
+    order = [name for name in old if name in new]
+    if order != [name for name in new if name in old]:
+        changed = list(OrderedDict.fromkeys(changed + order))
+        return PyShowDiff(changed, everything)
+
+    # Both the old and the new place of a changed object are damaged
+    damage = []
+    for name in changed:
+        damage += object_damage(old.get(name), new.get(name))
+
+    return PyShowDiff(changed, merge(damage))
+
+
+def damaged_area(changes, size=SLIDE_SIZE):
+    """Return the part of the slide that is damaged, between 0 and 1."""
+    slide = QRectF(0, 0, size[0], size[1])
+    area = 0
+    for rect in changes.damage:
+        rect = rect.intersected(slide)
+        area += rect.width()*rect.height()
+
+    return min(area/(size[0]*size[1]), 1.0)
+
+
+def repaint(image, state, changes, scale=1.0, size=SLIDE_SIZE):
+    """Return an image of a state, made from the image of another state."""
+    if not changes.damage:
+        return image
+
+    if damaged_area(changes, size) > MAX_DAMAGE:
+        return render(state, scale, size)
+
+    # Images are shared between threads, so the old one is left as it is
+    image = image.copy()
+
+    painter = QPainter()
+    painter.begin(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+
+    for rect in changes.damage:
+        # Whole pixels are drawn again, and only the objects in them
+        pixels = QRectF(rect.x()*scale, rect.y()*scale,
+                        rect.width()*scale, rect.height()*scale).toAlignedRect()
+        area = QRectF(pixels.x()/scale, pixels.y()/scale,
+                      pixels.width()/scale, pixels.height()/scale)
+
+        painter.save()
+        painter.setClipRect(pixels)
+        painter.fillRect(pixels, Qt.GlobalColor.white)
+        painter.scale(scale, scale)
+
+        if state["background_color"]:
+            painter.fillRect(QRect(0, 0, size[0], size[1]),
+                             QColor(state["background_color"]))
+
+        for task in state["objects"].values():
+            if object_bounds(task).intersects(area):
+                draw_object(painter, task, area)
+
+        painter.restore()
+
+    painter.end()
+
+    return image
+
+
+def render_frames(states, scale=1.0, size=SLIDE_SIZE):
+    """Return the images of consecutive states, drawing only the changes."""
+    previous = None
+    image = None
+
+    for state in states:
+        if image is None:
+            image = render(state, scale, size)
+        else:
+            image = repaint(image, state, diff(previous, state, size),
+                            scale, size)
+
+        previous = state
+        yield image
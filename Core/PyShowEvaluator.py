@@ -0,0 +1,465 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions to evaluate the state of a slide from a compiled script.
+
+The state of a slide is everything needed to draw it: the background color
+and the objects on the slide, in drawing order, with all their properties.
+States are plain Python data, so they can be evaluated without drawing
+anything, and be cached, compared and stored.
+"""
+
+import bisect
+import collections
+from Core.PyShowLanguage import (template_functions, show_functions,
+                                 resource_functions, transitions,
+                                 PyShowSetting)
+from Core import PyShowDiagnostics
+
+# Duration of a transition in ms, if not given
+TRANSITION_DURATION = 500
+
+# The type of the value of every setting, for every object type
+NUMBER = (int, float)
+TEXT_SETTINGS = {"fontname": str,
+                 "fontsize": NUMBER,
+                 "decoration": str,
+                 "color": str,
+                 "x": NUMBER,
+                 "y": NUMBER,
+                 "width": NUMBER,
+                 "height": NUMBER,
+                 "text": str,
+                 "alignment": str}
+SETTINGS = {"text": TEXT_SETTINGS,
+            "list": dict(TEXT_SETTINGS,
+                         text=list,
+                         bullet_type=str,
+                         bullet=str,
+                         bullet_spacing=NUMBER,
+                         bullet_size=NUMBER,
+                         bullet_offset=NUMBER),
+            "image": {"source": str,
+                      "x": NUMBER,
+                      "y": NUMBER,
+                      "width": NUMBER,
+                      "height": NUMBER}}
+
+# How the types of the settings are called in diagnostics
+TYPE_NAMES = {str: "a string",
+              NUMBER: "a number",
+              list: "a list"}
+
+
+def frames(show):
+    """Return the cursor positions of all frames in the show blocks."""
+    result = []
+
+    for blocknr, block in enumerate(show):
+        if block.name != "beginShow":
+            continue
+
+        contents = block.contents
+        slide = False
+
+        for position, command in enumerate(contents):
+            if command.name == "newSlide":
+                slide = True
+
+            if not slide:
+                continue
+
+            # A frame ends at a pause, at the end of the block, or right
+            # before the next slide starts
+            if (command.name == "pause" or
+                    position == len(contents)-1 or
+                    contents[position+1].name == "newSlide"):
+                result.append((blocknr, position))
+
+    return result
+
+
+def locate(show, position):
+    """Return the cursor (block and command) at a position in the text."""
+    # Determine the block we are in: the last one starting before the
+    # position, or the first one if there is none
+    i = max(bisect.bisect_right(show, position, key=lambda b: b.loc) - 1, 0)
+
+    # Now determine the position within the block. The -1 after the
+    # position given by pyparsing is to compensate for the 1 tab
+    # indentation for the block
+    contents = show[i].contents
+    j = max(bisect.bisect_right(contents, position + 1, key=lambda c: c.loc) - 1, 0)
+
+    return (i, j)
+
+
+def frame_bounds(show, cursor):
+    """Return the first and last command of the frame at the cursor."""
+    data = show[cursor[0]].contents
+
+    if not data:
+        return None
+
+    # We know the cursor position and the compiled script. We want to know
+    # which command corresponds to the cursor position, so we can find the
+    # last newSlide-statement and prepare the state from there.
+    start = cursor[1]
+    while start > -1 and data[start].name != "newSlide":
+        start -= 1
+
+    # Try to find the next pause command. Like in frames(), the frame
+    # also ends right before the next slide starts
+    end = cursor[1]
+    while (data[end].name != "pause" and end < len(data)-1 and
+           data[end+1].name != "newSlide"):
+        end += 1
+
+    return (start, end)
+
+
+def evaluate(show, cursor, diagnostics=None):
+    """Evaluate the state of the slide at the given cursor position."""
+    bounds = frame_bounds(show, cursor)
+
+    if bounds is None:
+        return None
+
+    if diagnostics is None:
+        diagnostics = PyShowDiagnostics.diagnostics
+
+    block = show[cursor[0]]
+    data = block.contents
+    start, end = bounds
+
+    # If there is a newSlide command, find the template. Otherwise
+    # we can continue anyway, but there will be no loaded objects.
+    # Same goes for an unfound template, it will just throw a lot of
+    # errors down the line...
+    template = None
+    if start == -1:
+        diagnostics.warning("no newSlide in block", block.loc)
+    elif not data[start].args:
+        diagnostics.error("newSlide needs the name of a template",
+                          data[start].loc)
+        return None
+    else:
+        # Check if the template exists
+        for block in show:
+            if (block.name == "beginTemplate" and
+                    block.args[:1] == data[start].args[:1]):
+                template = block.contents
+                break
+        if template is None:
+            diagnostics.error("template '%s' not found" % (data[start].args[0]),
+                              data[start].loc)
+            return None
+
+    # If there is a template, load the objects in a dict
+    objects = {}
+    background_color = None
+
+    if template:
+        # Run through the template and fill a dict with all standard
+        # objects. This list can be appended later by the script if
+        # new objects are created on the fly
+        for setting in template:
+            if setting.name in template_functions and not setting.args:
+                diagnostics.error("not enough arguments, at least the object name should be given",
+                                  setting.loc)
+                continue
+
+            if setting.name == "setBackgroundColor":
+                background_color = setting.args[0]
+            elif setting.name in template_functions:
+                objects[setting.args[0]] = new_object(setting, diagnostics)
+            elif (setting.name in show_functions) or (setting.name in resource_functions):
+                diagnostics.error("function '%s' not allowed in template"
+                                  % (setting.name), setting.loc)
+            else:
+                diagnostics.error("unknown template function '%s'"
+                                  % (setting.name), setting.loc)
+
+    # Work through all the commands until the cursor, putting all
+    # commands to execute in another dict, so changes in the same
+    # object are overwritten and only the final form is shown
+    drawingcommands = collections.OrderedDict()
+
+    # Notes for the presenter, from the start of the slide until the cursor
+    notes = []
+
+    # The transition into this frame is set on the pause right before it,
+    # or on the newSlide for the first frame of a slide
+    transition = None
+    for command in data[max(start, 0):max(end, start+1)]:
+        if command.name in ("newSlide", "pause"):
+            transition = None
+            settings = {arg.key: arg.value for arg in command.args
+                        if isinstance(arg, PyShowSetting)}
+
+            if "transition" not in settings:
+                continue
+
+            if settings["transition"] not in transitions:
+                diagnostics.warning("transition '%s' unknown"
+                                    % (settings["transition"]), command.loc)
+                continue
+
+            duration = settings.get("duration", TRANSITION_DURATION)
+            if (not isinstance(duration, (int, float)) or
+                    isinstance(duration, bool) or duration < 0):
+                diagnostics.warning("duration '%s' is not a number of ms, "
+                                    "using %d" % (duration,
+                                                  TRANSITION_DURATION),
+                                    command.loc)
+                duration = TRANSITION_DURATION
+
+            transition = {"type": settings["transition"],
+                          "duration": duration}
+
+    for command in data[start+1:end+1]:
+        # Notes are not drawn, but are part of the state
+        if command.name == "notes":
+            notes.extend(str(arg) for arg in command.args)
+            continue
+
+        # If we're previewing a template instead of a show, only
+        # template functions are allowed.
+        if not template and command.name not in template_functions:
+            diagnostics.error("function '%s' not allowed in template block"
+                              % (command.name), command.loc)
+            continue
+
+        # Nothing to do for drawing when it's a pause function
+        if command.name == "pause":
+            continue
+
+        if len(command.args) == 0:
+            diagnostics.error("not enough arguments, at least the object name should be given",
+                              command.loc)
+            continue
+
+        name = command.args[0]
+
+        if command.name in show_functions:
+            # Get the object, if it already exists
+            obj = objects.get(name)
+
+            if obj is None:
+                diagnostics.error("object '%s' undefined, first add it to the template or show using a template function" % (name),
+                                  command.loc)
+                continue
+
+            kind = show_functions[command.name]
+            if obj["type"] != kind:
+                diagnostics.error("object '%s' is a %s object, %s changes a %s object"
+                                  % (name, obj["type"], command.name, kind),
+                                  command.loc)
+                continue
+
+            change = CHANGES[kind]
+
+            if name not in drawingcommands:
+                drawingcommands[name] = {"type": show_functions[command.name]}
+                change(drawingcommands[name], obj)
+
+            # Now change the settings according to this command
+            drawingcommands.move_to_end(name)
+            changes = argstodict(command.args[1:], diagnostics, command.loc)
+            change(drawingcommands[name],
+                   check_settings(kind, changes, diagnostics, command.loc))
+
+        elif command.name in template_functions:
+            # Exception for the background color
+            if command.name == "setBackgroundColor":
+                background_color = name
+                continue
+
+            # If it already exists, throw error
+            if name in objects:
+                diagnostics.error("redefinition of object '%s'. Will not overwrite." % (name),
+                                  command.loc)
+                continue
+
+            # Add the object to the objects list before drawing
+            objects[name] = new_object(command, diagnostics)
+
+            # Add the object to the drawing commands, depending on the function
+            drawingcommands[name] = {"type": template_functions[command.name]}
+            CHANGES[template_functions[command.name]](drawingcommands[name],
+                                                      objects[name])
+
+        else:
+            diagnostics.warning("command '%s' unknown" % (command.name),
+                                command.loc)
+
+    # Images can name a resource instead of a file. The state contains the
+    # file, so drawing doesn't need the show
+    library = None
+    for entry in drawingcommands.values():
+        if entry["type"] == "image":
+            if library is None:
+                library = resources(show)
+            entry["file"] = library.get(entry["source"], entry["source"])
+
+    return {"background_color": background_color,
+            "objects": drawingcommands,
+            "notes": notes,
+            "transition": transition}
+
+
+def resources(show):
+    """Return the files of all image resources, by resource name."""
+    library = {}
+
+    for block in show:
+        if block.name != "resources":
+            continue
+
+        for command in block.contents:
+            if command.name == "image" and len(command.args) >= 2:
+                library[command.args[0]] = command.args[1]
+
+    return library
+
+
+def change_text(entry, changes):
+    """Change properties of a text object using the changes variable."""
+    # Font properties. The font itself is only made when drawing
+    if changes.get("fontname"):
+        entry["fontname"] = changes["fontname"]
+    else:
+        entry.setdefault("fontname", None)
+
+    if changes.get("fontsize"):
+        entry["fontsize"] = changes["fontsize"]
+    else:
+        entry.setdefault("fontsize", None)
+
+    # TODO: Kerning does nothing. Make kerning do the opposite of default
+    # Font decorations allowed:
+    # i - Italic
+    # b - Bold
+    # u - Underline
+    # f - Fixed pitch
+    # k - Kerning
+    # o - Overline
+    # s - Strike out
+    # Decorations are never removed, only added
+    decoration = entry.get("decoration", "")
+    for flag in changes.get("decoration") or "":
+        if flag in "ibufkos" and flag not in decoration:
+            decoration += flag
+    entry["decoration"] = "".join(sorted(decoration))
+
+    # Set the text color
+    # TODO: the pen pattern, thickness, shadow, etc.
+    entry["color"] = (changes["color"]
+                      if changes.get("color")
+                      else entry.get("color", "#000"))
+
+    entry["x"] = changes.get("x", entry.get("x", 0.0))
+    entry["y"] = changes.get("y", entry.get("y", 0.0))
+    entry["width"] = changes.get("width", entry.get("width", 500.0))
+    entry["height"] = changes.get("height", entry.get("height", 300.0))
+    entry["text"] = changes.get("text", entry.get("text", ""))
+    entry["alignment"] = changes.get("alignment", entry.get("alignment"))
+
+
+def change_list(entry, changes):
+    """Change properties of a bullet list object."""
+    # Properties are mostly the same as for a text object
+    change_text(entry, changes)
+
+    # ...except for the bullet type
+    # c=character, p=picture
+    entry["bullet_type"] = changes.get("bullet_type",
+                                       entry.get("bullet_type", "c"))
+    entry["bullet"] = changes.get("bullet", entry.get("bullet", "■"))
+    entry["bullet_spacing"] = changes.get("bullet_spacing",
+                                          entry.get("bullet_spacing", 100))
+    entry["bullet_size"] = changes.get("bullet_size",
+                                       entry.get("bullet_size", 1))
+    entry["bullet_offset"] = changes.get("bullet_offset",
+                                         entry.get("bullet_offset", 0))
+
+
+def change_image(entry, changes):
+    """Change properties of an image object."""
+    # The source is the name of an image resource, or the name of a file
+    entry["source"] = changes.get("source", entry.get("source", ""))
+
+    # Without a width or height, the size of the image itself is used
+    entry["x"] = changes.get("x", entry.get("x", 0.0))
+    entry["y"] = changes.get("y", entry.get("y", 0.0))
+    entry["width"] = changes.get("width", entry.get("width"))
+    entry["height"] = changes.get("height", entry.get("height"))
+
+
+# The function changing an object, for every object type
+CHANGES = {"text": change_text,
+           "list": change_list,
+           "image": change_image}
+
+
+def check_settings(kind, settings, diagnostics, loc):
+    """Return the settings that fit an object type, reporting the others."""
+    checked = {}
+
+    for key, value in settings.items():
+        expected = SETTINGS[kind].get(key)
+
+        if expected is None:
+            diagnostics.warning("'%s' is not a setting of a %s object"
+                                % (key, kind), loc)
+        elif not isinstance(value, expected) or isinstance(value, bool):
+            diagnostics.error("'%s' should be %s, not '%s'"
+                              % (key, TYPE_NAMES[expected], value), loc)
+        else:
+            checked[key] = value
+
+    return checked
+
+
+def new_object(command, diagnostics):
+    """Return the settings of an object added by a template function."""
+    kind = template_functions[command.name]
+    obj = check_settings(kind,
+                         argstodict(command.args[1:], diagnostics,
+                                    command.loc),
+                         diagnostics,
+                         command.loc)
+    obj["type"] = kind
+
+    return obj
+
+
+def argstodict(args, diagnostics=None, loc=None):
+    """Convert the argument list of a command at loc to a dictionary."""
+    if diagnostics is None:
+        diagnostics = PyShowDiagnostics.diagnostics
+
+    obj = {}
+    for entry in args:
+        if isinstance(entry, PyShowSetting):
+            obj[entry.key] = entry.value
+        else:
+            diagnostics.error("value without a key: '%s'" % (str(entry)),
+                              loc)
+
+    return obj
@@ -0,0 +1,361 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions and classes to export a show as HTML or SVG pages.
+
+Every frame becomes a page of its own, written as soon as it is ready, by a
+number of threads at the same time. Text stays text: the lines are broken
+the same way as on the slides, and every line is placed where the slide
+has it. The styles of the text are written once to a shared style sheet,
+and images once to an asset directory, named by the hash of their contents,
+so pages of all frames (and of earlier exports) share them.
+"""
+
+import hashlib
+import html
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontInfo, QFontMetricsF, QTextLayout, QTextOption
+from Core.PyShowEvaluator import evaluate
+from Core.PyShowTimeline import PyShowTimeline
+from Core.PyShowRenderer import layout, image_rect, SLIDE_SIZE
+from Core.PyShowResources import resources
+
+# Formats that can be exported
+FORMATS = ["html", "svg"]
+
+# Files shared by all pages
+STYLE_SHEET = "style.css"
+SCRIPT = "pyshow.js"
+ASSETS = "assets"
+PAGES = "frames"
+
+# Style of the page itself, before the styles of the text
+PAGE_STYLE = """body {margin: 0; background: #000;}
+.slide {position: relative; overflow: hidden; margin: 0 auto;
+        width: %dpx; height: %dpx; background: #FFF;}
+.slide div, .slide img {position: absolute; white-space: pre; margin: 0;}
+.missing {background: #DDD; border: 1px solid #999; box-sizing: border-box;}
+""" % SLIDE_SIZE
+
+# Arrow keys, space and page up/down go to the previous and next page
+PAGE_SCRIPT = """document.addEventListener('keydown', function (event) {
+    var next = ['ArrowRight', 'ArrowDown', 'PageDown', ' '];
+    var previous = ['ArrowLeft', 'ArrowUp', 'PageUp', 'Backspace'];
+    var link = null;
+    if (next.indexOf(event.key) >= 0) link = document.body.dataset.next;
+    if (previous.indexOf(event.key) >= 0) link = document.body.dataset.previous;
+    if (link) window.location.href = link;
+});
+"""
+
+
+# How lines are aligned in their box, in CSS and SVG, by Qt alignment. Left
+# aligned lines are placed where Qt draws them, the others are aligned by
+# the browser, as its fonts can be a bit wider or narrower
+ALIGNMENTS = {Qt.AlignmentFlag.AlignHCenter.value: ("center", "middle"),
+              Qt.AlignmentFlag.AlignRight.value: ("right", "end")}
+
+
+def alignment(part):
+    """Return the Qt alignment of the lines of a text, if not left."""
+    return ALIGNMENTS.get(part.flags & (Qt.AlignmentFlag.AlignHCenter |
+                                        Qt.AlignmentFlag.AlignRight).value)
+
+
+def page_name(number, format):
+    """Return the file name of the page of a frame."""
+    return "%04d.%s" % (number, format)
+
+
+def text_lines(part):
+    """Return the position of the baseline and text of every line drawn."""
+    option = QTextOption(Qt.AlignmentFlag(part.flags & 0x000f))
+    option.setWrapMode(QTextOption.WrapMode.WordWrap)
+
+    # The lines are read while their layout exists, as they are part of it
+    lines = []
+    for paragraph in part.text.split("\n"):
+        text_layout = QTextLayout(paragraph, part.font)
+        text_layout.setTextOption(option)
+        text_layout.beginLayout()
+
+        while True:
+            line = text_layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(part.rect.width())
+            string = paragraph[line.textStart():line.textStart() + line.textLength()]
+            lines.append((line.naturalTextRect().x(), line.ascent(),
+                          line.height(), string.rstrip()))
+
+        text_layout.endLayout()
+
+    # Lines follow each other, and the whole text is centered vertically
+    # in its box if the alignment says so, like Qt draws them
+    top = part.rect.y()
+    height = sum(line[2] for line in lines)
+    if part.flags & Qt.AlignmentFlag.AlignVCenter.value:
+        top += (part.rect.height() - height)/2
+    elif part.flags & Qt.AlignmentFlag.AlignBottom.value:
+        top += part.rect.height() - height
+
+    positions = []
+    for x, ascent, line_height, string in lines:
+        positions.append((part.rect.x() + x, top, top + ascent, string))
+        top += line_height
+
+    return positions
+
+
+class PyShowStyles:
+    """The styles of the text in all pages, each with a class name."""
+
+    def __init__(self):
+        self._styles = {}
+        self._lock = threading.Lock()
+
+    def style(self, fnt, color, align=None):
+        """Return the class name of a font, color and alignment."""
+        info = QFontInfo(fnt)
+        decoration = [name for flag, name in ((fnt.underline(), "underline"),
+                                              (fnt.overline(), "overline"),
+                                              (fnt.strikeOut(), "line-through"))
+                      if flag]
+
+        css = ("font-family: '%s', sans-serif; font-size: %dpx; "
+               "line-height: %.1fpx; font-weight: %s; font-style: %s; "
+               "text-decoration: %s; color: %s; fill: %s;"
+               % (info.family().replace("'", ""),
+                  fnt.pixelSize(),
+                  QFontMetricsF(fnt).height(),
+                  "bold" if fnt.bold() else "normal",
+                  "italic" if fnt.italic() else "normal",
+                  " ".join(decoration) or "none",
+                  color,
+                  color))
+        if align is not None:
+            css += " text-align: %s; text-anchor: %s;" % align
+        name = "s" + hashlib.sha1(css.encode('utf-8')).hexdigest()[:8]
+
+        with self._lock:
+            self._styles[name] = css
+
+        return name
+
+    def css(self):
+        """Return the style sheet with all styles."""
+        with self._lock:
+            styles = sorted(self._styles.items())
+
+        return PAGE_STYLE + "".join(".%s {%s}\n" % (name, css)
+                                    for name, css in styles)
+
+
+class PyShowAssets:
+    """Files used by the pages, stored by the hash of their contents."""
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def asset(self, filename):
+        """Return the name of the stored copy of a file, or None."""
+        with self._lock:
+            if filename in self._names:
+                return self._names[filename]
+
+        try:
+            with open(os.path.join(resources.directory, filename), 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        name = (hashlib.sha1(data).hexdigest() +
+                os.path.splitext(filename)[1].lower())
+        path = os.path.join(self._directory, name)
+
+        # A file with this name always has the same contents, so it is
+        # only written when it isn't there yet
+        with self._lock:
+            if not os.path.exists(path):
+                with open(path, 'wb') as file:
+                    file.write(data)
+            self._names[filename] = name
+
+        return name
+
+
+def html_page(state, number, total, styles, assets):
+    """Return the HTML page of a frame."""
+    body = []
+
+    background = state["background_color"] if state else None
+    for task in (state["objects"].values() if state else ()):
+        if task["type"] == "image":
+            body.append(html_image(task, assets))
+            continue
+
+        for part in layout(task):
+            align = alignment(part)
+            name = styles.style(part.font, task["color"], align)
+            for x, top, baseline, string in text_lines(part):
+                if align is None:
+                    place = "left: %.1fpx;" % (x)
+                else:
+                    place = "left: %.1fpx; width: %.1fpx;" % (part.rect.x(),
+                                                               part.rect.width())
+                body.append('<div class="%s" style="%s top: %.1fpx;">%s</div>'
+                            % (name, place, top, html.escape(string)))
+
+    links = ''.join(' data-%s="%s"' % (key, page_name(value, "html"))
+                    for key, value in (("previous", number - 1),
+                                       ("next", number + 1))
+                    if 1 <= value <= total)
+
+    return ('<!DOCTYPE html>\n'
+            '<html>\n<head>\n<meta charset="utf-8">\n'
+            '<title>Frame %d</title>\n'
+            '<link rel="stylesheet" href="../%s">\n'
+            '<script src="../%s"></script>\n'
+            '</head>\n<body%s>\n<div class="slide"%s>\n%s\n</div>\n</body>\n</html>\n'
+            % (number, STYLE_SHEET, SCRIPT, links,
+               (' style="background: %s;"'
+                % (html.escape(str(background), quote=True))
+                if background else ''),
+               "\n".join(body)))
+
+
+def html_image(task, assets):
+    """Return the HTML of an image object."""
+    image, rect = image_rect(task)
+    name = assets.asset(task["file"]) if image is not None else None
+
+    if name is None:
+        return ('<div class="missing" style="left: %.1fpx; top: %.1fpx; '
+                'width: %.1fpx; height: %.1fpx;"></div>'
+                % (rect.x(), rect.y(), rect.width(), rect.height()))
+
+    return ('<img src="../%s/%s" style="left: %.1fpx; top: %.1fpx; '
+            'width: %.1fpx; height: %.1fpx;" alt="">'
+            % (ASSETS, name, rect.x(), rect.y(), rect.width(), rect.height()))
+
+
+def svg_page(state, number, total, styles, assets):
+    """Return the SVG image of a frame."""
+    body = ['<rect width="100%%" height="100%%" fill="%s"/>'
+            % (html.escape(str(state["background_color"]), quote=True)
+               if state and state["background_color"] else "#FFF")]
+
+    for task in (state["objects"].values() if state else ()):
+        if task["type"] == "image":
+            body.append(svg_image(task, assets))
+            continue
+
+        for part in layout(task):
+            align = alignment(part)
+            name = styles.style(part.font, task["color"], align)
+            for x, top, baseline, string in text_lines(part):
+                if align is not None:
+                    x = part.rect.x() + part.rect.width()*(
+                        0.5 if align[1] == "middle" else 1.0)
+                body.append('<text class="%s" x="%.1f" y="%.1f" '
+                            'xml:space="preserve">%s</text>'
+                            % (name, x, baseline, html.escape(string)))
+
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<?xml-stylesheet href="../%s" type="text/css"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            'width="%d" height="%d" viewBox="0 0 %d %d">\n'
+            '<title>Frame %d</title>\n%s\n</svg>\n'
+            % (STYLE_SHEET, SLIDE_SIZE[0], SLIDE_SIZE[1],
+               SLIDE_SIZE[0], SLIDE_SIZE[1], number, "\n".join(body)))
+
+
+def svg_image(task, assets):
+    """Return the SVG of an image object."""
+    image, rect = image_rect(task)
+    name = assets.asset(task["file"]) if image is not None else None
+
+    if name is None:
+        return ('<rect x="%.1f" y="%.1f" width="%.1f" height="%.1f" '
+                'fill="#DDD" stroke="#999"/>'
+                % (rect.x(), rect.y(), rect.width(), rect.height()))
+
+    return ('<image xlink:href="../%s/%s" x="%.1f" y="%.1f" '
+            'width="%.1f" height="%.1f" preserveAspectRatio="none"/>'
+            % (ASSETS, name, rect.x(), rect.y(), rect.width(), rect.height()))
+
+
+PAGE_WRITERS = {"html": html_page, "svg": svg_page}
+
+
+def index_page(timeline, format, title):
+    """Return the HTML page listing all frames."""
+    items = "\n".join('<li><a href="%s/%s">%s</a></li>'
+                      % (PAGES, page_name(entry.number, format),
+                         html.escape(entry.title))
+                      for entry in timeline)
+
+    return ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            '<title>%s</title>\n</head>\n<body>\n<h1>%s</h1>\n<ol>\n%s\n</ol>\n'
+            '</body>\n</html>\n' % (html.escape(title), html.escape(title), items))
+
+
+def export_pages(text, show, directory, format="html", title='', jobs=None,
+                 progress=None):
+    """Write every frame of a show as a page in a directory."""
+    timeline = PyShowTimeline()
+    timeline.update(text, show)
+
+    os.makedirs(os.path.join(directory, PAGES), exist_ok=True)
+    os.makedirs(os.path.join(directory, ASSETS), exist_ok=True)
+
+    styles = PyShowStyles()
+    assets = PyShowAssets(os.path.join(directory, ASSETS))
+    write_page = PAGE_WRITERS[format]
+
+    def export(entry):
+        # Every page is written as soon as it is made, so nothing of it
+        # is kept in memory
+        state = evaluate(show, entry.cursor)
+        page = write_page(state, entry.number, len(timeline), styles, assets)
+
+        with open(os.path.join(directory, PAGES,
+                               page_name(entry.number, format)),
+                  'w', encoding='utf-8') as file:
+            file.write(page)
+
+        return entry.number
+
+    with ThreadPoolExecutor(jobs) as executor:
+        for done, number in enumerate(executor.map(export, timeline), 1):
+            if progress is not None:
+                progress(done, len(timeline))
+
+    # The shared files are written last, when all styles are known
+    with open(os.path.join(directory, STYLE_SHEET), 'w', encoding='utf-8') as file:
+        file.write(styles.css())
+    with open(os.path.join(directory, SCRIPT), 'w', encoding='utf-8') as file:
+        file.write(PAGE_SCRIPT)
+    with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(index_page(timeline, format, title or 'PyShow'))
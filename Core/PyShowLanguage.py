@@ -18,32 +18,48 @@
 """
 Class to interpret the presentation language used in PyShow.
 
-It uses QRegularExpressions to make a map of the code and allow the editor
-to highlight everything in the proper way.
+It uses pyparsing to make a map of the code, and a single regular expression
+per line to allow the editor to highlight everything in the proper way.
+
+A script can include other script files, like a library of templates. Every
+included file is parsed once and kept in a registry shared by all projects
+and threads, and only parsed again when its contents change.
+
+Functions are expanded when a script is compiled, so evaluating a show
+never sees them. A call with the same arguments as an earlier one reuses
+its expansion.
 """
 
-from pyparsing import (Word, ParseException, alphas, nums, Forward,
-                       delimitedList, Literal, Group, Optional, ZeroOrMore,
-                       OneOrMore, LineEnd, SkipTo, Combine, QuotedString)
-from PyQt6.QtCore import Qt, QRegularExpression
+import hashlib
+import os
+import re
+import threading
+from collections import namedtuple
+from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QTextCharFormat, QFont, QSyntaxHighlighter
+from Core.PyShowTiming import span
+from Core.PyShowResources import resources
+from Core import PyShowDiagnostics
 
 # TODO: function that tells the editor which lines have errors/warnings
 # TODO: enable inline comments
 
 sectionList = ["beginTemplate",
                "beginShow",
+               "beginFunction",
                "resources"
                ]
 
 template_functions = {
                       "setBackgroundColor": "",
                       "addTextBox": "text",
-                      "addBulletList": "list"
+                      "addBulletList": "list",
+                      "addImage": "image"
                       }
 show_functions = {"newSlide": "",
                   "setTextBox": "text",
                   "setBulletList": "list",
+                  "setImage": "image"
                   }
 
 resource_functions = {
@@ -52,7 +68,538 @@ resource_functions = {
                       "audio": "loadAudio"
                       }
 
-actionList = ["pause"]
+actionList = ["pause", "notes"]
+
+# Directives outside of the blocks
+directiveList = ["include"]
+
+# Transitions into a frame, set on the newSlide or pause before it
+transitions = ["fade", "push", "tween"]
+
+
+# Version of the compiled script format and its evaluation. Anything cached
+# from a compiled script (for example inside a project file) is only valid
+# for the same engine version, so increase this when either changes.
+ENGINE_VERSION = 3
+
+# The compiled form of a script. A script is a tuple of blocks, containing
+# commands. Arguments are plain values, lists of values, or settings. The
+# blocks of an included file follow an include block, with the file name,
+# the full path and the hash of the file as arguments, and all of them have
+# the location of the include directive. The commands of a function call
+# have the location of the call.
+PyShowBlock = namedtuple('PyShowBlock', 'name loc args contents')
+PyShowCommand = namedtuple('PyShowCommand', 'name loc args')
+PyShowSetting = namedtuple('PyShowSetting', 'key loc value')
+
+# A parameter of a function, used as a value inside it. Compiled scripts
+# never contain parameters, as all functions are expanded
+PyShowParameter = namedtuple('PyShowParameter', 'name loc')
+
+
+def grammar():
+    """Build the pyparsing grammar of the PyShow language."""
+    # Pyparsing is only imported when something is parsed for the first
+    # time, as importing it takes a noticeable part of the startup time
+    from pyparsing import (Word, alphas, nums, Forward, delimitedList,
+                           Literal, Keyword, Group, Optional, ZeroOrMore,
+                           OneOrMore, LineEnd, SkipTo, Combine, QuotedString)
+
+    identifier = Word(alphas + "_", alphas + nums + "_")
+    eq = Literal("=").suppress()
+    string = (QuotedString("'", escChar="\\", multiline=True) |
+              QuotedString('"', escChar="\\", multiline=True))
+    minus = Optional("-")
+    num = Word(nums)
+    int_value = Combine(minus + num).setParseAction(lambda s, l, t: [int(t[0])])
+    float_value = Combine(minus + Optional(num) + "." + num).setParseAction(lambda s, l, t: [float(t[0])])
+    number = float_value | int_value
+    functor = identifier.copy().setParseAction(lambda loc, tok: (tok[0], loc))
+    key = identifier.copy().setParseAction(lambda loc, tok: (tok[0], loc))
+    parameter = identifier.copy().setParseAction(lambda loc, tok: PyShowParameter(tok[0], loc))
+    lbr = Literal('{').suppress()
+    rbr = Literal('}').suppress()
+    lp = Literal('(').suppress()
+    rp = Literal(')').suppress()
+    lbk = Literal('[').suppress()
+    rbk = Literal(']').suppress()
+
+    strlist = Group(lbk + Optional(delimitedList(string)) + rbk)
+    setting = (Group(key("key") +
+                     eq +
+                     (number | string | strlist | parameter)("value")))
+    comment = Group(Literal("#") + SkipTo(LineEnd())).suppress()
+
+    expression = Forward()
+
+    arg = Group(expression) | string | setting | number | strlist | parameter
+    args = Group(lp + Optional(delimitedList(arg)) + rp)("args")
+
+    command = Group(functor("name") + args)
+
+    script = Group(functor("name") + args +
+                   lbr +
+                   ZeroOrMore(command | comment.suppress())("contents") +
+                   rbr)
+
+    # A directive is a block without contents
+    include = Keyword("include").setParseAction(lambda loc, tok: (tok[0], loc))
+    directive = Group(include("name") + args)
+    expression << OneOrMore(script | directive | comment.suppress())
+
+    return expression
+
+
+def compile_args(args):
+    """Convert parsed arguments to their compiled form."""
+    from pyparsing import ParseResults
+
+    compiled = []
+
+    for arg in args:
+        if not isinstance(arg, ParseResults):
+            compiled.append(arg)
+        elif len(arg) == 2 and isinstance(arg[0], tuple):
+            # A setting, consisting of a (key, location) tuple and a value
+            value = arg[1]
+            if isinstance(value, ParseResults):
+                value = value.asList()
+            compiled.append(PyShowSetting(arg[0][0], arg[0][1], value))
+        elif len(arg) and isinstance(arg[0], ParseResults):
+            # A nested expression
+            compiled.append(compile_script(arg))
+        else:
+            compiled.append(arg.asList())
+
+    return compiled
+
+
+def compile_script(parsed):
+    """Convert the pyparsing output to the compiled form of the script."""
+    return tuple(PyShowBlock(block[0][0],
+                             block[0][1],
+                             compile_args(block[1]),
+                             tuple(PyShowCommand(command[0][0],
+                                                 command[0][1],
+                                                 compile_args(command[1]))
+                                   for command in block[2:]))
+                 for block in parsed)
+
+
+def parse_script(text, expression=None, directory=None):
+    """Parse and compile a script. Raises a ParseException on errors."""
+    if expression is None:
+        expression = grammar()
+
+    # Included files are relative to the project
+    if directory is None:
+        directory = resources.directory
+
+    parsed = expression.parseString(text.replace('\t', ' '), parseAll=True)
+    show = expand_includes(compile_script(parsed), text, directory)
+    return expand_functions(show, text)
+
+
+def relocate(value, loc):
+    """Return a compiled value with every location changed to loc."""
+    if isinstance(value, PyShowSetting):
+        return PyShowSetting(value.key, loc, relocate(value.value, loc))
+    if isinstance(value, PyShowParameter):
+        return PyShowParameter(value.name, loc)
+    if isinstance(value, tuple):
+        return tuple(PyShowBlock(block.name,
+                                 loc,
+                                 relocate(block.args, loc),
+                                 tuple(PyShowCommand(command.name,
+                                                     loc,
+                                                     relocate(command.args, loc))
+                                       for command in block.contents))
+                     for block in value)
+    if isinstance(value, list):
+        return [relocate(v, loc) for v in value]
+    return value
+
+
+def expand_includes(show, text, directory, including=()):
+    """Replace the include directives of a compiled script by the files."""
+    if not any(block.name == "include" for block in show):
+        return show
+
+    from pyparsing import ParseException
+
+    expanded = []
+
+    for block in show:
+        if block.name != "include":
+            expanded.append(block)
+            continue
+
+        if len(block.args) != 1 or not isinstance(block.args[0], str):
+            raise ParseException(text, block.loc,
+                                 "include needs the name of a file")
+
+        filename = block.args[0]
+        path = os.path.abspath(os.path.join(directory, filename))
+
+        if path in including:
+            raise ParseException(text, block.loc,
+                                 "'%s' includes itself" % (filename))
+
+        # Problems in an included file are reported at the include
+        # directive, as the editor only shows the script itself
+        try:
+            key, module_text, module = modules.module(path)
+            module = expand_includes(module, module_text,
+                                     os.path.dirname(path),
+                                     including + (path,))
+        except OSError as error:
+            raise ParseException(text, block.loc,
+                                 "can not include '%s': %s"
+                                 % (filename, error.strerror or error))
+        except ValueError:
+            raise ParseException(text, block.loc,
+                                 "can not include '%s': not a text file"
+                                 % (filename))
+        except ParseException as pe:
+            raise ParseException(text, block.loc,
+                                 "in '%s', line %d: %s"
+                                 % (filename, pe.lineno, pe.msg))
+
+        expanded.append(PyShowBlock("include", block.loc,
+                                    [filename, path, key], ()))
+        expanded.extend(relocate(module, block.loc))
+
+    return tuple(expanded)
+
+
+def args_key(value):
+    """Return compiled arguments as a key, without their locations."""
+    if isinstance(value, PyShowSetting):
+        return ("=", value.key, args_key(value.value))
+    if isinstance(value, PyShowParameter):
+        return ("$", value.name)
+    if isinstance(value, tuple):
+        return tuple((block.name,
+                      args_key(block.args),
+                      tuple((command.name, args_key(command.args))
+                            for command in block.contents))
+                     for block in value)
+    if isinstance(value, list):
+        return ("[",) + tuple(args_key(v) for v in value)
+    return (type(value).__name__, value)
+
+
+def parameters(value):
+    """Return the parameters used in compiled arguments."""
+    if isinstance(value, PyShowSetting):
+        return parameters(value.value)
+    if isinstance(value, PyShowParameter):
+        return [value]
+    if isinstance(value, tuple):
+        # A nested expression
+        return [parameter
+                for block in value
+                for args in [block.args] + [command.args
+                                            for command in block.contents]
+                for parameter in parameters(args)]
+    if isinstance(value, list):
+        return [parameter for v in value for parameter in parameters(v)]
+    return []
+
+
+def substitute(value, bindings):
+    """Return compiled arguments with the parameters filled in."""
+    if isinstance(value, PyShowSetting):
+        return PyShowSetting(value.key, value.loc,
+                             substitute(value.value, bindings))
+    if isinstance(value, PyShowParameter):
+        return bindings[value.name]
+    if isinstance(value, tuple):
+        return tuple(PyShowBlock(block.name,
+                                 block.loc,
+                                 substitute(block.args, bindings),
+                                 tuple(PyShowCommand(command.name,
+                                                     command.loc,
+                                                     substitute(command.args,
+                                                                bindings))
+                                       for command in block.contents))
+                     for block in value)
+    if isinstance(value, list):
+        return [substitute(v, bindings) for v in value]
+    return value
+
+
+def bind(names, call, text):
+    """Return the value of every parameter of a function for a call."""
+    from pyparsing import ParseException
+
+    bindings = {}
+    position = 0
+
+    for arg in call.args:
+        if isinstance(arg, PyShowSetting):
+            name = arg.key
+            if name not in names:
+                raise ParseException(text, call.loc,
+                                     "function '%s' has no parameter '%s'"
+                                     % (call.name, name))
+            value = arg.value
+        else:
+            if position >= len(names):
+                raise ParseException(text, call.loc,
+                                     "too many arguments for function '%s'"
+                                     % (call.name))
+            name = names[position]
+            position += 1
+            value = arg
+
+        if name in bindings:
+            raise ParseException(text, call.loc,
+                                 "parameter '%s' of function '%s' given twice"
+                                 % (name, call.name))
+        bindings[name] = value
+
+    missing = [name for name in names if name not in bindings]
+    if missing:
+        raise ParseException(text, call.loc,
+                             "function '%s' needs parameter '%s'"
+                             % (call.name, missing[0]))
+
+    return bindings
+
+
+def expand_functions(show, text):
+    """Replace the calls of functions in a compiled script by their commands."""
+    from pyparsing import ParseException
+
+    # Functions can be defined anywhere, also in included files, and called
+    # from any block, also before their definition
+    functions = {}
+    builtin = (set(sectionList) | set(template_functions) |
+               set(show_functions) | set(resource_functions) |
+               set(actionList) | set(directiveList))
+
+    for block in show:
+        if block.name != "beginFunction":
+            continue
+
+        if not block.args or not isinstance(block.args[0], str):
+            raise ParseException(text, block.loc,
+                                 "a function needs a name")
+
+        name = block.args[0]
+        names = [arg.name for arg in block.args[1:]
+                 if isinstance(arg, PyShowParameter)]
+
+        if len(names) != len(block.args) - 1 or len(set(names)) != len(names):
+            raise ParseException(text, block.loc,
+                                 "the parameters of function '%s' should be "
+                                 "different names" % (name))
+        if name in builtin:
+            raise ParseException(text, block.loc,
+                                 "function '%s' has the name of a command"
+                                 % (name))
+        if name in functions:
+            raise ParseException(text, block.loc,
+                                 "redefinition of function '%s'" % (name))
+
+        for command in block.contents:
+            for parameter in parameters(command.args):
+                if parameter.name not in names:
+                    raise ParseException(text, parameter.loc,
+                                         "function '%s' has no parameter '%s'"
+                                         % (name, parameter.name))
+
+        functions[name] = (names, block.contents)
+
+    # The commands of a call, by function and arguments. Calls with the same
+    # arguments share these, and only get the location of the call, also
+    # for their settings
+    expansions = {}
+
+    def expand(call, calling):
+        key = (call.name, args_key(call.args))
+
+        if key not in expansions:
+            names, contents = functions[call.name]
+            bindings = bind(names, call, text)
+
+            commands = []
+            for command in contents:
+                args = substitute(command.args, bindings)
+
+                if command.name not in functions:
+                    commands.append((command.name, args))
+                elif command.name in calling:
+                    raise ParseException(text, call.loc,
+                                         "function '%s' calls itself"
+                                         % (command.name))
+                else:
+                    commands.extend(expand(PyShowCommand(command.name,
+                                                         call.loc,
+                                                         args),
+                                           calling + (command.name,)))
+
+            expansions[key] = tuple(commands)
+
+        return expansions[key]
+
+    expanded = []
+    changed = False
+
+    for block in show:
+        if block.name == "beginFunction":
+            changed = True
+            continue
+
+        # Outside of functions, a name is not a value
+        for command in (block,) + block.contents:
+            for parameter in parameters(command.args):
+                raise ParseException(text, parameter.loc,
+                                     "'%s' is not a value" % (parameter.name))
+
+        if not any(command.name in functions for command in block.contents):
+            expanded.append(block)
+            continue
+
+        contents = []
+        for command in block.contents:
+            if command.name in functions:
+                contents.extend(PyShowCommand(name, command.loc,
+                                              relocate(args, command.loc))
+                                for name, args in expand(command,
+                                                         (command.name,)))
+            else:
+                contents.append(command)
+
+        expanded.append(PyShowBlock(block.name, block.loc, block.args,
+                                    tuple(contents)))
+        changed = True
+
+    return tuple(expanded) if changed else show
+
+
+class PyShowModules:
+    """The compiled script files included by scripts, by their full path."""
+
+    def __init__(self):
+        # The size and modification time, hash, text and compiled script of
+        # every file
+        self._modules = {}
+        self._lock = threading.Lock()
+
+        # Parsing is done one file at a time, with a single grammar
+        self._expression = None
+        self._parse_lock = threading.Lock()
+
+    def module(self, path):
+        """Return the hash, text and compiled script of a file."""
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._modules.get(path)
+
+        # Checking the file itself is only needed when it was written
+        if entry is not None and entry[0] == version:
+            return entry[1:]
+
+        with open(path, encoding='utf-8') as file:
+            text = file.read()
+
+        key = script_hash(text)
+
+        if entry is not None and entry[1] == key:
+            compiled = entry[3]
+        else:
+            with self._parse_lock:
+                if self._expression is None:
+                    self._expression = grammar()
+
+                with span("parse include"):
+                    parsed = self._expression.parseString(text.replace('\t', ' '),
+                                                          parseAll=True)
+                compiled = compile_script(parsed)
+
+        with self._lock:
+            self._modules[path] = (version, key, text, compiled)
+
+        return key, text, compiled
+
+    def current(self, show):
+        """Return whether the files included by a compiled script are unchanged."""
+        for block in show or ():
+            if block.name != "include" or len(block.args) != 3:
+                continue
+
+            from pyparsing import ParseException
+
+            try:
+                key = self.module(block.args[1])[0]
+            except (OSError, ValueError, ParseException):
+                return False
+
+            if key != block.args[2]:
+                return False
+
+        return True
+
+    def clear(self):
+        """Forget all files."""
+        with self._lock:
+            self._modules.clear()
+
+
+# The included files of all scripts
+modules = PyShowModules()
+
+
+def script_hash(text):
+    """Return the hash identifying a script text in caches."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def encode_value(value):
+    """Convert a compiled value to something that can be stored as JSON."""
+    if isinstance(value, PyShowSetting):
+        return {"s": [value.key, value.loc, encode_value(value.value)]}
+    if isinstance(value, tuple):
+        return {"e": dump_compiled(value)}
+    if isinstance(value, list):
+        return [encode_value(v) for v in value]
+    return value
+
+
+def decode_value(value):
+    """Convert a value stored as JSON back to its compiled form."""
+    if isinstance(value, dict):
+        if "s" in value:
+            key, loc, setting = value["s"]
+            return PyShowSetting(key, loc, decode_value(setting))
+        return load_compiled(value["e"])
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    return value
+
+
+def dump_compiled(show):
+    """Serialize a compiled script to a JSON compatible structure."""
+    return [[block.name,
+             block.loc,
+             encode_value(block.args),
+             [[command.name, command.loc, encode_value(command.args)]
+              for command in block.contents]]
+            for block in show]
+
+
+def load_compiled(data):
+    """Rebuild a compiled script from the output of dump_compiled."""
+    return tuple(PyShowBlock(name,
+                             loc,
+                             decode_value(args),
+                             tuple(PyShowCommand(c_name, c_loc, decode_value(c_args))
+                                   for c_name, c_loc, c_args in contents))
+                 for name, loc, args, contents in data)
 
 
 class PyShowParser():
@@ -61,60 +608,66 @@ class PyShowParser():
     def __init__(self, editor):
         self._editor = editor
 
-        self._editor.textChanged.connect(self.parse)
-
-        identifier = Word(alphas + "_", alphas + nums + "_")
-        eq = Literal("=").suppress()
-        string = (QuotedString("'", escChar="\\", multiline=True) |
-                  QuotedString('"', escChar="\\", multiline=True))
-        minus = Optional("-")
-        num = Word(nums)
-        int_value = Combine(minus + num).setParseAction(lambda s, l, t: [int(t[0])])
-        float_value = Combine(minus + Optional(num) + "." + num).setParseAction(lambda s, l, t: [float(t[0])])
-        number = float_value | int_value
-        functor = identifier.setParseAction(lambda loc, tok: (tok[0], loc))
-        lbr = Literal('{').suppress()
-        rbr = Literal('}').suppress()
-        lp = Literal('(').suppress()
-        rp = Literal(')').suppress()
-        lbk = Literal('[').suppress()
-        rbk = Literal(']').suppress()
-
-        strlist = Group(lbk + Optional(delimitedList(string)) + rbk)
-        setting = (Group(identifier("key") +
-                         eq +
-                         (number | string | strlist)("value")))
-        comment = Group(Literal("#") + SkipTo(LineEnd())).suppress()
-
-        self._expression = Forward()
-
-        arg = Group(self._expression) | string | setting | number
-        args = Group(lp + Optional(delimitedList(arg)) + rp)("args")
-
-        command = Group(functor("name") + args)
-
-        script = Group(functor("name") + args +
-                       lbr +
-                       ZeroOrMore(command | comment.suppress())("contents") +
-                       rbr)
-        self._expression << OneOrMore(script | comment.suppress())
+        # The grammar is built on first use
+        self._expression = None
+
+        # The compiled form of the last parsed text, the hash of that text
+        # and the directory its included files were found in
+        self._cache_key = None
+        self._cache_directory = None
+        self._cache = None
 
     def parse(self):
         """Parse the text currently in the editor."""
-        text = self._editor.toPlainText()
+        return self.parse_text(self._editor.toPlainText())
 
+    def parse_text(self, text):
+        """Parse the given text, reusing the last result if unchanged."""
         if len(text) == 0:
             return
 
+        # An included file can have changed while the script itself didn't,
+        # and the same include names other files in another directory
+        key = script_hash(text)
+        if (key == self._cache_key and
+                self._cache_directory == resources.directory and
+                modules.current(self._cache)):
+            return self._cache
+
+        from pyparsing import ParseException
+
+        if self._expression is None:
+            self._expression = grammar()
+
+        # Problems found in the old text point to the wrong places now
+        PyShowDiagnostics.diagnostics.clear(PyShowDiagnostics.SCRIPT)
+
         try:
-            parsed = self._expression.parseString(text.replace('\t', ' '),
-                                                  parseAll=True)
-            # print(parsed.dump())
-            return parsed
+            with span("parse"):
+                compiled = parse_script(text, self._expression)
         except ParseException as pe:
             # TODO: Make the editor highlight the line with wrong code
-            print(pe)
-            return
+            PyShowDiagnostics.diagnostics.error(pe.msg, pe.loc)
+            compiled = None
+
+        self.install(key, compiled)
+        return compiled
+
+    def install(self, key, compiled):
+        """Use the given compiled script for the text with the given hash."""
+        self._cache_key = key
+        self._cache_directory = resources.directory
+        self._cache = compiled
+
+    def cached_key(self):
+        """Return the hash of the text the cached script belongs to."""
+        return self._cache_key
+
+    def invalidate(self):
+        """Forget the cached compiled script."""
+        self._cache_key = None
+        self._cache_directory = None
+        self._cache = None
 
 
 class PyShowEditorHighlighter(QSyntaxHighlighter):
@@ -124,94 +677,104 @@ class PyShowEditorHighlighter(QSyntaxHighlighter):
     operators = ['+', '-', '*', '/']
     comments = ['%', '#']
 
+    # A single expression finding all tokens in a line. Strings come before
+    # comments, so a # inside a string doesn't start a comment. A string that
+    # is not closed on the same line continues on the next line
+    tokens = re.compile(r"(?P<string>(?P<q>['\"])(?:\\.|(?!(?P=q)).)*(?P=q))"
+                        r"|(?P<open>(?P<o>['\"])(?:\\.|(?!(?P=o)).)*$)"
+                        r"|(?P<comment>#.*)"
+                        r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)"
+                        r"|(?P<number>[0-9]+)")
+    digits = re.compile(r"[0-9]+")
+
+    # The state of a line tells what is still open at its end, so the next
+    # line knows how to start. Qt only highlights the next line again when
+    # this state changes, so an edit doesn't rehighlight the whole document
+    NORMAL = 0
+    IN_SINGLE_QUOTE = 1
+    IN_DOUBLE_QUOTE = 2
+
+    quotes = {"'": IN_SINGLE_QUOTE, '"': IN_DOUBLE_QUOTE}
+
+    # The end of a string that started on a previous line
+    closing = {IN_SINGLE_QUOTE: re.compile(r"(?:\\.|[^'\\])*'"),
+               IN_DOUBLE_QUOTE: re.compile(r'(?:\\.|[^"\\])*"')}
+
     def __init__(self, editor):
         super().__init__(editor)
         self.parent = editor
-        self.highlightingRules = []
-
-        keyword = QTextCharFormat()
-        keyword.setForeground(Qt.GlobalColor.darkBlue)
-        keyword.setFontWeight(QFont.Weight.Bold)
-
-        for word in sectionList:
-            pattern = QRegularExpression("\\b" + word + "\\b")
-            rule = HighlightingRule(pattern, keyword)
-            self.highlightingRules.append(rule)
-
-        keyword = QTextCharFormat()
-        keyword.setForeground(Qt.GlobalColor.blue)
-        keyword.setFontWeight(QFont.Weight.Bold)
-
-        for word in show_functions:
-            pattern = QRegularExpression("\\b" + word + "\\b")
-            rule = HighlightingRule(pattern, keyword)
-            self.highlightingRules.append(rule)
-
-        keyword = QTextCharFormat()
-        keyword.setForeground(Qt.GlobalColor.darkRed)
-        keyword.setFontWeight(QFont.Weight.Bold)
-
-        for word in template_functions:
-            pattern = QRegularExpression("\\b" + word + "\\b")
-            rule = HighlightingRule(pattern, keyword)
-            self.highlightingRules.append(rule)
-
-        keyword = QTextCharFormat()
-        keyword.setForeground(Qt.GlobalColor.darkYellow)
-        keyword.setFontWeight(QFont.Weight.Bold)
 
-        for word in resource_functions:
-            pattern = QRegularExpression("\\b" + word + "\\b")
-            rule = HighlightingRule(pattern, keyword)
-            self.highlightingRules.append(rule)
+        # Every keyword is looked up in a dict with its format, instead of
+        # searching the text for every keyword separately
+        self.keywords = {}
 
-        keyword = QTextCharFormat()
-        keyword.setForeground(Qt.GlobalColor.darkGreen)
-        keyword.setFontWeight(QFont.Weight.Bold)
+        for words, color in ((sectionList, Qt.GlobalColor.darkBlue),
+                             (show_functions, Qt.GlobalColor.blue),
+                             (template_functions, Qt.GlobalColor.darkRed),
+                             (resource_functions, Qt.GlobalColor.darkYellow),
+                             (actionList, Qt.GlobalColor.darkGreen),
+                             (directiveList, Qt.GlobalColor.darkBlue)):
+            keyword = QTextCharFormat()
+            keyword.setForeground(color)
+            keyword.setFontWeight(QFont.Weight.Bold)
 
-        for word in actionList:
-            pattern = QRegularExpression("\\b" + word + "\\b")
-            rule = HighlightingRule(pattern, keyword)
-            self.highlightingRules.append(rule)
+            for word in words:
+                self.keywords.setdefault(word, keyword)
 
         # Integers
-        comment = QTextCharFormat()
-        comment.setForeground(Qt.GlobalColor.red)
-        comment.setFontItalic(True)
-        pattern = QRegularExpression("[0-9]")
-        rule = HighlightingRule(pattern, comment)
-        self.highlightingRules.append(rule)
+        self.number = QTextCharFormat()
+        self.number.setForeground(Qt.GlobalColor.red)
+        self.number.setFontItalic(True)
 
         # Strings
-        string = QTextCharFormat()
-        string.setForeground(Qt.GlobalColor.darkMagenta)
-        string.setFontItalic(True)
-        pattern = QRegularExpression(r"(\"|').*?((?<!\\)(\1))")
-        rule = HighlightingRule(pattern, string)
-        self.highlightingRules.append(rule)
+        self.string = QTextCharFormat()
+        self.string.setForeground(Qt.GlobalColor.darkMagenta)
+        self.string.setFontItalic(True)
 
         # Comments
-        comment = QTextCharFormat()
-        comment.setForeground(Qt.GlobalColor.darkGray)
-        comment.setFontItalic(True)
-        pattern = QRegularExpression("((?<!('|\"))#)[^\n]*")
-        rule = HighlightingRule(pattern, comment)
-        self.highlightingRules.append(rule)
+        self.comment = QTextCharFormat()
+        self.comment.setForeground(Qt.GlobalColor.darkGray)
+        self.comment.setFontItalic(True)
 
     def highlightBlock(self, text):
-        """Process the given text using the highlighting rules."""
-        for rule in self.highlightingRules:
-            iterator = rule.pattern.globalMatch(text)
-            while iterator.hasNext():
-                match = iterator.next()
-                self.setFormat(match.capturedStart(),
-                               match.capturedLength(),
-                               rule.format)
-
-
-class HighlightingRule():
-    """A simple structure that contains the pattern and format for a rule."""
-
-    def __init__(self, pattern, formatting):
-        self.pattern = pattern
-        self.format = formatting
+        """Process the given text in a single pass over all tokens."""
+        state = self.previousBlockState()
+        position = 0
+
+        # First finish a string that was opened on a previous line
+        if state in self.closing:
+            end = self.closing[state].match(text)
+
+            if end is None:
+                self.setFormat(0, len(text), self.string)
+                self.setCurrentBlockState(state)
+                return
+
+            position = end.end()
+            self.setFormat(0, position, self.string)
+
+        self.setCurrentBlockState(self.NORMAL)
+
+        for match in self.tokens.finditer(text, position):
+            kind = match.lastgroup
+            start = match.start()
+
+            if kind == "word":
+                word = match.group()
+                if word in self.keywords:
+                    self.setFormat(start, len(word), self.keywords[word])
+                elif not word.isalpha():
+                    # Digits inside names are highlighted like numbers
+                    for digits in self.digits.finditer(word):
+                        self.setFormat(start + digits.start(),
+                                       len(digits.group()),
+                                       self.number)
+            elif kind == "number":
+                self.setFormat(start, match.end() - start, self.number)
+            elif kind == "string":
+                self.setFormat(start, match.end() - start, self.string)
+            elif kind == "open":
+                self.setFormat(start, match.end() - start, self.string)
+                self.setCurrentBlockState(self.quotes[match.group("o")])
+            else:
+                self.setFormat(start, match.end() - start, self.comment)
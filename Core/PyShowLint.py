@@ -0,0 +1,227 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions to check scripts and projects without showing them.
+
+A script is parsed, and every frame of the show is evaluated, but nothing is
+drawn. All problems the parser and evaluator report are collected, with the
+line and column they belong to. Many files can be checked at the same time
+in separate processes.
+"""
+
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile, BadZipFile
+from Core.PyShowLanguage import grammar, parse_script
+from Core.PyShowEvaluator import frames, evaluate
+from Core.PyShowDiagnostics import (PyShowDiagnostics, diagnostics, line_of,
+                                    ERROR)
+
+# The grammar is made once per process, as making it is not cheap
+_expression = None
+
+# Errors raised when a file is not a readable script or project
+READ_ERRORS = (OSError, KeyError, BadZipFile, UnicodeDecodeError)
+
+
+def read_script(filename):
+    """Return the script text and cached show (or None) of a file."""
+    if not filename.endswith('.psp'):
+        with open(filename, encoding='utf-8') as file:
+            return file.read(), None
+
+    # Only import the cache (and with it Qt) when there are projects
+    from Core.PyShowCache import read_cache
+
+    with ZipFile(filename, 'r') as zip:
+        with io.TextIOWrapper(zip.open('main.script'), encoding='utf-8') as script:
+            text = script.read()
+
+        cache = read_cache(zip, text)
+
+    return text, cache[0] if cache is not None else None
+
+
+def read_error(filename, error):
+    """Return the result of a file that could not be read."""
+    return {"file": filename,
+            "diagnostics": [{"level": ERROR,
+                             "source": "file",
+                             "message": str(error),
+                             "line": None,
+                             "column": None,
+                             "count": 1}]}
+
+
+def file_result(filename, text, entries):
+    """Return the result of a file, with the diagnostics reported for it."""
+    result = {"file": filename, "diagnostics": []}
+
+    for entry in entries:
+        line = column = None
+        if entry.loc is not None:
+            line = line_of(text, entry.loc)
+            column = entry.loc - text.rfind("\n", 0, entry.loc)
+
+        result["diagnostics"].append({"level": entry.level,
+                                      "source": entry.source,
+                                      "message": entry.message,
+                                      "line": line,
+                                      "column": column,
+                                      "count": entry.count})
+
+    # Sorted by place in the file, so the output is the same every time
+    result["diagnostics"].sort(key=lambda entry: (entry["line"] or 0,
+                                                  entry["column"] or 0))
+
+    return result
+
+
+def report(results, as_json=False, file=None):
+    """Write the results of files, and return the exit code for them."""
+    if file is None:
+        file = sys.stdout
+
+    if as_json:
+        json.dump(results, file, indent=2)
+        print(file=file)
+    else:
+        for result in results:
+            for entry in result["diagnostics"]:
+                print("%s:%s:%s: %s: %s" % (result["file"],
+                                            entry["line"] or 0,
+                                            entry["column"] or 0,
+                                            entry["level"],
+                                            entry["message"]), file=file)
+
+    errors = any(entry["level"] == ERROR
+                 for result in results
+                 for entry in result["diagnostics"])
+    return 1 if errors else 0
+
+
+def run_script(filename, action):
+    """Read a script or project, pass it to an action and report problems.
+
+    The action gets the text and compiled show. The returned exit code is 1
+    if the file can not be read or parsed, or if an error was reported.
+    """
+    from pyparsing import ParseException
+
+    # Images and included files are relative to the file
+    from Core.PyShowResources import resources
+    resources.directory = os.path.dirname(os.path.abspath(filename))
+
+    try:
+        text, show = read_script(filename)
+    except READ_ERRORS as error:
+        return report([read_error(filename, error)], file=sys.stderr)
+
+    # Any other exception is a bug, but is reported like a problem in the
+    # file, so the command line never stops with a traceback
+    try:
+        if show is None:
+            show = parse_script(text)
+        action(text, show)
+    except ParseException as pe:
+        diagnostics.error(pe.msg, pe.loc)
+    except Exception as error:
+        diagnostics.error(internal_error(error))
+
+    return report([file_result(filename, text, diagnostics.entries())],
+                  file=sys.stderr)
+
+
+def internal_error(error):
+    """Return the message of an unexpected exception."""
+    return "internal error: %s: %s" % (type(error).__name__, error)
+
+
+def lint_show(show, diagnostics):
+    """Evaluate every frame of a compiled show, reporting all problems."""
+    for cursor in frames(show):
+        evaluate(show, cursor, diagnostics)
+
+    # Commands before the first newSlide are not part of any frame, but
+    # can still be wrong
+    for blocknr, block in enumerate(show):
+        if (block.name == "beginShow" and block.contents and
+                block.contents[0].name != "newSlide"):
+            evaluate(show, (blocknr, 0), diagnostics)
+
+
+def lint_text(text, show=None, directory=''):
+    """Return the diagnostics of a script, parsing it if not compiled yet."""
+    global _expression
+
+    from pyparsing import ParseException
+
+    diagnostics = PyShowDiagnostics()
+
+    if show is None:
+        if _expression is None:
+            _expression = grammar()
+
+        try:
+            show = parse_script(text, _expression, directory)
+        except ParseException as pe:
+            diagnostics.error(pe.msg, pe.loc)
+            show = ()
+
+    # A bug in evaluating must not stop checking the other files
+    try:
+        lint_show(show, diagnostics)
+    except Exception as error:
+        diagnostics.error(internal_error(error))
+
+    return diagnostics.entries()
+
+
+def lint_file(filename):
+    """Return the result of checking a script or project file."""
+    try:
+        text, show = read_script(filename)
+    except READ_ERRORS as error:
+        return read_error(filename, error)
+
+    # Included files are relative to the checked file
+    return file_result(filename, text,
+                       lint_text(text, show,
+                                 os.path.dirname(os.path.abspath(filename))))
+
+
+def job_count(value):
+    """Return a number of jobs given on the command line."""
+    # A ValueError makes argparse report the value as invalid
+    jobs = int(value)
+    if jobs < 1:
+        raise ValueError(value)
+
+    return jobs
+
+
+def lint_files(filenames, jobs=None):
+    """Check many files, in parallel if there is more than one."""
+    if len(filenames) < 2 or jobs == 1:
+        return [lint_file(filename) for filename in filenames]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(lint_file, filenames))
@@ -0,0 +1,90 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions to print a show, or write it to a PDF file.
+
+Frames are evaluated and drawn one at a time, straight onto the pages, so
+printing a show of any length takes the same amount of memory. Text is
+drawn as text instead of as an image of the slide, so it stays sharp and
+can be selected. Images come from the resource cache, and as the PDF
+writer recognizes an image it has seen before, every image is stored in
+the file only once.
+"""
+
+from PyQt6.QtCore import QMarginsF, QRect, QSizeF
+from PyQt6.QtGui import QPageSize, QPainter, QPdfWriter
+from Core.PyShowEvaluator import frames, evaluate
+from Core.PyShowRenderer import draw, SLIDE_SIZE
+
+# Resolution of PDF files. With this, a slide is 13.33 by 7.5 inch, the
+# size of most widescreen presentations
+PDF_RESOLUTION = 144
+
+
+def print_show(device, show, progress=None):
+    """Draw every frame of a show on its own page. Return False if canceled."""
+    cursors = frames(show)
+
+    painter = QPainter()
+    if not painter.begin(device):
+        return False
+
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+
+    # The slide is as large as fits on the page, in the middle of it
+    scale = min(device.width()/SLIDE_SIZE[0], device.height()/SLIDE_SIZE[1])
+    painter.translate((device.width() - SLIDE_SIZE[0]*scale)/2,
+                      (device.height() - SLIDE_SIZE[1]*scale)/2)
+    painter.scale(scale, scale)
+    painter.setClipRect(QRect(0, 0, SLIDE_SIZE[0], SLIDE_SIZE[1]))
+
+    completed = True
+
+    for number, cursor in enumerate(cursors):
+        if number:
+            device.newPage()
+
+        # Only the state of this frame is kept while drawing it
+        painter.save()
+        draw(painter, evaluate(show, cursor))
+        painter.restore()
+
+        if progress is not None and not progress(number + 1, len(cursors)):
+            completed = False
+            break
+
+    painter.end()
+
+    return completed
+
+
+def export_pdf(show, filename, title='', progress=None):
+    """Write every frame of a show to a PDF file. Return False if canceled."""
+    writer = QPdfWriter(filename)
+    writer.setResolution(PDF_RESOLUTION)
+    writer.setPageSize(QPageSize(QSizeF(SLIDE_SIZE[0]/PDF_RESOLUTION,
+                                        SLIDE_SIZE[1]/PDF_RESOLUTION),
+                                 QPageSize.Unit.Inch,
+                                 'PyShow'))
+    writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+    writer.setTitle(title)
+    writer.setCreator('PyShow')
+
+    return print_show(writer, show, progress)
@@ -23,9 +23,22 @@ extended soon to a data structure that can also contain images, multiple
 scripts and other files related to the presentation.
 """
 
-from PyQt6.QtWidgets import QFileDialog
+from PyQt6.QtWidgets import QFileDialog, QMessageBox
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+import hashlib
 import io
-from zipfile import ZipFile
+import os
+import threading
+from zipfile import ZipFile, BadZipFile
+from Core.PyShowAutosave import (PyShowAutosave, write_project, autosave_name,
+                                 untitled_autosaves, read_autosave)
+from Core.PyShowCache import (project_files, read_cache, thumbnail,
+                              PyShowCacheValidator)
+from Core.PyShowLanguage import script_hash
+from Core.PyShowResources import resources
+
+# Time in ms after opening a project before the cache is validated
+CACHE_VALIDATION_DELAY = 2000
 
 
 class PyShowProject:
@@ -35,37 +48,86 @@ class PyShowProject:
         self._mainwindow = mainwindow
 
         self._filename = ''
-        self._lastsaved = ''
         self.opened = False
 
-        self._mainwindow.editor.textChanged.connect(self.text_edited)
+        # Instead of the saved text itself, only remember its length and hash.
+        # The document keeps track of the modified state through its undo
+        # stack, these are only used to notice that the user typed the saved
+        # text back by hand
+        self._lastsaved_length = 0
+        self._lastsaved_hash = text_hash('')
+        self._cleancheck = PyShowCleanCheck(self)
+
+        self._validator = PyShowCacheValidator()
+        self._validator.invalid.connect(self.cache_invalid)
+
+        self._autosave = PyShowAutosave(self)
+        self._autosave.saved.connect(self.autosaved)
+        self._autosave.failed.connect(self.autosave_failed)
+
+        document = self.document()
+        document.modificationChanged.connect(self.text_edited)
+        self._mainwindow.editor.textChanged.connect(self._autosave.schedule)
+        self._mainwindow.editor.textChanged.connect(self._cleancheck.schedule)
 
     def new(self):
         """Start a new project."""
         self.close()
         self.opened = True
 
-    def open(self):
-        """Open an existing project from file."""
-        filename = QFileDialog.getOpenFileName(self._mainwindow,
-                                               'Open Project',
-                                               '',
-                                               'PyShow Project (*.psp);;All Files(*)')[0]
+    def open(self, filename=None):
+        """Open an existing project from file, asking for it if not given."""
+        if filename is None:
+            filename = QFileDialog.getOpenFileName(self._mainwindow,
+                                                   'Open Project',
+                                                   '',
+                                                   'PyShow Project (*.psp);;All Files(*)')[0]
 
         if filename:
             self.close()
 
+            resources.directory = os.path.dirname(os.path.abspath(filename))
+
+            # A file that can't be read leaves the empty project open
+            try:
+                with ZipFile(filename, 'r') as zip:
+                    with io.TextIOWrapper(zip.open('main.script'),
+                                          encoding='utf-8') as script:
+                        text = script.read()
+
+                    cache = read_cache(zip, text)
+            except (OSError, KeyError, BadZipFile, UnicodeDecodeError) as error:
+                resources.directory = ''
+                self.opened = True
+                QMessageBox.warning(self._mainwindow,
+                                    "PyShow",
+                                    "The project '%s' can not be opened:\n\n%s"
+                                    % (filename, error))
+                return
+
             self._filename = filename
 
-            with ZipFile(filename, 'r') as zip:
-                with io.TextIOWrapper(zip.open('main.script')) as script:
-                    text = script.read()
+            # Use the compiled script and thumbnails from the project right
+            # away, and check them in the background a bit later
+            if cache is not None:
+                show, thumbnails = cache
+                self.parser().install(script_hash(text), show)
+                if thumbnails:
+                    self._mainwindow.preview().set_placeholder(thumbnail(thumbnails[0]))
+                QTimer.singleShot(CACHE_VALIDATION_DELAY,
+                                  lambda: self._validator.validate(text, show))
 
-                    self._mainwindow.editor.setText(text)
+            self._mainwindow.editor.setPlainText(text)
+            self.set_saved(text)
 
-                    self._lastsaved = text
-                    self.text_edited()
-                self.opened = True
+            # If PyShow crashed before, offer the autosaved copy instead
+            recovered = self.recover()
+            if recovered is not None:
+                self._mainwindow.editor.setPlainText(recovered)
+                self.document().setModified(True)
+
+            self.text_edited()
+            self.opened = True
 
     def save(self):
         """Save the existing project, if a project is open."""
@@ -73,7 +135,8 @@ class PyShowProject:
             return True
 
         # If no filename is set yet, ask for one
-        if not self._filename:
+        untitled = not self._filename
+        if untitled:
             self._filename = QFileDialog.getSaveFileName(self._mainwindow,
                                                          'Save Project',
                                                          '',
@@ -82,38 +145,129 @@ class PyShowProject:
         # Now save the file, but always check because the user could have
         # canceled
         if self._filename:
-            text = self._mainwindow.editor.toPlainText()
+            resources.directory = os.path.dirname(os.path.abspath(self._filename))
+            text = self.text()
+
+            # Writing the script is quick, so it is saved right away. The
+            # worker thread then writes it again with the compiled script
+            # and the thumbnails, unless it is saved again before that
+            directory = resources.directory
+            self._autosave.wait(self._filename)
+            write_project(self._filename, {'main.script': text})
+            self._autosave.write_later(self._filename,
+                                       lambda: project_files(text, directory))
+
+            # The autosave of an untitled project is left behind under the
+            # temporary name, so remove both
+            self._autosave.discard(self._filename)
+            if untitled:
+                self._autosave.discard('')
+
+            self.set_saved(text)
+            self.text_edited()
+            self.opened = True
 
-            with ZipFile(self._filename, 'w') as zip:
-                zip.writestr('main.script', text)
-
-                self._lastsaved = text
-                self.text_edited()
-                self.opened = True
-
-                return True
+            return True
 
         return False
 
+    def recover(self):
+        """Return the text of a newer autosave of the project, if wanted."""
+        autosave = autosave_name(self._filename)
+
+        if (not os.path.exists(autosave) or
+                os.path.getmtime(autosave) <= os.path.getmtime(self._filename)):
+            return None
+
+        reply = QMessageBox.question(self._mainwindow,
+                                     "PyShow",
+                                     "An autosaved copy of this project, "
+                                     "newer than the project itself, was "
+                                     "found.\n\nDo you want to recover it?")
+
+        if reply != QMessageBox.StandardButton.Yes:
+            return None
+
+        return read_autosave(autosave)
+
+    def recover_untitled(self):
+        """Offer the autosave of an untitled project of a crashed PyShow."""
+        autosaves = untitled_autosaves()
+        if not autosaves or self._filename or self.changed():
+            return
+
+        reply = QMessageBox.question(self._mainwindow,
+                                     "PyShow",
+                                     "An autosaved untitled project, left "
+                                     "behind by PyShow closing unexpectedly, "
+                                     "was found.\n\nDo you want to recover it?")
+
+        text = None
+        if reply == QMessageBox.StandardButton.Yes:
+            text = read_autosave(autosaves[0])
+
+        # Either way the autosave is dealt with. When recovered, the text is
+        # autosaved again under the name of this instance
+        try:
+            os.remove(autosaves[0])
+        except OSError:
+            pass
+
+        if text is not None:
+            self._mainwindow.editor.setPlainText(text)
+            self.document().setModified(True)
+            self.text_edited()
+
+    def cache_invalid(self, key):
+        """Call when the compiled script cached in the project was wrong."""
+        parser = self.parser()
+
+        if parser.cached_key() == key:
+            parser.invalidate()
+            self._mainwindow.updatepreview()
+
+    def autosaved(self, filename):
+        """Call when the worker thread has written an autosave file."""
+        self._mainwindow.statusBar().showMessage('Autosaved to ' + filename,
+                                                 5000)
+
+    def autosave_failed(self, error):
+        """Call when writing or removing an autosave file failed."""
+        self._mainwindow.statusBar().showMessage('Autosave failed: ' + error,
+                                                 5000)
+
     def close(self):
         """Close the project, get the GUI in order after that."""
+        if self.opened:
+            self._autosave.discard(self._filename)
+
         self._filename = ""
+        resources.directory = ''
 
-        self._mainwindow.editor.setText('')
+        self._mainwindow.editor.setPlainText('')
 
-        self._lastsaved = ""
+        # Setting the text can leave the title marked as changed, even when
+        # the document isn't modified afterwards
+        self.set_saved('')
         self.opened = False
-        self._mainwindow.enable_action('file_save', False)
+        self.text_edited()
+
+    def set_saved(self, text):
+        """Mark the given text, currently in the editor, as saved."""
+        self._lastsaved_length = len(text)
+        self._lastsaved_hash = text_hash(text)
+        self.document().setModified(False)
 
     def changed(self):
         """Return whether the text was changed compared to the last save."""
-        if self._lastsaved == self._mainwindow.editor.toPlainText():
-            return False
+        return self.document().isModified()
 
-        return True
+    def saved(self):
+        """Return the length and hash of the last saved text."""
+        return self._lastsaved_length, self._lastsaved_hash
 
     def text_edited(self):
-        """Trigger when text in the editor is changed."""
+        """Trigger when the modified state of the editor text changes."""
         if self._filename:
             name = self._filename
         else:
@@ -126,9 +280,84 @@ class PyShowProject:
             self._mainwindow.setWindowTitle('PyShow - ' + name + '*')
             self._mainwindow.enable_action('file_save', True)
 
+    def parser(self):
+        """Return the parser of the editor."""
+        return self._mainwindow.editor.parser()
+
+    def document(self):
+        """Return the text document of the editor."""
+        return self._mainwindow.editor.document()
+
+    def text(self):
+        """Return the text currently in the editor."""
+        return self._mainwindow.editor.toPlainText()
+
+    def filename(self):
+        """Return the file name of the project, empty if never saved."""
+        return self._filename
+
     def name(self):
         """Return the name of the current file, or Untitled if none."""
         if self._filename:
             return self._filename
         else:
             return 'Untitled'
+
+
+def text_hash(text):
+    """Return a hash of a text, to compare it with the saved text."""
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+class PyShowCleanCheck(QObject):
+    """Checks in the background if the text is equal to the saved text."""
+
+    clean = pyqtSignal(int)
+
+    # Time in ms the editor has to be idle before the check is done
+    DELAY = 500
+
+    def __init__(self, project):
+        super().__init__()
+
+        self._project = project
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DELAY)
+        self._timer.timeout.connect(self.run)
+
+        self.clean.connect(self.mark_clean)
+
+    def schedule(self):
+        """Check after a short while, if the text could be the saved text."""
+        document = self._project.document()
+
+        # The character count includes the final paragraph separator. If the
+        # length differs from the saved text, the text cannot be equal, so
+        # the (expensive) check is only done for text of the right length
+        if (document.isModified() and
+                document.characterCount() - 1 == self._project.saved()[0]):
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def run(self):
+        """Snapshot the text and hash it in a worker thread."""
+        document = self._project.document()
+        revision = document.revision()
+        text = document.toPlainText()
+        saved = self._project.saved()[1]
+
+        def work():
+            if text_hash(text) == saved:
+                self.clean.emit(revision)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def mark_clean(self, revision):
+        """Mark the document as unmodified, if it wasn't edited meanwhile."""
+        document = self._project.document()
+
+        if document.revision() == revision:
+            document.setModified(False)
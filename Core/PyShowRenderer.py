@@ -0,0 +1,299 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions to draw an evaluated slide state.
+
+Drawing is done on any QPainter, in slide coordinates, so the same code is
+used for the preview, thumbnails, and anything else that shows a slide.
+Slides can be drawn in any thread.
+"""
+
+import threading
+from collections import namedtuple, OrderedDict
+from PyQt6.QtCore import QRect, QRectF, QByteArray, QBuffer, QIODevice, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPen
+from Core.PyShowResources import resources
+
+# The size of the slides in pixels
+SLIDE_SIZE = (1920, 1080)
+
+# Flags for drawing text. Combining Qt flags is slow compared to drawing a
+# line of text, so it is done once, as plain numbers
+TEXT_FLAGS = (Qt.TextFlag.TextWordWrap | Qt.TextFlag.TextDontClip |
+              Qt.TextFlag.TextExpandTabs).value
+BULLET_FLAGS = Qt.TextFlag.TextWordWrap.value
+
+# Text alignment
+ALIGNMENTS = {"left": Qt.AlignmentFlag.AlignLeft.value,
+              "right": Qt.AlignmentFlag.AlignRight.value,
+              "center": Qt.AlignmentFlag.AlignCenter.value,
+              "justify": Qt.AlignmentFlag.AlignJustify.value}
+
+# A text drawn for an object, with the rectangle it ends up in
+PyShowText = namedtuple('PyShowText', 'font rect flags text bounds')
+
+# The texts of at most this many objects are remembered
+MAX_LAYOUTS = 256
+
+# Fonts are made once for every combination of properties, and the texts
+# of objects once for every object. Every thread has its own fonts, as a
+# QFont can't be used by two threads at the same time
+_local = threading.local()
+
+
+def freeze(entry):
+    """Return an object as something that can be used as a key."""
+    return tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                        for key, value in entry.items()))
+
+
+def font(entry):
+    """Return the QFont for the font properties of an object."""
+    key = (entry["fontname"], entry["fontsize"], entry["decoration"])
+
+    if not hasattr(_local, "fonts"):
+        _local.fonts = {}
+    fonts = _local.fonts
+
+    if key not in fonts:
+        fnt = QFont()
+
+        if entry["fontname"]:
+            fnt.setFamily(entry["fontname"])
+
+        if entry["fontsize"]:
+            fnt.setPixelSize(int(entry["fontsize"]))
+
+        fnt.setItalic("i" in entry["decoration"])
+        fnt.setBold("b" in entry["decoration"])
+        fnt.setUnderline("u" in entry["decoration"])
+        fnt.setFixedPitch("f" in entry["decoration"])
+        fnt.setKerning("k" in entry["decoration"])
+        fnt.setOverline("o" in entry["decoration"])
+        fnt.setStrikeOut("s" in entry["decoration"])
+
+        # Other properties
+        # Capitalization
+        # Hinting
+        # Letter Spacing
+        # Stretch
+        # Style, Stylehint, Stylename, Stylestrategy
+        # Word spacing
+        # Weight
+
+        fonts[key] = fnt
+
+    return fonts[key]
+
+
+def draw(painter, state, size=SLIDE_SIZE):
+    """Draw a slide state with the painter, in slide coordinates."""
+    if state is None:
+        return
+
+    # First, treat the background separately, if set
+    if state["background_color"]:
+        painter.fillRect(QRect(0, 0, size[0], size[1]),
+                         QColor(state["background_color"]))
+
+    # Now go through the drawing list, and execute
+    for task in state["objects"].values():
+        draw_object(painter, task)
+
+
+def draw_object(painter, task, area=None):
+    """Draw a single object of a slide state, or only its part in an area."""
+    if task["type"] == "image":
+        draw_image(painter, task)
+        return
+
+    painter.setPen(QPen(QColor(task["color"])))
+
+    for part in layout(task):
+        if area is not None and not part.bounds.intersects(area):
+            continue
+
+        painter.setFont(part.font)
+        painter.drawText(part.rect, part.flags, part.text)
+
+
+def layout(task):
+    """Return the texts drawn for an object."""
+    key = freeze(task)
+
+    if not hasattr(_local, "layouts"):
+        _local.layouts = OrderedDict()
+    layouts = _local.layouts
+
+    if key in layouts:
+        layouts.move_to_end(key)
+    else:
+        layouts[key] = make_layout(task)
+        if len(layouts) > MAX_LAYOUTS:
+            layouts.popitem(last=False)
+
+    return layouts[key]
+
+
+def text(fnt, rect, flags, string):
+    """Return a text drawn for an object."""
+    # Only the text itself is drawn, which can be smaller than its box but
+    # also run outside of it, as text is not clipped
+    return PyShowText(fnt, rect, flags, string,
+                      QRectF(QFontMetrics(fnt).boundingRect(rect, flags, string)))
+
+
+def make_layout(task):
+    """Return the font, rectangle, flags and text of every text drawn."""
+    alignment = ALIGNMENTS.get(task["alignment"], ALIGNMENTS["left"])
+    flags = TEXT_FLAGS | alignment
+
+    fnt = font(task)
+    texts = []
+
+    if task["type"] == "text":
+        texts.append(text(fnt,
+                          QRect(int(task["x"]),
+                                int(task["y"]),
+                                int(task["width"]),
+                                int(task["height"])),
+                          flags,
+                          task["text"]))
+    if task["type"] == "list":
+        # Loop through the list
+        fm = QFontMetrics(fnt)
+        nextheight = 0
+
+        if task["bullet_type"] == "c":
+            bullet_font = QFont(fnt)
+            bullet_font.setPixelSize(int(bullet_font.pixelSize()
+                                         * task["bullet_size"]))
+
+        for item in task["text"]:
+            texts.append(text(fnt,
+                              QRect(int(task["x"]),
+                                    int(task["y"] + nextheight),
+                                    int(task["width"]),
+                                    int(task["height"])),
+                              flags,
+                              item))
+
+            if task["bullet_type"] == "c":
+                texts.append(text(bullet_font,
+                                  QRect(int(task["x"]
+                                        - task["bullet_spacing"]),
+                                        int(task["y"]
+                                        - (task["bullet_size"]-1)*fnt.pixelSize()*0.7
+                                        - task["bullet_offset"]
+                                        + nextheight),
+                                        int(task["width"]),
+                                        int(task["height"])),
+                                  BULLET_FLAGS | alignment,
+                                  task["bullet"]))
+
+            r = fm.boundingRect(0, 0, int(task["width"]), 999999,
+                                flags,
+                                item)
+            nextheight = nextheight + r.height()
+
+    return texts
+
+
+def bounds(task):
+    """Return the rectangle an object draws in, in slide coordinates."""
+    if task["type"] == "image":
+        return image_rect(task)[1]
+
+    rect = QRectF()
+    for part in layout(task):
+        rect = rect.united(part.bounds)
+
+    return rect
+
+
+def image_rect(task):
+    """Return the image of an image object and where it is drawn."""
+    image = resources.image(task["file"]) if task["file"] else None
+    width = task["width"]
+    height = task["height"]
+
+    if image is None:
+        # Show where the image should have been
+        return None, QRectF(task["x"], task["y"], width or 400, height or 300)
+
+    # If only one of the sizes is given, keep the aspect ratio of the image
+    if width is None and height is None:
+        width, height = image.width(), image.height()
+    elif width is None:
+        width = height*image.width()/image.height()
+    elif height is None:
+        height = width*image.height()/image.width()
+
+    return image, QRectF(task["x"], task["y"], width, height)
+
+
+def draw_image(painter, task):
+    """Draw an image object."""
+    image, rect = image_rect(task)
+
+    if image is None:
+        painter.setPen(QPen(QColor("#999")))
+        painter.fillRect(rect, QColor("#DDD"))
+        painter.drawRect(rect)
+        painter.drawLine(rect.topLeft(), rect.bottomRight())
+        painter.drawLine(rect.topRight(), rect.bottomLeft())
+        return
+
+    painter.drawImage(rect, image)
+
+
+def render(state, scale=1.0, size=SLIDE_SIZE):
+    """Render a slide state to an image, optionally scaled down."""
+    image = QImage(int(size[0]*scale), int(size[1]*scale),
+                   QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.white)
+
+    painter = QPainter()
+    painter.begin(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+    painter.scale(scale, scale)
+    draw(painter, state, size)
+    painter.end()
+
+    return image
+
+
+def image_to_png(image):
+    """Return the PNG encoded data of an image."""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+
+    return bytes(data)
+
+
+def png_to_image(data):
+    """Return the image decoded from PNG data."""
+    image = QImage()
+    image.loadFromData(data, "PNG")
+
+    return image
@@ -0,0 +1,116 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class for loading the resources used on slides, like images.
+
+Decoding a photo takes much longer than drawing it, so every image is only
+decoded once and kept in a cache, for the preview, the presenter and every
+thread rendering frames in the background. The cache is limited in size;
+the images used longest ago are dropped first.
+
+Images don't have to come from files: a bundle provides a function that
+loads each of its images, by the file name used in the script.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from PyQt6.QtGui import QImage
+from Core.PyShowDiagnostics import diagnostics
+
+# Maximum size in bytes of all decoded images in the cache
+RESOURCE_CACHE_SIZE = 512*1024*1024
+
+
+class PyShowResources:
+    """A cache of decoded images, shared by everything that draws slides."""
+
+    def __init__(self, limit=RESOURCE_CACHE_SIZE):
+        # Relative file names are relative to this directory, which is the
+        # directory of the project
+        self.directory = ''
+
+        self._limit = limit
+        self._images = OrderedDict()
+        self._providers = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def provide(self, filename, load):
+        """Load the image with this file name with a function from now on."""
+        with self._lock:
+            self._providers[filename] = load
+
+    def image(self, filename):
+        """Return the decoded image in a file, or None if it can't be read."""
+        with self._lock:
+            load = self._providers.get(filename)
+
+        if load is not None:
+            key = (None, filename)
+        else:
+            path = os.path.join(self.directory, filename)
+
+            # The modification time is part of the key, so a changed file
+            # is loaded again
+            try:
+                key = (path, os.path.getmtime(path))
+            except OSError:
+                diagnostics.warning("image '%s' not found" % (filename))
+                return None
+
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+
+        # Decoding happens outside the lock, so other threads can use the
+        # cache in the meantime
+        image = load() if load is not None else QImage(path)
+
+        if image.isNull():
+            diagnostics.warning("image '%s' can not be read" % (filename))
+            return None
+
+        # This format is the fastest to draw
+        if image.format() != QImage.Format.Format_ARGB32_Premultiplied:
+            image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._size += image.sizeInBytes()
+
+            # Always keep the newest image, even if it is larger than the
+            # whole cache
+            while self._size > self._limit and len(self._images) > 1:
+                _, dropped = self._images.popitem(last=False)
+                self._size -= dropped.sizeInBytes()
+
+            return self._images[key]
+
+    def clear(self):
+        """Remove all images from the cache."""
+        with self._lock:
+            self._images.clear()
+            self._providers.clear()
+            self._size = 0
+
+
+# The cache used by the application
+resources = PyShowResources()
@@ -0,0 +1,217 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class for the index of all frames in a show, for quick navigation.
+
+The timeline lists every frame with its number, place in the script and a
+title taken from the text on the slide. Finding the title of a frame means
+evaluating it, so titles are remembered by the script text of the slide and
+its template: after a change of the script, only the slides that actually
+changed are evaluated again.
+"""
+
+import bisect
+from collections import namedtuple
+from Core.PyShowLanguage import args_key
+from Core.PyShowEvaluator import frames, evaluate
+from Core.PyShowDiagnostics import PyShowDiagnostics
+
+# A frame in the timeline. The number starts at 1, the cursor is the block
+# and command of the frame, the location is the place of that command in
+# the script text
+PyShowTimelineEntry = namedtuple('PyShowTimelineEntry',
+                                 'number cursor loc title')
+
+
+def title(state):
+    """Return the title of a frame from the text on it, or None."""
+    if state is None:
+        return None
+
+    # An object called 'Title' is the best guess, otherwise the first text
+    # on the slide
+    objects = state["objects"]
+    candidates = list(objects.values())
+    if "Title" in objects:
+        candidates.insert(0, objects["Title"])
+
+    for entry in candidates:
+        if entry["type"] not in ("text", "list") or not entry["text"]:
+            continue
+
+        text = entry["text"]
+        if isinstance(text, list):
+            text = text[0]
+
+        text = text.strip().split("\n")[0]
+        if text:
+            return text
+
+    return None
+
+
+def source(text, start, stop, commands):
+    """Return the text of commands, with their compiled form if not in it."""
+    # Included commands and the commands of a function call have the
+    # location of the include directive or the call, so their own text is
+    # somewhere else
+    if all(text.startswith(command.name, command.loc) for command in commands):
+        return text[start:stop]
+
+    return (text[start:stop],
+            tuple((command.name, args_key(command.args)) for command in commands))
+
+
+def block_end(show, blocknr, text):
+    """Return the position in the text where a block ends."""
+    if blocknr + 1 < len(show):
+        return show[blocknr + 1].loc
+
+    return len(text)
+
+
+class PyShowTimeline:
+    """The frames of a show with their titles."""
+
+    def __init__(self):
+        self._show = None
+        self._entries = []
+        self._cursors = []
+
+        # Titles by the text of the template and slide, and the position of
+        # the frame in the slide
+        self._titles = {}
+
+        # The last search, so typing more characters only searches in the
+        # entries that matched before
+        self._query = None
+        self._results = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def update(self, text, show):
+        """Update the timeline to a new version of the script."""
+        if show is self._show:
+            return
+
+        self._show = show
+        self._query = None
+        self._entries = []
+        self._cursors = []
+
+        if show is None:
+            return
+
+        # The text of every template, by name
+        templates = {}
+        for blocknr, block in enumerate(show):
+            if block.name == "beginTemplate" and block.args:
+                templates.setdefault(block.args[0],
+                                     source(text,
+                                            block.loc,
+                                            block_end(show, blocknr, text),
+                                            block.contents))
+
+        titles = {}
+        diagnostics = PyShowDiagnostics()
+        slide = None
+
+        for number, cursor in enumerate(frames(show), 1):
+            blocknr, position = cursor
+            contents = show[blocknr].contents
+
+            # The text of the slide runs from its newSlide to the next one
+            start = position
+            while contents[start].name != "newSlide":
+                start -= 1
+
+            if slide is None or slide[0] != (blocknr, start):
+                end = start + 1
+                while end < len(contents) and contents[end].name != "newSlide":
+                    end += 1
+
+                if end < len(contents):
+                    stop = contents[end].loc
+                else:
+                    stop = block_end(show, blocknr, text)
+
+                name = contents[start].args[0] if contents[start].args else None
+                slide = ((blocknr, start),
+                         templates.get(name),
+                         source(text, contents[start].loc, stop,
+                                contents[start:end]))
+
+            key = (slide[1], slide[2], position - start)
+
+            if key in self._titles:
+                titles[key] = self._titles[key]
+            elif key not in titles:
+                titles[key] = title(evaluate(show, cursor, diagnostics))
+
+            self._entries.append(PyShowTimelineEntry(number,
+                                                     cursor,
+                                                     contents[position].loc,
+                                                     titles[key] or
+                                                     "Frame %d" % number))
+            self._cursors.append(cursor)
+
+        # Titles of slides that are gone are forgotten
+        self._titles = titles
+
+    def restore(self, entries):
+        """Use frames stored earlier, without evaluating anything."""
+        self._show = None
+        self._query = None
+        self._titles = {}
+        self._entries = [PyShowTimelineEntry(number, tuple(cursor), loc, title)
+                         for number, cursor, loc, title in entries]
+        self._cursors = [entry.cursor for entry in self._entries]
+
+    def entry(self, number):
+        """Return the frame with the given number, or None."""
+        if 1 <= number <= len(self._entries):
+            return self._entries[number - 1]
+
+        return None
+
+    def index(self, cursor):
+        """Return the index of the first frame at or after a cursor."""
+        return min(bisect.bisect_left(self._cursors, cursor),
+                   len(self._entries) - 1)
+
+    def search(self, query):
+        """Return the frames with the query in their title."""
+        query = query.lower()
+
+        if self._query is not None and query.startswith(self._query):
+            candidates = self._results
+        else:
+            candidates = self._entries
+
+        self._query = query
+        self._results = [entry for entry in candidates
+                         if query in entry.title.lower()]
+
+        return self._results
@@ -0,0 +1,171 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Functions for timing where PyShow spends its time.
+
+During startup, marks are placed at important moments. The startup report
+lists the time between these marks, so it is easy to see which part of the
+startup is slow. Frame counters keep the duration of the last frames of
+something that is drawn often, like the editor.
+
+Named spans are placed around the hot paths (parsing, evaluating, drawing).
+The last durations of every span are kept to calculate percentiles. When the
+PYSHOW_TRACE environment variable is set to a file name, all spans are also
+written to that file at exit, in the trace event format that can be opened
+in chrome://tracing or Perfetto.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# The moment this module was imported, which is close to the start of the
+# program, as it is the first thing main.py imports
+_origin = time.perf_counter()
+_marks = []
+
+# Whether the startup report is printed when the window is painted first
+report_startup = False
+
+# The last durations in seconds of every named span. Spans are also
+# measured in worker threads, so they are only used with the lock held
+SPAN_HISTORY = 200
+_spans = {}
+_spans_lock = threading.Lock()
+
+# All spans as trace events, if tracing is enabled
+_trace_file = os.environ.get('PYSHOW_TRACE')
+_trace = deque(maxlen=1000000) if _trace_file else None
+
+
+def mark(label):
+    """Place a startup mark with the given label."""
+    _marks.append((label, time.perf_counter()))
+
+
+def startup_report():
+    """Return the startup report as text."""
+    lines = ["PyShow startup timing (ms):"]
+    previous = _origin
+
+    for label, moment in _marks:
+        lines.append("  %-24s %8.1f %8.1f" % (label,
+                                              (moment - previous)*1000,
+                                              (moment - _origin)*1000))
+        previous = moment
+
+    return "\n".join(lines)
+
+
+def print_startup_report():
+    """Print the startup report, if requested."""
+    if report_startup:
+        print(startup_report(), file=sys.stderr)
+
+
+@contextmanager
+def span(name):
+    """Measure the duration of the code inside the with block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+
+        with _spans_lock:
+            if name not in _spans:
+                _spans[name] = deque(maxlen=SPAN_HISTORY)
+            _spans[name].append(end - start)
+
+        if _trace is not None:
+            _trace.append({"name": name,
+                           "ph": "X",
+                           "ts": (start - _origin)*1e6,
+                           "dur": (end - start)*1e6,
+                           "pid": os.getpid(),
+                           "tid": threading.get_ident()})
+
+
+def percentile(values, fraction):
+    """Return the given percentile (0-1) of a sorted list of values."""
+    return values[min(int(fraction*len(values)), len(values)-1)]
+
+
+def span_stats(name):
+    """Return the count and 50th, 95th percentile of a span in ms."""
+    with _spans_lock:
+        durations = sorted(_spans.get(name, ()))
+
+    if not durations:
+        return None
+
+    return {"count": len(durations),
+            "p50": percentile(durations, 0.5)*1000,
+            "p95": percentile(durations, 0.95)*1000}
+
+
+def write_trace():
+    """Write all spans to the trace file."""
+    if _trace is None:
+        return
+
+    with open(_trace_file, 'w') as file:
+        json.dump({"traceEvents": list(_trace),
+                   "displayTimeUnit": "ms"}, file)
+
+
+atexit.register(write_trace)
+
+
+class PyShowFrameCounter:
+    """Keeps track of the number and duration of drawn frames."""
+
+    def __init__(self, size=240):
+        # Only the last frames are kept, so the numbers show the current
+        # situation instead of an average over the whole session
+        self._durations = deque(maxlen=size)
+        self._start = None
+        self.count = 0
+
+    def start(self):
+        """Call when a frame starts."""
+        self._start = time.perf_counter()
+
+    def stop(self):
+        """Call when a frame is done."""
+        if self._start is not None:
+            self._durations.append(time.perf_counter() - self._start)
+            self._start = None
+            self.count += 1
+
+    def stats(self):
+        """Return the frame count and durations of the last frames in ms."""
+        durations = self._durations
+
+        if not durations:
+            return {"count": self.count, "last": 0.0, "mean": 0.0, "max": 0.0}
+
+        return {"count": self.count,
+                "last": durations[-1]*1000,
+                "mean": sum(durations)/len(durations)*1000,
+                "max": max(durations)*1000}
@@ -0,0 +1,99 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class responsible for the console below the editor.
+
+The console lists the warnings and errors found in the script, with the line
+they belong to. Double clicking a problem moves the editor cursor to it.
+"""
+
+from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtGui import QColor, QTextCursor
+from PyQt6.QtWidgets import QListWidget, QListWidgetItem
+from Core.PyShowDiagnostics import diagnostics, ERROR
+
+# Time in ms between checks for new diagnostics. Problems are reported while
+# drawing, so the console looks for them instead of being told about every
+# single one
+CONSOLE_INTERVAL = 250
+
+
+class PyShowConsole(QListWidget):
+    """The list of problems in the script."""
+
+    def __init__(self, editor):
+        super().__init__()
+
+        self._editor = editor
+        self._revision = None
+
+        self.setStyleSheet("PyShowConsole {"
+                           "border: none;"
+                           "border-top: 1px solid #DDD;"
+                           "}")
+
+        self.itemActivated.connect(self.jump)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(CONSOLE_INTERVAL)
+        self._timer.timeout.connect(self.update_entries)
+        self._timer.start()
+
+    def update_entries(self):
+        """Show the current diagnostics, if they changed."""
+        if diagnostics.revision == self._revision:
+            return
+
+        self._revision = diagnostics.revision
+        self.clear()
+
+        document = self._editor.document()
+
+        for entry in diagnostics.entries():
+            text = "%s: %s" % (entry.level, entry.message)
+
+            if entry.loc is not None:
+                line = document.findBlock(entry.loc).blockNumber() + 1
+                text = "Line %d, %s" % (line, text)
+
+            if entry.count > 1:
+                text += " (%d times)" % (entry.count)
+
+            item = QListWidgetItem(text)
+            item.setData(Qt.ItemDataRole.UserRole, entry.loc)
+
+            if entry.level == ERROR:
+                item.setForeground(QColor("#A00"))
+
+            self.addItem(item)
+
+        self.scrollToBottom()
+
+    def jump(self, item):
+        """Move the editor cursor to the place of a diagnostic."""
+        loc = item.data(Qt.ItemDataRole.UserRole)
+
+        if loc is None:
+            return
+
+        cursor = self._editor.textCursor()
+        cursor.setPosition(min(loc, self._editor.document().characterCount()-1),
+                           QTextCursor.MoveMode.MoveAnchor)
+        self._editor.setTextCursor(cursor)
+        self._editor.ensureCursorVisible()
+        self._editor.setFocus()
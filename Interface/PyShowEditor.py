@@ -20,32 +20,48 @@ Class containing methods for the editor pane.
 
 The editor pane is responsible for highlighting, changing content when pasted
 from the clipboard, and updating indications of line numbers. Any code changes
-also need to trigger an update of the preview window.
+also need to trigger an update of the preview window. There are two backends
+for the editor: one based on QPlainTextEdit for (very) large scripts, and the
+original one based on QTextEdit.
 """
 
-import math
-from PyQt6.QtWidgets import QWidget, QTextEdit
-from PyQt6.QtCore import Qt, QSize, QRectF
+from PyQt6.QtWidgets import QWidget, QTextEdit, QPlainTextEdit
+from PyQt6.QtCore import Qt, QSize, QRectF, QEvent, QTimer
 from PyQt6.QtGui import QPainter, QColor, QTextFormat, QTextCursor, QFont
 from Core.PyShowLanguage import PyShowParser, PyShowEditorHighlighter
+from Core.PyShowTiming import PyShowFrameCounter
 
 # TODO: Further styling of both scroll bars
 # TODO: move out all the stylesheets to an external stylesheet
 # TODO: try to simplify the line number code even more
 
 
-class PyShowEditor(QTextEdit):
-    """The main editor for the PyShow software."""
+class PyShowEditorBase:
+    """The features of the main editor, shared by both editor backends."""
 
     def __init__(self):
         super().__init__()
 
-        # Connect some signals of various subwidgets to this class
+        # Connect some signals of various subwidgets to this class. A single
+        # keystroke fires several of these, so they only schedule an update,
+        # which is then done once when control returns to the event loop
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(0)
+        self._update_timer.timeout.connect(self.update_line_numbers_now)
+        self._cursor_moved = True
+
         self.verticalScrollBar().valueChanged.connect(self.updatelinenumbers)
         self.textChanged.connect(self.updatelinenumbers)
-        self.cursorPositionChanged.connect(self.updatelinenumbers)
+        self.cursorPositionChanged.connect(self.cursor_moved)
+
+        # Counters for the time it takes to draw the editor
+        self._counters = {"editor": PyShowFrameCounter(),
+                          "line numbers": PyShowFrameCounter(),
+                          "updates": PyShowFrameCounter()}
+        self._update_requests = 0
 
-        self.setStyleSheet("PyShowEditor {"
+        self.setStyleSheet("PyShowEditor, PyShowPlainEditor {"
                            "border: none;"
                            "}"
                            "QScrollBar:horizontal{"
@@ -74,6 +90,9 @@ class PyShowEditor(QTextEdit):
                            "width: 16px;"
                            "}")
 
+        # The linenumber area has to exist before the font is set
+        self.line_number_area = PyShowEditorLineNumberArea(self)
+
         # Require a minimal width and height to function
         self.setMinimumWidth(300)
         self.setMinimumHeight(300)
@@ -87,29 +106,51 @@ class PyShowEditor(QTextEdit):
         self.setTabStopDistance(4*self.fontMetrics().horizontalAdvance(' '))
 
         # No wrapping, just extend and show a scrollbar
-        self.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.setLineWrapMode(self.LineWrapMode.NoWrap)
 
         # Initialize the linenumber area
-        self.line_number_area = PyShowEditorLineNumberArea(self)
         self.update_viewport()
 
         # Now enable the syntax highlighting
-        self._highlighter = PyShowEditorHighlighter(self)
+        self._highlighter = PyShowEditorHighlighter(self.document())
 
         # And enable the parser
         self._parser = PyShowParser(self)
 
+    def parser(self):
+        """Return the parser of the text in the editor."""
+        return self._parser
+
     def update_viewport(self):
         """Update the viewport from the line number area width."""
         self.setViewportMargins(self.line_number_area.get_width(), 0, 0, 0)
 
     def updatelinenumbers(self):
+        """Schedule an update of the line numbers after any change."""
+        self._update_requests += 1
+
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
+    def cursor_moved(self):
+        """Schedule an update of the current line after a cursor move."""
+        self._cursor_moved = True
+        self.updatelinenumbers()
+
+    def update_line_numbers_now(self):
         """Update the line numbers after any change in the viewport."""
+        self._counters["updates"].start()
+
         # This is a necessary step to avoid unexpected values for
         # the scrollbar position
         self.verticalScrollBar().\
             setSliderPosition(self.verticalScrollBar().sliderPosition())
 
+        # The current line only changes when the cursor moved
+        if self._cursor_moved:
+            self._cursor_moved = False
+            self.highlight_current_line()
+
         # Update the viewport, then request a paint update
         # of the line number area
         self.update_viewport()
@@ -118,38 +159,26 @@ class PyShowEditor(QTextEdit):
                                      self.line_number_area.width(),
                                      self.height())
 
-    def get_first_block_id(self):
-        """Get the ID of the first visible text block in the editor."""
-        # Ask for a cursor and set it to the beginning of the document
-        curs = QTextCursor(self.document())
-        curs.movePosition(QTextCursor.MoveOperation.Start)
-
-        # The geometry of the QTextEdit
-        rect1 = self.viewport().geometry()
-        translate_y = self.verticalScrollBar().sliderPosition()
+        self._counters["updates"].stop()
 
-        # Loop through the blocks (e.g. lines), and see if it is
-        # visible in the viewport (could even be just a pixel)
-        for i in range(0, self.document().blockCount()):
-            block = curs.block()
+    def frame_stats(self):
+        """Return the frame counters of the editor, for diagnostics."""
+        stats = {name: counter.stats()
+                 for name, counter in self._counters.items()}
+        stats["updates"]["requested"] = self._update_requests
 
-            # Translate the block's bounding rect with the position
-            # of the vertical scrollbar
-            rect2 = self.document().documentLayout().blockBoundingRect(block).\
-                translated(rect1.x(), rect1.y() - translate_y).toRect()
+        return stats
 
-            # If the block is indeed completely visible in the viewport,
-            # this is the first visible block, so return the index
-            if rect1.intersects(rect2):
-                return i
-
-            # Otherwise move to the next block and repeat
-            curs.movePosition(QTextCursor.MoveOperation.NextBlock)
-
-        return 0
+    def paintEvent(self, event):
+        """Paint the editor and measure how long that takes."""
+        self._counters["editor"].start()
+        super().paintEvent(event)
+        self._counters["editor"].stop()
 
     def paint_line_numbers(self, event):
         """Actually paint the numbers in the line number area."""
+        self._counters["line numbers"].start()
+
         # Get the painter instance for the line number area,
         # fill the line number area background and set it's font
         painter = QPainter(self.line_number_area)
@@ -157,57 +186,29 @@ class PyShowEditor(QTextEdit):
         painter.setFont(self.font())
 
         # Often used variables here to make the script more readable
-        layout = self.document().documentLayout()
-        top = self.viewport().geometry().top()
-        translate_y = self.verticalScrollBar().sliderPosition()
+        current = self.textCursor().blockNumber()
+        width = self.line_number_area.width()
+        height = self.line_number_area.line_height()
 
-        # Find the first visible block
-        block_number = self.get_first_block_id()
-        block = self.document().findBlockByNumber(block_number)
+        # For every visible block with a top inside the painted area
+        for block_number, top in self.visible_blocks(event.rect()):
+            number = str(block_number + 1)
 
-        # Determine the additional margin caused by the document margins
-        # and any scrolling down. The scrolling needs to be taken into
-        # account in all cases
-        additional_margin = -translate_y
-        if block_number > 0:
-            # If block_number>0 we must have scrolled down, so
-            # compensate for that
-            rect = layout.blockBoundingRect(block.previous())
-            additional_margin += rect.y() + rect.height()
-        else:
-            additional_margin += self.document().documentMargin()
-
-        # Correct top and set bottom value
-        top += additional_margin
-        bottom = top + layout.blockBoundingRect(block).height()
-
-        # For every block that is valid and has a top inside the viewport
-        while block.isValid() and top <= event.rect().bottom():
-            # If it is a visible block and it's bottom is
-            # also inside the viewport
-            if block.isVisible() and bottom >= event.rect().top():
-                number = str(block_number + 1)
-
-                # The current line has a different color
-                if self.textCursor().blockNumber() == block_number:
-                    painter.setPen(QColor("#090"))
-                else:
-                    painter.setPen(QColor("#333"))
-
-                painter.drawText(QRectF(-5,
-                                 top+1,
-                                 self.line_number_area.width(),
-                                 self.fontMetrics().height()),
-                                 Qt.AlignmentFlag.AlignRight,
-                                 number)
+            # The current line has a different color
+            if current == block_number:
+                painter.setPen(QColor("#090"))
+            else:
+                painter.setPen(QColor("#333"))
 
-            # Move to the next block
-            block = block.next()
-            top = bottom
-            bottom = top + layout.blockBoundingRect(block).height()
-            block_number += 1
+            painter.drawText(QRectF(-5,
+                             top+1,
+                             width,
+                             height),
+                             Qt.AlignmentFlag.AlignRight,
+                             number)
 
-        self.highlight_current_line()
+        painter.end()
+        self._counters["line numbers"].stop()
 
     def resizeEvent(self, event):
         """React to a resize event."""
@@ -231,6 +232,13 @@ class PyShowEditor(QTextEdit):
         selection.cursor.clearSelection()  # No multi-line selections
         self.setExtraSelections([selection])
 
+    def changeEvent(self, event):
+        """React to a change of the editor, like a new font."""
+        super().changeEvent(event)
+
+        if event.type() == QEvent.Type.FontChange:
+            self.line_number_area.font_changed()
+
     def wheelEvent(self, event):
         """Increase/decrease editor font size."""
         if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
@@ -270,14 +278,14 @@ class PyShowEditor(QTextEdit):
         # of the line
         if not cursor.hasSelection():
             cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock,
-                                QTextCursor.MoveOperation.MoveAnchor)
+                                QTextCursor.MoveMode.MoveAnchor)
 
             if event.key() == Qt.Key.Key_Tab:
                 cursor.insertText("\t")
             elif event.key() == Qt.Key.Key_Backtab:
                 # Select first character to see if it is a TAB
                 cursor.movePosition(QTextCursor.MoveOperation.NextCharacter,
-                                    QTextCursor.MoveOperation.KeepAnchor)
+                                    QTextCursor.MoveMode.KeepAnchor)
 
                 if cursor.selectedText() == "\t":
                     cursor.removeSelectedText()
@@ -292,10 +300,10 @@ class PyShowEditor(QTextEdit):
         if start_pos > end_pos:
             start_pos, end_pos = end_pos, start_pos
 
-        cursor.setPosition(end_pos, QTextCursor.MoveOperation.MoveAnchor)
+        cursor.setPosition(end_pos, QTextCursor.MoveMode.MoveAnchor)
         end_block = cursor.block().blockNumber()
 
-        cursor.setPosition(start_pos, QTextCursor.MoveOperation.MoveAnchor)
+        cursor.setPosition(start_pos, QTextCursor.MoveMode.MoveAnchor)
         start_block = cursor.block().blockNumber()
 
         # Let all the changes be in one editing block, so one single
@@ -304,7 +312,7 @@ class PyShowEditor(QTextEdit):
 
         for _ in range(0, end_block-start_block+1):
             cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock,
-                                QTextCursor.MoveOperation.MoveAnchor)
+                                QTextCursor.MoveMode.MoveAnchor)
 
             if event.key() == Qt.Key.Key_Tab:
                 cursor.insertText("\t")
@@ -312,32 +320,135 @@ class PyShowEditor(QTextEdit):
                 if not cursor.atBlockEnd():
                     # Select first character to see if it is a TAB
                     cursor.movePosition(QTextCursor.MoveOperation.NextCharacter,
-                                        QTextCursor.MoveOperation.KeepAnchor)
+                                        QTextCursor.MoveMode.KeepAnchor)
 
-                    print(cursor.selectedText())
                     if cursor.selectedText() == "\t":
                         cursor.removeSelectedText()
 
             cursor.movePosition(QTextCursor.MoveOperation.NextBlock,
-                                QTextCursor.MoveOperation.MoveAnchor)
+                                QTextCursor.MoveMode.MoveAnchor)
 
         cursor.endEditBlock()
 
         # Now we are going to completely select all the lines that
         # were changed from beginning to end
 
-        cursor.setPosition(start_pos, QTextCursor.MoveOperation.MoveAnchor)
-        cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveOperation.MoveAnchor)
+        cursor.setPosition(start_pos, QTextCursor.MoveMode.MoveAnchor)
+        cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveMode.MoveAnchor)
 
         while cursor.block().blockNumber() < end_block:
-            cursor.movePosition(QTextCursor.MoveOperation.NextBlock, QTextCursor.MoveOperation.KeepAnchor)
+            cursor.movePosition(QTextCursor.MoveOperation.NextBlock, QTextCursor.MoveMode.KeepAnchor)
 
-        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveOperation.KeepAnchor)
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
 
         # Finally, set the new cursor
         self.setTextCursor(cursor)
 
 
+class PyShowEditor(PyShowEditorBase, QTextEdit):
+    """The rich text backend of the editor, based on QTextEdit."""
+
+    def get_first_block_id(self):
+        """Get the ID of the first visible text block in the editor."""
+        document = self.document()
+        layout = document.documentLayout()
+
+        # The position of the top of the viewport within the document
+        translate_y = self.verticalScrollBar().sliderPosition()
+
+        # Blocks are laid out from top to bottom, so do a binary search for
+        # the first block whose bottom is below the top of the viewport
+        low = 0
+        high = document.blockCount() - 1
+
+        while low < high:
+            middle = (low + high) // 2
+            rect = layout.blockBoundingRect(document.findBlockByNumber(middle))
+
+            if rect.y() + rect.height() <= translate_y:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def visible_blocks(self, rect):
+        """Yield the number and top of all blocks visible inside rect."""
+        layout = self.document().documentLayout()
+        top = self.viewport().geometry().top()
+        translate_y = self.verticalScrollBar().sliderPosition()
+
+        # Find the first visible block
+        block_number = self.get_first_block_id()
+        block = self.document().findBlockByNumber(block_number)
+
+        # Determine the additional margin caused by the document margins
+        # and any scrolling down. The scrolling needs to be taken into
+        # account in all cases
+        additional_margin = -translate_y
+        if block_number > 0:
+            # If block_number>0 we must have scrolled down, so
+            # compensate for that
+            rect_previous = layout.blockBoundingRect(block.previous())
+            additional_margin += rect_previous.y() + rect_previous.height()
+        else:
+            additional_margin += self.document().documentMargin()
+
+        # Correct top and set bottom value
+        top += additional_margin
+        bottom = top + layout.blockBoundingRect(block).height()
+
+        # For every block that is valid and has a top inside the viewport
+        while block.isValid() and top <= rect.bottom():
+            # If it is a visible block and it's bottom is
+            # also inside the viewport
+            if block.isVisible() and bottom >= rect.top():
+                yield block_number, top
+
+            # Move to the next block
+            block = block.next()
+            top = bottom
+            bottom = top + layout.blockBoundingRect(block).height()
+            block_number += 1
+
+
+class PyShowPlainEditor(PyShowEditorBase, QPlainTextEdit):
+    """The plain text backend of the editor, for very large scripts."""
+
+    # QPlainTextEdit only lays out the lines that are visible, and knows the
+    # first visible line itself, so it stays fast for scripts of many
+    # thousands of lines
+
+    def get_first_block_id(self):
+        """Get the ID of the first visible text block in the editor."""
+        return self.firstVisibleBlock().blockNumber()
+
+    def visible_blocks(self, rect):
+        """Yield the number and top of all blocks visible inside rect."""
+        block = self.firstVisibleBlock()
+        block_number = block.blockNumber()
+
+        # The geometry of blocks is relative to the viewport, which is moved
+        # to the right of the line number area
+        top = (self.viewport().geometry().top() +
+               self.blockBoundingGeometry(block).translated(self.contentOffset()).top())
+        bottom = top + self.blockBoundingRect(block).height()
+
+        while block.isValid() and top <= rect.bottom():
+            if block.isVisible() and bottom >= rect.top():
+                yield block_number, top
+
+            block = block.next()
+            top = bottom
+            bottom = top + self.blockBoundingRect(block).height()
+            block_number += 1
+
+
+# The available editor backends, by name
+EDITORS = {"plain": PyShowPlainEditor,
+           "rich": PyShowEditor}
+
+
 class PyShowEditorLineNumberArea(QWidget):
     """The line number area in the main PyShow editor."""
 
@@ -346,10 +457,29 @@ class PyShowEditorLineNumberArea(QWidget):
 
         self._editor = editor
 
+        # Font measures are only calculated again when the font changes
+        self._digit_width = None
+        self._line_height = None
+
+    def font_changed(self):
+        """Forget the font measures, after the editor font has changed."""
+        self._digit_width = None
+        self._line_height = None
+
+    def line_height(self):
+        """Return the height of a line number."""
+        if self._line_height is None:
+            self._line_height = self._editor.fontMetrics().height()
+
+        return self._line_height
+
     def get_width(self):
         """Calculate the width of the line number area."""
-        digits = math.floor(math.log10(self._editor.document().blockCount()))+1
-        return 25 + self._editor.fontMetrics().horizontalAdvance('9') * digits
+        if self._digit_width is None:
+            self._digit_width = self._editor.fontMetrics().horizontalAdvance('9')
+
+        digits = len(str(self._editor.document().blockCount()))
+        return 25 + self._digit_width * digits
 
     def sizeHint(self):
         """Return the size of the line number area."""
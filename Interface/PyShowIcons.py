@@ -15,17 +15,27 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-# TODO: Combine icons if different sizes in one QIcon
 # TODO: add white app icon, and check which is better with taskbar color.
 
 """
 Class for all icons in the program.
 
-Loads all necessary icons to run the application at the same time, so cleans
-up the code by not doing this in every single class where an icon is needed.
+Icons are looked up in the Icons directory of PyShow, so cleans up the code
+by not doing this in every single class where an icon is needed. All sizes of
+an icon are combined in one QIcon, and the image files are only read when Qt
+actually needs a certain size, so icons that are never shown cost nothing.
 """
 
-from PyQt6.QtGui import QIcon, QPixmap
+import os
+import re
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QIcon
+from Core.PyShowDiagnostics import diagnostics, APPLICATION
+
+# The directory with all icons, relative to PyShow itself instead of the
+# current working directory
+ICON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'Icons')
 
 
 class PyShowIcons:
@@ -33,22 +43,59 @@ class PyShowIcons:
 
     def __init__(self):
         self._icons = {}
+        self._files = None
+
+    def files(self):
+        """Return a dict of all icon names and their files with sizes."""
+        if self._files is None:
+            self._files = {}
+
+            try:
+                filenames = os.listdir(ICON_DIR)
+            except OSError:
+                filenames = []
+
+            # Files are either name_size.png, or a scalable name.svg
+            for filename in sorted(filenames):
+                match = re.fullmatch(r'(.+?)(?:_(\d+))?\.(png|svg)', filename)
+                if not match:
+                    continue
+
+                name, size, ext = match.groups()
+                if ext == 'png' and size is None:
+                    continue
+
+                self._files.setdefault(name, []).append(
+                    (os.path.join(ICON_DIR, filename),
+                     int(size) if size else None))
 
-        self.load_icon("pyshow_icon")
-        self.load_icon("file_new")
-        self.load_icon("file_open")
-        self.load_icon("file_save")
-        self.load_icon("file_print")
+        return self._files
 
     def load_icon(self, name):
-        """Load an icon from file."""
-        self._icons[name] = QIcon()
-        self._icons[name].addPixmap(QPixmap("Icons/"+name+"_32.png"),
-                                    QIcon.Mode.Normal)
+        """Make an icon from all files available for it."""
+        icon = QIcon()
+
+        # QIcon only reads a file when that size is needed for drawing. The
+        # fixed sizes go first, the scalable version fills in the rest
+        files = sorted(self.files().get(name, []),
+                       key=lambda file: (file[1] is None, file[1] or 0))
+
+        for filename, size in files:
+            if size is None:
+                icon.addFile(filename)
+            else:
+                icon.addFile(filename, QSize(size, size))
+
+        self._icons[name] = icon
 
     def icon(self, name):
         """Return the icon with the specified name."""
-        try:
-            return self._icons[name]
-        except KeyError:
-            print("Icon " + name + " not found")
+        if name not in self._icons:
+            if name not in self.files():
+                diagnostics.warning("icon '%s' not found" % (name),
+                                    source=APPLICATION)
+                return QIcon()
+
+            self.load_icon(name)
+
+        return self._icons[name]
@@ -0,0 +1,100 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Class responsible for the dialog to jump to a frame.
+
+Typing a number selects the frame with that number, typing anything else
+searches the titles of the frames while typing. Used both in the editor and
+while presenting.
+"""
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import (QDialog, QLineEdit, QListWidget,
+                             QListWidgetItem, QVBoxLayout)
+
+# At most this many frames are listed, the list is for picking, not reading
+MAX_RESULTS = 200
+
+
+class PyShowNavigator(QDialog):
+    """Dialog to find a frame by number or title."""
+
+    def __init__(self, timeline, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle('Go to slide')
+        self.resize(400, 400)
+
+        self._timeline = timeline
+        self.chosen = None
+
+        self._query = QLineEdit()
+        self._query.setPlaceholderText('Number or title')
+        self._query.textChanged.connect(self.search)
+        self._query.returnPressed.connect(self.choose)
+
+        self._list = QListWidget()
+        self._list.itemActivated.connect(self.choose)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._query)
+        layout.addWidget(self._list)
+
+        self.search('')
+
+    def search(self, text):
+        """List the frames matching the text."""
+        text = text.strip()
+
+        if text.isdigit():
+            entry = self._timeline.entry(int(text))
+            results = [entry] if entry is not None else []
+        elif text:
+            results = self._timeline.search(text)
+        else:
+            results = self._timeline
+
+        self._list.clear()
+
+        for number, entry in enumerate(results):
+            if number == MAX_RESULTS:
+                break
+
+            item = QListWidgetItem("%d  %s" % (entry.number, entry.title))
+            item.setData(Qt.ItemDataRole.UserRole, entry.number)
+            self._list.addItem(item)
+
+        self._list.setCurrentRow(0)
+
+    def keyPressEvent(self, event):
+        """Let the arrow keys move through the list while typing."""
+        if event.key() in (Qt.Key.Key_Up, Qt.Key.Key_Down,
+                           Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+            self._list.keyPressEvent(event)
+        else:
+            super().keyPressEvent(event)
+
+    def choose(self, item=None):
+        """Close the dialog with the selected frame."""
+        item = item or self._list.currentItem()
+
+        if item is None:
+            return
+
+        self.chosen = self._timeline.entry(item.data(Qt.ItemDataRole.UserRole))
+        self.accept()
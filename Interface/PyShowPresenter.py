@@ -0,0 +1,496 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Classes responsible for presenting a show full screen.
+
+The presenter walks through the frames of the show, from newSlide to pause.
+To show the next frame the moment a key is pressed, the frames around the
+current one are rendered in advance by a worker thread, at the resolution
+of the screen. The frame on the screen is the front buffer, the frames
+rendered in advance are the back buffers: going to the next frame only
+swaps them.
+
+Transitions between frames are drawn from the two images and cached layers
+of objects, paced by the clock instead of by the number of drawn frames: a
+frame drawn late shows the transition further along, and is counted as
+dropped.
+"""
+
+import threading
+import time
+from PyQt6.QtCore import QObject, QRect, QRectF, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QFont
+from PyQt6.QtWidgets import QWidget
+from Core.PyShowEvaluator import evaluate
+from Core.PyShowRenderer import render, SLIDE_SIZE
+from Core.PyShowDiff import diff, repaint, damaged_area, MAX_DAMAGE
+from Core import PyShowTiming
+from Core.PyShowTiming import PyShowFrameCounter
+from Core.PyShowAnimation import PyShowTransition
+from Interface.PyShowNavigator import PyShowNavigator
+
+# Number of frames after the current one that are rendered in advance. The
+# previous frame is always kept as well
+LOOKAHEAD = 3
+
+# Refresh rate used when the screen doesn't report one
+REFRESH_RATE = 60
+
+# A frame drawn this many refresh periods after the previous one means at
+# least one frame was dropped
+DROPPED_FRAME = 1.5
+
+
+class PyShowFrameQueue(QObject):
+    """Renders the frames around the current frame in a worker thread."""
+
+    ready = pyqtSignal(int)
+
+    def __init__(self, show, cursors, scale, lookahead=LOOKAHEAD, frames=None):
+        super().__init__()
+
+        self._show = show
+        self._cursors = cursors
+        self._scale = scale
+        self._lookahead = lookahead
+
+        # Function returning a frame rendered before (for example in a
+        # bundle) at a given width, or None
+        self._frames = frames
+
+        # Evaluated states are small, so all of them are kept. Images are
+        # only kept for the frames around the current one
+        self._states = {}
+        self._images = {}
+        self._wanted = []
+        self._stopped = False
+        self._condition = threading.Condition()
+
+        # How often a frame was ready when it was needed, and how often
+        # only the changes from the frame before were drawn
+        self.hits = 0
+        self.misses = 0
+        self.repainted = 0
+
+        self._worker = threading.Thread(target=self._work,
+                                        name='PyShowFrameQueue',
+                                        daemon=True)
+        self._worker.start()
+
+    def __len__(self):
+        return len(self._cursors)
+
+    def state(self, index):
+        """Return the evaluated state of a frame."""
+        with self._condition:
+            state = self._states.get(index)
+
+        if state is None:
+            state = evaluate(self._show, self._cursors[index])
+            with self._condition:
+                self._states[index] = state
+
+        return state
+
+    def set_current(self, index):
+        """Render the frames around this one, and forget all others."""
+        wanted = [index]
+        wanted += [i for i in range(index+1, index+1+self._lookahead)
+                   if i < len(self._cursors)]
+        if index > 0:
+            wanted.append(index-1)
+
+        with self._condition:
+            self._wanted = wanted
+            for i in list(self._images):
+                if i not in wanted:
+                    del self._images[i]
+            self._condition.notify_all()
+
+    def image(self, index):
+        """Return the image of a frame, rendering it now if it isn't ready."""
+        with self._condition:
+            image = self._images.get(index)
+
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        image = self._render(index)
+
+        with self._condition:
+            if index in self._wanted:
+                self._images[index] = image
+
+        return image
+
+    def cached(self, index):
+        """Return the image of a frame if it is ready, without rendering."""
+        with self._condition:
+            return self._images.get(index)
+
+    def rendered(self):
+        """Return the number of frames rendered in advance."""
+        with self._condition:
+            return len(self._images)
+
+    def stop(self):
+        """Stop the worker thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _render(self, index):
+        """Render a frame, from the frame before it if that is ready."""
+        if self._frames is not None:
+            image = self._frames(index, int(SLIDE_SIZE[0]*self._scale))
+            if image is not None:
+                return image
+
+        with self._condition:
+            previous = self._images.get(index-1) if index > 0 else None
+
+        if previous is None:
+            return render(self.state(index), self._scale)
+
+        # Build-up slides mostly change a single object from frame to frame
+        changes = diff(self.state(index-1), self.state(index))
+        if damaged_area(changes) <= MAX_DAMAGE:
+            self.repainted += 1
+
+        return repaint(previous, self.state(index), changes, self._scale)
+
+    def _work(self):
+        """Render wanted frames, the most urgent first. Runs in the worker."""
+        while True:
+            with self._condition:
+                while not self._stopped and all(i in self._images
+                                                for i in self._wanted):
+                    self._condition.wait()
+
+                if self._stopped:
+                    return
+
+                index = next(i for i in self._wanted if i not in self._images)
+
+            image = self._render(index)
+
+            with self._condition:
+                # The presenter may have moved on in the meantime
+                if index not in self._wanted or index in self._images:
+                    continue
+                self._images[index] = image
+
+            self.ready.emit(index)
+
+
+class PyShowPresenter(QWidget):
+    """The full screen window showing the presentation."""
+
+    changed = pyqtSignal(int)
+
+    def __init__(self, show, timeline, start=0, screen=None, frames=None):
+        super().__init__()
+
+        # Place the window on the right screen before anything depends on
+        # the size of the screen
+        if screen is not None:
+            self.setScreen(screen)
+            self.move(screen.geometry().topLeft())
+
+        self.setWindowTitle('PyShow')
+        self.setCursor(Qt.CursorShape.BlankCursor)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+
+        # Frames are rendered at the size they appear on the screen, so
+        # showing them is a plain copy
+        screen = self.screen()
+        ratio = screen.devicePixelRatio()
+        size = screen.size()
+        scale = min(size.width()*ratio/SLIDE_SIZE[0],
+                    size.height()*ratio/SLIDE_SIZE[1])
+
+        self._timeline = timeline
+        self._scale = scale
+        self._queue = PyShowFrameQueue(show,
+                                       [entry.cursor for entry in timeline],
+                                       scale,
+                                       frames=frames)
+        self._queue.ready.connect(self.frame_ready)
+
+        # Animations are drawn once every refresh of the screen
+        self._period = 1/(screen.refreshRate() or REFRESH_RATE)
+        self._animation = QTimer(self)
+        self._animation.setTimerType(Qt.TimerType.PreciseTimer)
+        self._animation.setInterval(max(int(self._period*1000), 1))
+        self._animation.timeout.connect(self.update)
+
+        self._transition = None
+        self._transition_start = 0.0
+        self._last_paint = None
+        self.animated = 0
+        self.dropped = 0
+
+        self._index = None
+        self._image = None
+        self._overlay = False
+        self._painted = False
+
+        # Digits typed to jump to a frame by number
+        self._number = ''
+
+        # Time between a key press and the next frame on the screen
+        self._latency = PyShowFrameCounter()
+
+        self.goto(start)
+
+    def queue(self):
+        """Return the queue of frames of this presentation."""
+        return self._queue
+
+    def image(self):
+        """Return the image of the current frame."""
+        return self._image
+
+    def index(self):
+        """Return the number of the current frame."""
+        return self._index
+
+    def goto(self, index):
+        """Show the frame with the given number."""
+        index = min(max(index, 0), len(self._queue)-1)
+
+        if index == self._index:
+            return
+
+        # Only going to the next frame is animated, going back or jumping
+        # shows the frame at once
+        previous, image = self._index, self._image
+        self.finish_transition()
+
+        self._index = index
+        self._queue.set_current(index)
+        self._image = self._queue.image(index)
+
+        if previous is not None and index == previous + 1:
+            self.start_transition(previous, image)
+
+        self.update()
+
+        # Other windows showing the presentation update in the same event,
+        # so they are painted together with this one
+        self.changed.emit(index)
+
+    def start_transition(self, previous, image):
+        """Animate the change from the previous frame, if it has a transition."""
+        after = self._queue.state(self._index)
+
+        if after["transition"] is None:
+            return
+
+        self._transition = PyShowTransition(self._queue.state(previous),
+                                            after,
+                                            (image, self._image),
+                                            self._scale)
+        self._transition_start = time.perf_counter()
+        self._last_paint = None
+        self._animation.start()
+
+    def finish_transition(self):
+        """End a running transition, showing the frame it goes to."""
+        if self._transition is not None:
+            self._transition = None
+            self._animation.stop()
+            self.update()
+
+    def next(self):
+        """Show the next frame."""
+        self.goto(self._index + 1)
+
+    def previous(self):
+        """Show the previous frame."""
+        self.goto(self._index - 1)
+
+    def frame_ready(self, index):
+        """Call when a frame was rendered in advance."""
+        # Only the overlay changes
+        if self._overlay:
+            self.update()
+
+    def keyPressEvent(self, event):
+        """Call when a key is pressed."""
+        key = event.key()
+
+        self._latency.start()
+
+        # Any key first ends a running transition
+        if self._transition is not None:
+            self.finish_transition()
+
+        # A number followed by enter jumps to that frame
+        if Qt.Key.Key_0 <= key <= Qt.Key.Key_9:
+            self._number += event.text()
+            self.update()
+            return
+
+        if self._number:
+            number, self._number = self._number, ''
+            self.update()
+
+            if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+                self.goto(int(number) - 1)
+                return
+            elif key == Qt.Key.Key_Escape:
+                return
+
+        if key in (Qt.Key.Key_Right, Qt.Key.Key_Down, Qt.Key.Key_Space,
+                   Qt.Key.Key_PageDown, Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            self.next()
+        elif key in (Qt.Key.Key_Left, Qt.Key.Key_Up, Qt.Key.Key_PageUp,
+                     Qt.Key.Key_Backspace):
+            self.previous()
+        elif key == Qt.Key.Key_Home:
+            self.goto(0)
+        elif key == Qt.Key.Key_End:
+            self.goto(len(self._queue)-1)
+        elif key == Qt.Key.Key_D:
+            self._overlay = not self._overlay
+            self.update()
+        elif key == Qt.Key.Key_G:
+            self.navigate()
+        elif key == Qt.Key.Key_Escape:
+            self.close()
+        else:
+            super().keyPressEvent(event)
+
+    def navigate(self):
+        """Find a frame by number or title, and jump to it."""
+        navigator = PyShowNavigator(self._timeline, self)
+
+        if navigator.exec() and navigator.chosen is not None:
+            self.goto(navigator.chosen.number - 1)
+
+    def mousePressEvent(self, event):
+        """Call when a mouse button is pressed."""
+        self._latency.start()
+
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.next()
+        elif event.button() == Qt.MouseButton.RightButton:
+            self.previous()
+
+    def paintEvent(self, event):
+        """Call when the presentation needs to be drawn."""
+        painter = QPainter()
+        painter.begin(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.black)
+
+        # The image is centered, with black bars if the screen has another
+        # aspect ratio than the slides
+        if self._image is not None:
+            ratio = self.devicePixelRatioF()
+            width = int(self._image.width()/ratio)
+            height = int(self._image.height()/ratio)
+            rect = QRect((self.width() - width)//2,
+                         (self.height() - height)//2,
+                         width,
+                         height)
+
+            if self._transition is not None:
+                self.paint_transition(painter, rect)
+            else:
+                painter.drawImage(rect, self._image)
+
+        if self._overlay:
+            self.paint_overlay(painter)
+
+        if self._number:
+            self.paint_number(painter)
+
+        painter.end()
+
+        self._latency.stop()
+
+        if not self._painted:
+            self._painted = True
+            PyShowTiming.mark('first slide')
+            PyShowTiming.print_startup_report()
+
+    def paint_transition(self, painter, rect):
+        """Draw the running transition as far as it should be by now."""
+        now = time.perf_counter()
+        progress = (now - self._transition_start)/max(self._transition.duration,
+                                                      self._period)
+
+        if self._last_paint is not None and \
+                now - self._last_paint > self._period*DROPPED_FRAME:
+            self.dropped += int((now - self._last_paint)/self._period) - 1
+        self._last_paint = now
+        self.animated += 1
+
+        if progress >= 1:
+            self._transition = None
+            self._animation.stop()
+            painter.drawImage(rect, self._image)
+        else:
+            self._transition.paint(painter, QRectF(rect), progress)
+
+    def paint_overlay(self, painter):
+        """Draw the debug overlay with frame and latency information."""
+        stats = self._latency.stats()
+        lines = ["frame %d/%d" % (self._index + 1, len(self._queue)),
+                 "latency %.1f ms (mean %.1f, max %.1f)" % (stats["last"],
+                                                            stats["mean"],
+                                                            stats["max"]),
+                 "rendered ahead %d, hits %d, misses %d" % (self._queue.rendered(),
+                                                            self._queue.hits,
+                                                            self._queue.misses),
+                 "repainted from the frame before %d" % (self._queue.repainted),
+                 "animated %d frames at %.0f Hz, dropped %d" % (self.animated,
+                                                                1/self._period,
+                                                                self.dropped)]
+
+        font = QFont()
+        font.setPixelSize(14)
+        painter.setFont(font)
+
+        rect = QRect(10, 10, 360, 20*len(lines) + 10)
+        painter.fillRect(rect, QColor(0, 0, 0, 180))
+        painter.setPen(Qt.GlobalColor.white)
+        painter.drawText(rect.adjusted(8, 5, -8, -5),
+                         Qt.AlignmentFlag.AlignLeft,
+                         "\n".join(lines))
+
+    def paint_number(self, painter):
+        """Draw the number being typed to jump to a frame."""
+        font = QFont()
+        font.setPixelSize(32)
+        painter.setFont(font)
+
+        rect = QRect(self.width() - 160, self.height() - 70, 150, 60)
+        painter.fillRect(rect, QColor(0, 0, 0, 180))
+        painter.setPen(Qt.GlobalColor.white)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, self._number)
+
+    def closeEvent(self, event):
+        """Call when the presentation is closed."""
+        self._animation.stop()
+        self._queue.stop()
+        super().closeEvent(event)
@@ -0,0 +1,168 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Classes responsible for the presenter view on the second screen.
+
+The presenter view shows the current and next frame, the notes of the
+current frame and the time since the start of the presentation. It does not
+evaluate or render anything itself: states and images all come from the
+frame queue of the audience window, and it follows that window when the
+frame changes, so both are painted in the same event.
+"""
+
+import time
+from PyQt6.QtCore import QRect, QTimer, Qt
+from PyQt6.QtGui import QPainter, QFont
+from PyQt6.QtWidgets import QWidget, QLabel, QGridLayout
+
+# Time in ms between updates of the clock
+CLOCK_INTERVAL = 1000
+
+
+class PyShowFrameView(QWidget):
+    """A frame in the presenter view, scaled to fit."""
+
+    def __init__(self):
+        super().__init__()
+
+        self._image = None
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    def set_image(self, image):
+        """Show another image."""
+        if image is not self._image:
+            self._image = image
+            self.update()
+
+    def paintEvent(self, event):
+        """Call when the frame needs to be drawn."""
+        painter = QPainter()
+        painter.begin(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.black)
+
+        if self._image is not None:
+            width = self.width()
+            height = width*self._image.height()//max(self._image.width(), 1)
+
+            if height > self.height():
+                height = self.height()
+                width = height*self._image.width()//max(self._image.height(), 1)
+
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+            painter.drawImage(QRect((self.width() - width)//2,
+                                    (self.height() - height)//2,
+                                    width,
+                                    height),
+                              self._image)
+
+        painter.end()
+
+
+class PyShowPresenterView(QWidget):
+    """The window with notes, frames and timer for the presenter."""
+
+    def __init__(self, presenter, screen=None):
+        super().__init__()
+
+        if screen is not None:
+            self.setScreen(screen)
+            self.move(screen.geometry().topLeft())
+
+        self.setWindowTitle('PyShow - Presenter')
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setStyleSheet("PyShowPresenterView {background-color: #222;}"
+                           "QLabel {color: #EEE;}")
+
+        self._presenter = presenter
+        self._queue = presenter.queue()
+        self._start = time.monotonic()
+
+        font = QFont()
+        font.setPixelSize(24)
+
+        self._current = PyShowFrameView()
+        self._next = PyShowFrameView()
+
+        self._notes = QLabel()
+        self._notes.setWordWrap(True)
+        self._notes.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self._notes.setFont(font)
+
+        self._position = QLabel()
+        self._position.setFont(font)
+
+        self._clock = QLabel()
+        self._clock.setFont(font)
+        self._clock.setAlignment(Qt.AlignmentFlag.AlignRight)
+
+        layout = QGridLayout(self)
+        layout.addWidget(self._current, 0, 0, 2, 1)
+        layout.addWidget(self._next, 0, 1)
+        layout.addWidget(self._notes, 1, 1)
+        layout.addWidget(self._position, 2, 0)
+        layout.addWidget(self._clock, 2, 1)
+        layout.setColumnStretch(0, 3)
+        layout.setColumnStretch(1, 2)
+        layout.setRowStretch(0, 1)
+        layout.setRowStretch(1, 1)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(CLOCK_INTERVAL)
+        self._timer.timeout.connect(self.update_clock)
+        self._timer.start()
+
+        presenter.changed.connect(self.frame_changed)
+        presenter.destroyed.connect(self.close)
+        self._queue.ready.connect(self.frame_ready)
+
+        self.frame_changed(presenter.index())
+        self.update_clock()
+
+    def frame_changed(self, index):
+        """Follow the audience window to another frame."""
+        self._current.set_image(self._presenter.image())
+        self._next.set_image(self._queue.cached(index + 1))
+
+        self._notes.setText("\n\n".join(self._queue.state(index)["notes"]))
+        self._position.setText("%d / %d" % (index + 1, len(self._queue)))
+
+    def frame_ready(self, index):
+        """Call when the queue rendered a frame in advance."""
+        if index == self._presenter.index() + 1:
+            self._next.set_image(self._queue.cached(index))
+
+    def update_clock(self):
+        """Show the time since the start, and the time of day."""
+        elapsed = int(time.monotonic() - self._start)
+        self._clock.setText("%d:%02d:%02d    %s" % (elapsed//3600,
+                                                   elapsed//60 % 60,
+                                                   elapsed % 60,
+                                                   time.strftime("%H:%M")))
+
+    def keyPressEvent(self, event):
+        """Control the presentation from this window as well."""
+        if event.key() == Qt.Key.Key_R:
+            # Restart the timer
+            self._start = time.monotonic()
+            self.update_clock()
+        else:
+            self._presenter.keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        """Control the presentation from this window as well."""
+        self._presenter.mousePressEvent(event)
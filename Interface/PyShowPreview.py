@@ -22,13 +22,13 @@ It takes care of reading changes in the presentation code, and changing the
 preview accordingly.
 """
 
-import collections
+import time
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtGui import (QPainter, QColor, QLinearGradient, QFont, QPen,
-                         QPixmap, QFontMetrics)
-from PyQt6.QtCore import QRect, Qt
-from Core.PyShowLanguage import (template_functions, show_functions,
-                                 resource_functions)
+from PyQt6.QtGui import QPainter, QColor, QLinearGradient
+from PyQt6.QtCore import QObject, QRect, QTimer, Qt
+from Core.PyShowEvaluator import evaluate, locate, frame_bounds
+from Core.PyShowRenderer import render
+from Core.PyShowTiming import span
 
 # TODO: The code needs to indicate when text is out of bounds. Draw it anyway,
 # and give a warning I think.
@@ -110,6 +110,14 @@ class PyShowPreview(QWidget):
         """Call when an update of the GUI is necessary."""
         self._slide.refresh(data, cursor)
 
+    def set_placeholder(self, image):
+        """Show an image in the slide until the first refresh."""
+        self._slide.set_placeholder(image)
+
+    def render_cost(self):
+        """Return the average time in seconds to render the slide."""
+        return self._slide.render_cost
+
 
 class PyShowSlide(QWidget):
     """The actual slide inside the preview widget."""
@@ -123,6 +131,15 @@ class PyShowSlide(QWidget):
 
         self._cursor = None
         self._data = None
+        self._placeholder = None
+
+        # The last rendered frame, so repaints without a change (for example
+        # when resizing) don't evaluate and render the slide again
+        self._image = None
+        self._image_key = None
+
+        # Moving average of the time it takes to evaluate and render a frame
+        self.render_cost = 0.0
 
     def set_size(self, width, height):
         """Set the slide size in pixels."""
@@ -137,383 +154,136 @@ class PyShowSlide(QWidget):
         """Refresh the preview with new parsed data or cursor position."""
         self._data = data
         self._cursor = cursor
+        self._placeholder = None
+        self.update()
+
+    def set_placeholder(self, image):
+        """Show an image until the first real refresh of the preview."""
+        self._placeholder = image
         self.update()
 
     def paintEvent(self, event):
         """Call when the slide preview needs to be updated."""
-        print("Redrawing preview")
-
-        painter = QPainter()
-        virtscreen = QPixmap(self._size[0], self._size[1])
-        painter.begin(virtscreen)
-
-        # We know the cursor position and the parsed data. We want to know
-        # which line corresponds to the cursor position, so we can find the
-        # last newSlide-statement and prepare the preview from there.
         if self._data is not None and self._cursor is not None:
-            data = self._data[self._cursor[0]]["contents"]
-
-            # Try to find the last newSlide command
-            i = 0
-            while (data[self._cursor[1]-i]["name"] != "newSlide" and
-                   self._cursor[1]-i > -1):
-                i += 1
-
-            # Try to find the next pause command
-            j = 0
-            while (data[self._cursor[1]+j]["name"] != "pause" and
-                   self._cursor[1]+j < len(data)-1):
-                j += 1
-
-            # If there is a newSlide command, find the template. Otherwise
-            # we can continue anyway, but there will be no loaded objects.
-            # Same goes for an unfound template, it will just throw a lot of
-            # errors down the line...
-            template = None
-            if data[self._cursor[1]-i]["name"] != "newSlide":
-                print("WARNING: no newSlide in block!")
-            else:
-                # Check if the template exists
-                for block in self._data:
-                    if (block["name"] == "beginTemplate" and
-                        block["args"][0] == data[self._cursor[1]-i]["args"][0]):
-                        template = block["contents"]
-                        break
-                if template is None:
-                    print("ERROR: template '%s' not found"
-                          % (data[self._cursor[1]-i]["args"][0]))
-                    return
-
-            # If there is a template, load the objects in a dict
-            objects = {}
-
-            if template:
-                # Run through the template and fill a dict with all standard
-                # objects. This list can be appended later by the script if
-                # new objects are created on the fly
-                for setting in template:
-                    if setting["name"] == "setBackgroundColor":
-                        objects["background_color"] = QColor(setting["args"][0])
-                    else:
-                        if setting["name"] in template_functions:
-                            objects[setting["args"][0]] = argstodict(setting["args"][1:])
-                        elif (setting["name"] in show_functions) or (setting["name"] in resource_functions):
-                            print("ERROR: function '%s' not allowed in template" % (setting["name"]))
-                        else:
-                            print("ERROR: unknown template function '%s'"
-                                  % (setting["name"]))
-
-            # Work through all the commands until the cursor, putting all
-            # commands to execute in another dict, so changes in the same
-            # object are overwritten and only the final form is shown
-            drawingcommands = collections.OrderedDict()
-
-            for k in range(i+j):
-                command = data[self._cursor[1]-i+k+1]
-
-                # If we're previewing a template instead of a show, only
-                # template functions are allowed.
-                if not template and command["name"] not in template_functions:
-                    print("ERROR: function '%s' not allowed in template block"
-                          % (command["name"]))
-                    continue
-
-                # Nothing to do for drawing when it's a pause function
-                if command["name"] == "pause":
-                    continue
-
-                if len(command["args"]) == 0:
-                    print("ERROR: not enough arguments, at least the object name should be given")
-                    continue
-
-                name = command["args"][0]
-
-                if command["name"] in show_functions:
-                    # Get the object, if it already exists
-                    obj = objects.get(name)
-
-                    if not obj:
-                        print("ERROR: object '%s' undefined, first add it to the template or show using a template function" % (command["args"][0]))
-                        continue
-
-                    if not drawingcommands.get(name):
-                        print("Not in drawing commands yet")
-                        drawingcommands[name] = {"type": show_functions[command["name"]]}
-
-                        getattr(self, "change_" + show_functions[command["name"]])(drawingcommands[name], obj)
-                        # TODO: Add more commands here. Later, this should be a
-                        # dict with function/prefix pairs
-
-                    # Now change the settings according to this command
-                    drawingcommands.move_to_end(name)
-
-                    # Make all changes accessible through a dict structure
-                    changes = argstodict(command["args"][1:])
-
-                    # Now loop through the changes to make them
-
-                    getattr(self, "change_" + show_functions[command["name"]])(drawingcommands[name], changes)
-
-                elif command["name"] in template_functions:
-                    # Exception for the background color
-                    if command["name"] == "setBackgroundColor":
-                        objects["background_color"] = QColor(command["args"][0])
-                        continue
-
-                    # If it already exists, throw error
-                    if name in objects:
-                        print("ERROR: redefinition of object '%s'. Will not overwrite." % (command["args"][0]))
-                        continue
-
-                    # Add the object to the objects list before drawing
-                    objects[name] = argstodict(command["args"][1:])
-
-                    # Add the object to the drawing commands
-                    drawingcommands[name] = {"type": template_functions[command["name"]]}
-
-                    # Now draw, depending on the function
-                    getattr(self,
-                            "change_" + template_functions[command["name"]])(drawingcommands[name], objects[name])
-
-                else:
-                    print("WARNING: command '%s' unknown" % (command["name"]))
-
-            # First, treat the background separately, if set
-            if objects.get("background_color"):
-                color = objects["background_color"]
-                painter.fillRect(QRect(0,
-                                       0,
-                                       virtscreen.width(),
-                                       virtscreen.height()),
-                                 color)
-
-            # Now go through the drawing list, and execute
-            textflags = (Qt.TextFlag.TextWordWrap | Qt.TextFlag.TextDontClip |
-                         Qt.TextFlag.TextExpandTabs)
-
-            for entry in drawingcommands:
-
-                task = drawingcommands[entry]
-
-                # Text alignment
-                alignment = Qt.AlignmentFlag.AlignLeft
-
-                if "alignment" in task:
-                    if task["alignment"] == "right":
-                        alignment = Qt.AlignmentFlag.AlignRight
-                    elif task["alignment"] == "center":
-                        alignment = Qt.AlignmentFlag.AlignCenter
-                    elif task["alignment"] == "justify":
-                        alignment = Qt.AlignmentFlag.AlignJustify
-
-                if task["type"] == "text":
-                    painter.setFont(task["font"])
-                    painter.setPen(QPen(QColor(task["color"])))
-                    painter.drawText(QRect(int(task["x"]),
-                                           int(task["y"]),
-                                           int(task["width"]),
-                                           int(task["height"])),
-                                     textflags | alignment,
-                                     task["text"])
-                if task["type"] == "list":
-                    painter.setFont(task["font"])
-                    painter.setPen(QPen(QColor(task["color"])))
-
-                    # Loop through the list
-                    fm = QFontMetrics(task["font"])
-                    nextheight = 0
-
-                    for item in task["text"]:
-                        painter.drawText(QRect(int(task["x"]),
-                                               int(task["y"] + nextheight),
-                                               int(task["width"]),
-                                               int(task["height"])),
-                                         textflags | alignment,
-                                         item)
-
-                        if task["bullet_type"] == "c":
-                            bullet_font = QFont(task["font"])
-                            bullet_font.setPixelSize(bullet_font.pixelSize()
-                                                     * task["bullet_size"])
-                            painter.setFont(bullet_font)
-                            painter.drawText(QRect(int(task["x"]
-                                                   - task["bullet_spacing"]),
-                                                   int(task["y"]
-                                                   - (task["bullet_size"]-1)*task["font"].pixelSize()*0.7
-                                                   - task["bullet_offset"]
-                                                   + nextheight),
-                                                   int(task["width"]),
-                                                   int(task["height"])),
-                                             Qt.TextFlag.TextWordWrap | alignment,
-                                             task["bullet"])
-                            painter.setFont(task["font"])
-
-                        r = fm.boundingRect(0, 0, task["width"], 999999,
-                                            textflags | alignment,
-                                            item)
-                        nextheight = nextheight + r.height()
-
-        # Finish drawing
-        painter.end()
+            key = (id(self._data), self._cursor[0],
+                   frame_bounds(self._data, self._cursor))
+
+            if key != self._image_key:
+                start = time.perf_counter()
+                with span("evaluate"):
+                    state = evaluate(self._data, self._cursor)
+                with span("draw"):
+                    self._image = render(state, size=self._size)
+                self._image_key = key
+
+                cost = time.perf_counter() - start
+                self.render_cost = 0.7*self.render_cost + 0.3*cost
+
+            virtscreen = self._image
+        elif self._placeholder is not None:
+            virtscreen = self._placeholder
+        else:
+            return
 
         painter2 = QPainter()
         painter2.begin(self)
         painter2.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
-        painter2.drawPixmap(QRect(0,
-                                  0,
-                                  self.width(),
-                                  self.height()),
-                            virtscreen)
+        painter2.drawImage(QRect(0,
+                                 0,
+                                 self.width(),
+                                 self.height()),
+                           virtscreen)
         painter2.end()
 
-    def change_text(self, entry, changes):
-        """Change properties of a text object using the changes variable."""
-        print(changes)
-        # Make the font object
-        if entry.get("font"):
-            font = entry["font"]
-        else:
-            font = QFont()
-
-        if changes.get("fontname"):
-            font.setFamily(changes["fontname"])
-
-        if changes.get("fontsize"):
-            font.setPixelSize(changes["fontsize"])
-
-        # TODO: Kerning does nothing. Make kerning do the opposite of default
-        # Font decorations allowed:
-        # i - Italic
-        # b - Bold
-        # u - Underline
-        # f - Fixed pitch
-        # k - Kerning
-        # o - Overline
-        # s - Strike out
-        if changes.get("decoration"):
-            if "i" in changes["decoration"]:
-                font.setItalic(True)
-            if "b" in changes["decoration"]:
-                font.setBold(True)
-            if "u" in changes["decoration"]:
-                font.setUnderline(True)
-            if "f" in changes["decoration"]:
-                font.setFixedPitch(True)
-            if "k" in changes["decoration"]:
-                font.setKerning(True)
-            if "o" in changes["decoration"]:
-                font.setOverline(True)
-            if "s" in changes["decoration"]:
-                font.setStrikeOut(True)
-
-        # Other properties
-        # Capitalization
-        # Hinting
-        # Letter Spacing
-        # Stretch
-        # Style, Stylehint, Stylename, Stylestrategy
-        # Word spacing
-        # Weight
-
-        entry["font"] = font
-
-        # Set the text color
-        # TODO: the pen pattern, thickness, shadow, etc.
-        entry["color"] = (changes["color"]
-                          if changes.get("color")
-                          else (entry["color"]
-                                if "color" in entry
-                                else "#000")
-                          )
-
-        entry["x"] = (changes["x"]
-                      if "x" in changes
-                      else (entry["x"]
-                            if "x" in entry
-                            else 0.0)
-                      )
-        entry["y"] = (changes["y"]
-                      if "y" in changes
-                      else (entry["y"]
-                            if "y" in entry
-                            else 0.0)
-                      )
-        entry["width"] = (changes["width"]
-                          if "width" in changes
-                          else (entry["width"]
-                                if "width" in entry
-                                else 500.0)
-                          )
-        entry["height"] = (changes["height"]
-                           if "height" in changes
-                           else (entry["height"]
-                                 if "height" in entry
-                                 else 300.0)
-                           )
-
-        entry["text"] = (changes["text"]
-                         if "text" in changes
-                         else (entry["text"]
-                               if "text" in entry
-                               else "")
-                         )
-
-        entry["alignment"] = (changes["alignment"]
-                              if "alignment" in changes
-                              else (entry["alignment"]
-                                    if "alignment" in entry
-                                    else None)
-                              )
-
-    def change_list(self, entry, changes):
-        """Change properties of a bullet list object."""
-        # Properties are mostly the same as for a text object
-        self.change_text(entry, changes)
-
-        # ...except for the bullet type
-        # c=character, p=picture
-        entry["bullet_type"] = (changes["bullet_type"]
-                                if "bullet_type" in changes
-                                else (entry["bullet_type"]
-                                      if "bullet_type" in entry
-                                      else "c")
-                                )
-        entry["bullet"] = (changes["bullet"]
-                           if "bullet" in changes
-                           else (entry["bullet"]
-                                 if "bullet" in entry
-                                 else "■")
-                           )
-
-        entry["bullet_spacing"] = (changes["bullet_spacing"]
-                                   if "bullet_spacing" in changes
-                                   else (entry["bullet_spacing"]
-                                         if "bullet_spacing" in entry
-                                         else 100)
-                                   )
-
-        entry["bullet_size"] = (changes["bullet_size"]
-                                if "bullet_size" in changes
-                                else (entry["bullet_size"]
-                                      if "bullet_size" in entry
-                                      else 1)
-                                )
-
-        entry["bullet_offset"] = (changes["bullet_offset"]
-                                  if "bullet_offset" in changes
-                                  else (entry["bullet_offset"]
-                                        if "bullet_offset" in entry
-                                        else 0)
-                                  )
-
-
-def argstodict(args):
-    """Convert an argument list to a dictionary."""
-    obj = {}
-    for entry in args:
-        if len(entry) == 2:
-            obj[entry[0][0]] = entry[1]
-        else:
-            print("ERROR: value without a key: '%s'" % (str(entry[0])))
 
-    return obj
+class PyShowPreviewScheduler(QObject):
+    """Decides when the preview is updated after changes in the editor."""
+
+    # Bounds of the delay in ms before updating after a change of the text,
+    # and after only a move of the cursor
+    TEXT_DELAY = (50, 1000)
+    CURSOR_DELAY = (0, 200)
+
+    def __init__(self, editor, preview):
+        super().__init__()
+
+        self._editor = editor
+        self._preview = preview
+
+        # Whether the text has changed since the last parse, and the result
+        # of the last parse
+        self._text_changed = True
+        self._show = None
+
+        # The show and frame currently in the preview
+        self._shown = None
+
+        # Moving average of the time it takes to parse the script
+        self._parse_cost = 0.0
+
+        # Bursts of changes (like holding down a key) are coalesced: the
+        # timer is not restarted while it runs, and when it fires only the
+        # latest text and cursor are used, so no stale work piles up
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.run)
+
+        self._editor.textChanged.connect(self.text_changed)
+        self._editor.cursorPositionChanged.connect(self.cursor_moved)
+
+    def delay(self, bounds, cost):
+        """Return a delay in ms within bounds, growing with the cost in s."""
+        return int(min(max(2*cost*1000, bounds[0]), bounds[1]))
+
+    def text_changed(self):
+        """Schedule a parse and update after a change of the text."""
+        self._text_changed = True
+        cost = self._parse_cost + self._preview.render_cost()
+        self.schedule(self.delay(self.TEXT_DELAY, cost))
+
+    def cursor_moved(self):
+        """Schedule an update after a move of the cursor."""
+        # While typing, the cursor moves with every key. The update scheduled
+        # for the text change already takes care of that
+        if self._text_changed:
+            return
+
+        self.schedule(self.delay(self.CURSOR_DELAY,
+                                 self._preview.render_cost()))
+
+    def schedule(self, delay):
+        """Start the timer if it isn't running, or bring it forward."""
+        if not self._timer.isActive() or self._timer.remainingTime() > delay:
+            self._timer.start(delay)
+
+    def run(self):
+        """Update the preview to the current text and cursor."""
+        if self._text_changed:
+            start = time.perf_counter()
+            self._show = self._editor.parser().parse()
+            cost = time.perf_counter() - start
+            self._parse_cost = 0.7*self._parse_cost + 0.3*cost
+            self._text_changed = False
+
+        # If only the cursor moved, the last parse is still valid
+        show = self._show
+        if show is None:
+            return
+
+        with span("cursor"):
+            cursor = locate(show, self._editor.textCursor().position())
+
+        # Moving within the same frame doesn't change the preview
+        shown = (id(show), cursor[0], frame_bounds(show, cursor))
+        if shown == self._shown:
+            return
+
+        self._shown = shown
+        self._preview.refresh(show, cursor)
+
+    def update_now(self):
+        """Forget what is shown and update the preview right away."""
+        self._text_changed = True
+        self._shown = None
+        self._timer.stop()
+        self.run()
@@ -48,16 +48,24 @@ class PyShowRibbon(QToolBar):
         self._widget.setMinimumHeight(125)
         self.addWidget(self._widget)
 
+        # Tabs are only filled when they are shown for the first time, so
+        # tabs that are never opened don't cost any startup time
+        self._builders = {}
+        self._widget.currentChanged.connect(self.build_tab)
+
         self.makeup()
 
-    def add_tab(self, name):
-        """Add a new tab to the RibbonBar."""
+    def add_tab(self, name, builder=None):
+        """Add a new tab to the RibbonBar, filled by builder when shown."""
         # Make a new ribbon tab widget
         tab = PyShowRibbonTab(self)
         # Give the tab a name so we can activate it later when necessary
         tab.setObjectName('tab_' + name)
         # Add the tab to the ribbon
+        if builder is not None:
+            self._builders[tab] = builder
         self._widget.addTab(tab, name)
+        self.build_tab(self._widget.currentIndex())
 
         # Now add a spacer tab. This is a hack, but the only one
         # I know of right now that works
@@ -68,6 +76,13 @@ class PyShowRibbon(QToolBar):
 
         return tab
 
+    def build_tab(self, index):
+        """Fill the tab at the given index, if that didn't happen yet."""
+        builder = self._builders.pop(self._widget.widget(index), None)
+
+        if builder is not None:
+            builder(self._widget.widget(index))
+
     def set_active(self, name):
         """Set a tab of the RibbonBar as active."""
         # Select a tab by name
@@ -24,7 +24,15 @@ in the application. Also Capslock, Numlock and Scrolllock are indicated
 
 # TODO: Indicate capslock, numlock and scrolllock
 
-from PyQt6.QtWidgets import QStatusBar
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QStatusBar, QLabel
+from Core import PyShowTiming
+
+# The timing spans shown in the status bar, in this order
+TIMING_SPANS = ("parse", "cursor", "evaluate", "draw")
+
+# Time in ms between updates of the timing field
+TIMING_INTERVAL = 1000
 
 
 class PyShowStatusbar(QStatusBar):
@@ -36,3 +44,56 @@ class PyShowStatusbar(QStatusBar):
         self.setStyleSheet("background-color: white;"
                            "border-top: 1px solid #DDD;"
                            "height: 20px;")
+
+        # Timing of the hot paths, as median and 95th percentile in ms
+        self._timing = QLabel()
+        self._timing.setToolTip("Median / 95th percentile duration in ms")
+        self.addPermanentWidget(self._timing)
+
+        # Drawing of the editor, as mean and maximum of the last frames in ms
+        self._frames = QLabel()
+        self._frames.setToolTip("Mean / maximum duration in ms of drawing "
+                                "the editor, and the number of line number "
+                                "updates done for the updates requested")
+        self.addPermanentWidget(self._frames)
+        self._frame_stats = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(TIMING_INTERVAL)
+        self._timer.timeout.connect(self.update_timing)
+        self._timer.start()
+
+    def update_timing(self):
+        """Show the latest timing of the hot paths."""
+        fields = []
+
+        for name in TIMING_SPANS:
+            stats = PyShowTiming.span_stats(name)
+            if stats is not None:
+                fields.append("%s %.1f/%.1f" % (name,
+                                                stats["p50"],
+                                                stats["p95"]))
+
+        text = "  ".join(fields)
+        if text != self._timing.text():
+            self._timing.setText(text)
+
+        if self._frame_stats is None:
+            return
+
+        fields = []
+        for name, stats in self._frame_stats().items():
+            if "requested" in stats:
+                fields.append("%s %d/%d" % (name, stats["count"],
+                                            stats["requested"]))
+            elif stats["count"]:
+                fields.append("%s %.1f/%.1f" % (name, stats["mean"],
+                                                stats["max"]))
+
+        text = "  ".join(fields)
+        if text != self._frames.text():
+            self._frames.setText(text)
+
+    def show_frame_stats(self, frame_stats):
+        """Show the frame counters returned by the given function as well."""
+        self._frame_stats = frame_stats
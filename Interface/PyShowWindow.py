@@ -21,15 +21,27 @@ The main PyShow window.
 Class taking care of populating the main PyShow window, as well as the menus
 and shortcut registration.
 """
-from PyQt6.QtGui import QAction
-from PyQt6.QtWidgets import (QMainWindow, QSplitter,
-                             QMessageBox)
+import os
+from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtGui import QAction, QGuiApplication, QPageLayout
+from PyQt6.QtWidgets import (QMainWindow, QSplitter, QFileDialog,
+                             QMessageBox, QProgressDialog)
+from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
 from Interface.PyShowRibbon import PyShowRibbon, PyShowRibbonPushButton
 from Interface.PyShowIcons import PyShowIcons
 from Interface.PyShowStatusbar import PyShowStatusbar
-from Interface.PyShowEditor import PyShowEditor
-from Interface.PyShowPreview import PyShowPreview
+from Interface.PyShowEditor import EDITORS
+from Interface.PyShowConsole import PyShowConsole
+from Interface.PyShowPresenter import PyShowPresenter
+from Interface.PyShowPresenterView import PyShowPresenterView
+from Interface.PyShowNavigator import PyShowNavigator
+from Interface.PyShowPreview import PyShowPreview, PyShowPreviewScheduler
 from Core.PyShowProject import PyShowProject
+from Core.PyShowEvaluator import frames, locate
+from Core.PyShowPrint import print_show, export_pdf
+from Core.PyShowTimeline import PyShowTimeline
+from Core import PyShowTiming
+from Core.PyShowDiagnostics import diagnostics, APPLICATION
 
 
 class PyShowWindow(QMainWindow):
@@ -41,11 +53,24 @@ class PyShowWindow(QMainWindow):
         self._actions = {}
         self._icons = PyShowIcons()
         self._project = None
+        self._presenter = None
+        self._timeline = PyShowTimeline()
+        self._painted = False
+        self._args = args
+        PyShowTiming.mark('icons')
 
         self.setWindowIcon(self._icons.icon("pyshow_icon"))
         self.init_actions()
+        PyShowTiming.mark('actions')
         self.init_ui()
 
+        # Open the project given on the command line only after the window
+        # is shown, so opening a large project doesn't delay the first paint
+        if args.project:
+            QTimer.singleShot(0, lambda: self._project.open(args.project))
+        else:
+            QTimer.singleShot(0, self._project.recover_untitled)
+
     def init_actions(self):
         """Initialize all actions that can be performed in this window."""
         # New file action
@@ -76,18 +101,45 @@ class PyShowWindow(QMainWindow):
         self.addAction(action)
         self._actions['file_print'] = action
 
+        # Export to PDF
+        action = QAction(self._icons.icon("file_export"), "Export\nPDF", self)
+        action.setShortcut('Ctrl+E')
+        action.triggered.connect(self.on_file_export)
+        self.addAction(action)
+        self._actions['file_export'] = action
+
+        # Present from the start
+        action = QAction(self._icons.icon("show_start"), "From\nbeginning", self)
+        action.setShortcut('F5')
+        action.triggered.connect(self.on_show_start)
+        self.addAction(action)
+        self._actions['show_start'] = action
+
+        # Present from the frame at the cursor
+        action = QAction(self._icons.icon("show_current"), "From\ncurrent", self)
+        action.setShortcut('Shift+F5')
+        action.triggered.connect(self.on_show_current)
+        self.addAction(action)
+        self._actions['show_current'] = action
+
+        # Jump to a frame by number or title
+        action = QAction(self._icons.icon("show_goto"), "Go to\nslide", self)
+        action.setShortcut('Ctrl+G')
+        action.triggered.connect(self.on_show_goto)
+        self.addAction(action)
+        self._actions['show_goto'] = action
+
     def init_ui(self):
         """Initialize the window settings and all UI components."""
         # Some basic setup for the window
         self.setWindowTitle('PyShow')
         self.resize(1280, 800)
-        self.showMaximized()
-        self.show()
 
         # Adding the different UI components
 
         # Ribbonbar
         self.init_ribbon()
+        PyShowTiming.mark('ribbon')
 
         # Statusbar
         self._statusbar = PyShowStatusbar()
@@ -104,35 +156,62 @@ class PyShowWindow(QMainWindow):
 
         # Project manager
         # Editor
-        self.editor = PyShowEditor()
+        self.editor = EDITORS[self._args.editor]()
+        self._statusbar.show_frame_stats(self.editor.frame_stats)
         # The project must be defined here, after the editor has been made
         self._project = PyShowProject(self)
         self._project.new()
-        self._splitter.addWidget(self.editor)
+
+        # The console with problems in the script goes below the editor
+        self._console = PyShowConsole(self.editor)
+        self._editor_splitter = QSplitter(Qt.Orientation.Vertical)
+        self._editor_splitter.addWidget(self.editor)
+        self._editor_splitter.addWidget(self._console)
+        self._editor_splitter.setStretchFactor(0, 4)
+        self._editor_splitter.setStretchFactor(1, 1)
+        self._splitter.addWidget(self._editor_splitter)
+        PyShowTiming.mark('editor')
 
         # Preview window
         self._preview = PyShowPreview(self._splitter)
         self._splitter.addWidget(self._preview)
         self._preview.initialize()
-        self.editor.cursorPositionChanged.connect(self.updatepreview)
+        self._scheduler = PyShowPreviewScheduler(self.editor, self._preview)
+        PyShowTiming.mark('preview')
+
+        # Only show the window when everything is in place
+        self.showMaximized()
 
     def init_ribbon(self):
         """Initialize the Ribbon bar with all components in it."""
         self._ribbon = PyShowRibbon(self)
         self.addToolBar(self._ribbon)
 
-        self._ribbon.add_tab('File')
+        self._ribbon.add_tab('File', self.init_file_tab)
         self._ribbon.add_tab('Home')
         self._ribbon.add_tab('Insert')
         self._ribbon.add_tab('Animations')
+        self._ribbon.add_tab('Slide Show', self.init_show_tab)
 
-        file_opensave = self._ribbon["File"].add_pane('Open/Save')
+    def init_file_tab(self, tab):
+        """Fill the File tab of the ribbon bar."""
+        file_opensave = tab.add_pane('Open/Save')
         file_opensave.add_widget(PyShowRibbonPushButton(self, self._actions['file_new'], 3))
         file_opensave.add_widget(PyShowRibbonPushButton(self, self._actions['file_open'], 3))
         file_opensave.add_widget(PyShowRibbonPushButton(self, self._actions['file_save'], 3))
 
-        file_print = self._ribbon["File"].add_pane('Printing')
+        file_print = tab.add_pane('Printing')
         file_print.add_widget(PyShowRibbonPushButton(self, self._actions['file_print'], 3))
+        file_print.add_widget(PyShowRibbonPushButton(self, self._actions['file_export'], 3))
+
+    def init_show_tab(self, tab):
+        """Fill the Slide Show tab of the ribbon bar."""
+        show_start = tab.add_pane('Start')
+        show_start.add_widget(PyShowRibbonPushButton(self, self._actions['show_start'], 3))
+        show_start.add_widget(PyShowRibbonPushButton(self, self._actions['show_current'], 3))
+
+        show_navigate = tab.add_pane('Navigate')
+        show_navigate.add_widget(PyShowRibbonPushButton(self, self._actions['show_goto'], 3))
 
     def on_file_new(self):
         """Close any current project and beginning a new project."""
@@ -171,7 +250,139 @@ class PyShowWindow(QMainWindow):
 
     def on_file_print(self):
         """Open the printing wizard and print the current project."""
-        pass
+        show = self.editor.parser().parse()
+
+        if show is None or not frames(show):
+            self._statusbar.showMessage('Nothing to print', 5000)
+            return
+
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        printer.setPageOrientation(QPageLayout.Orientation.Landscape)
+        printer.setDocName(os.path.basename(self._project.name()))
+
+        dialog = QPrintDialog(printer, self)
+        if dialog.exec() != QPrintDialog.DialogCode.Accepted:
+            return
+
+        if self.printing('Printing...', lambda progress:
+                         print_show(printer, show, progress)):
+            self._statusbar.showMessage('Printed', 5000)
+
+    def on_file_export(self):
+        """Write the current project to a PDF file."""
+        show = self.editor.parser().parse()
+
+        if show is None or not frames(show):
+            self._statusbar.showMessage('Nothing to export', 5000)
+            return
+
+        name = os.path.splitext(self._project.filename())[0]
+        filename = QFileDialog.getSaveFileName(self,
+                                               'Export PDF',
+                                               name + '.pdf' if name else '',
+                                               'PDF (*.pdf)')[0]
+        if not filename:
+            return
+
+        title = os.path.basename(self._project.name())
+        if self.printing('Exporting...', lambda progress:
+                         export_pdf(show, filename, title, progress)):
+            self._statusbar.showMessage('Exported to %s' % (filename), 5000)
+
+    def printing(self, label, work):
+        """Run a print or export, showing its progress. Return if completed."""
+        dialog = QProgressDialog(label, 'Cancel', 0, 0, self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
+
+        def progress(number, total):
+            dialog.setMaximum(total)
+            dialog.setValue(number)
+            return not dialog.wasCanceled()
+
+        completed = work(progress)
+        dialog.close()
+
+        return completed
+
+    def on_show_start(self):
+        """Present the show from the first frame."""
+        self.present(False)
+
+    def on_show_current(self):
+        """Present the show from the frame at the cursor."""
+        self.present(True)
+
+    def on_show_goto(self):
+        """Move the cursor to a frame, found by number or title."""
+        timeline = self.timeline()
+
+        if not len(timeline):
+            self._statusbar.showMessage('No slides in the show', 5000)
+            return
+
+        navigator = PyShowNavigator(timeline, self)
+
+        if navigator.exec() and navigator.chosen is not None:
+            cursor = self.editor.textCursor()
+            cursor.setPosition(navigator.chosen.loc)
+            self.editor.setTextCursor(cursor)
+            self.editor.ensureCursorVisible()
+            self.editor.setFocus()
+
+    def timeline(self):
+        """Return the timeline of the current script."""
+        # Only the slides changed since the last time are evaluated again
+        show = self.editor.parser().parse()
+        self._timeline.update(self._project.text(), show)
+
+        return self._timeline
+
+    def present(self, current):
+        """Open the presentation, at the start or at the cursor."""
+        show = self.editor.parser().parse()
+        timeline = self.timeline()
+
+        if not len(timeline):
+            self._statusbar.showMessage('Nothing to present', 5000)
+            return
+
+        # Start at the first frame that ends at or after the cursor
+        start = 0
+        if current:
+            start = timeline.index(locate(show, self.editor.textCursor().position()))
+
+        if self._presenter is not None:
+            self._presenter.close()
+
+        # With a second screen, the audience sees the presentation there,
+        # and the presenter gets notes and the next frame on this one
+        primary = QGuiApplication.primaryScreen()
+        others = [screen for screen in QGuiApplication.screens()
+                  if screen is not primary]
+
+        self._presenter = PyShowPresenter(show, timeline, start,
+                                          others[0] if others else None)
+        self._presenter.destroyed.connect(self.presenter_closed)
+
+        if others:
+            view = PyShowPresenterView(self._presenter, primary)
+            view.showFullScreen()
+
+        self._presenter.showFullScreen()
+
+    def presenter_closed(self):
+        """Call when the presentation is closed."""
+        self._presenter = None
+
+    def paintEvent(self, event):
+        """Paint the window, and note the first time this happens."""
+        super().paintEvent(event)
+
+        if not self._painted:
+            self._painted = True
+            PyShowTiming.mark('first paint')
+            PyShowTiming.print_startup_report()
 
     def closeEvent(self, event):
         """Call when user closes the PyShow main window."""
@@ -189,39 +400,18 @@ class PyShowWindow(QMainWindow):
 
         self._project.close()
 
+    def preview(self):
+        """Return the preview widget."""
+        return self._preview
+
     def enable_action(self, name, enabled):
         """Enable or disable an action with the given name."""
         if name in self._actions:
             self._actions[name].setEnabled(enabled)
         else:
-            print("No such action")
+            diagnostics.warning("no such action '%s'" % (name),
+                                source=APPLICATION)
 
     def updatepreview(self):
-        """Update the preview depending on the cursor position."""
-        parsed = self.editor._parser.parse()
-
-        if parsed is None:
-            print("Nothing to parse")
-        else:
-            # We need two things: the parsed data, and the location of the
-            # cursor within this parsed data. The first we have, now calculate
-            # the second
-            cursor = self.editor.textCursor().position()
-            pos_l1 = -2
-            pos_l2 = -2
-
-            # Determine the block we are in
-            i = len(parsed)-1
-            while parsed[i][0][1] > cursor and i > 0:
-                i -= 1
-            pos_l1 = i
-
-            # Now determine the position within the block. The -1 after the
-            # position given by pyparsing is to compensate for the 1 tab
-            # indentation for the block
-            j = len(parsed[pos_l1]["contents"])-1
-            while parsed[pos_l1]["contents"][j][0][1]-1 > cursor and j > 0:
-                j -= 1
-            pos_l2 = j
-
-            self._preview.refresh(parsed, (pos_l1, pos_l2))
+        """Update the preview depending on the cursor position, right away."""
+        self._scheduler.update_now()
@@ -0,0 +1,57 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of the parts of PyShow that work without a window.
+
+Run them from the directory of main.py, with either of:
+
+    python -m unittest
+    python -m pytest Tests
+"""
+
+import os
+
+# Laying out text needs Qt, but not a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+_application = None
+
+
+def application():
+    """Return the Qt application the tests share, made on first use."""
+    global _application
+
+    from PyQt6.QtGui import QGuiApplication
+
+    if QGuiApplication.instance() is None:
+        _application = QGuiApplication([])
+
+    return QGuiApplication.instance()
+
+
+# A template and the start of a show, used by most tests
+TEMPLATE = """beginTemplate('T')
+{
+\tsetBackgroundColor('#500')
+\taddTextBox('Title', text='Title', x=60, y=30, width=1500, height=200,
+\t\t\t   fontname='Arial', fontsize=90, color='#FFF')
+\taddBulletList('Points', text=['One'], x=200, y=400, width=1500,
+\t\t\t\t  height=600, fontname='Arial', fontsize=40, color='#FFF')
+\taddImage('Picture', x=1500, y=50, width=300, height=200)
+}
+"""
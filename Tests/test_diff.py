@@ -0,0 +1,134 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of the changes and damage between two frames.
+"""
+
+import unittest
+from collections import OrderedDict
+from PyQt6.QtCore import QRectF
+from Tests import application
+from Core.PyShowDiff import diff, merge, repaint, DAMAGE_MARGIN
+from Core.PyShowRenderer import render, SLIDE_SIZE
+
+
+def picture(x, y, width=100, height=100):
+    """Return an image object without a file, drawn as a placeholder."""
+    return {"type": "image", "source": "", "file": "",
+            "x": x, "y": y, "width": width, "height": height}
+
+
+def points(text):
+    """Return a bullet list object with the given lines."""
+    return {"type": "list", "fontname": "Arial", "fontsize": 40,
+            "decoration": "", "color": "#000", "x": 200, "y": 400,
+            "width": 1500, "height": 600, "text": text, "alignment": None,
+            "bullet_type": "c", "bullet": "■", "bullet_spacing": 100,
+            "bullet_size": 1, "bullet_offset": 0}
+
+
+def state(background='#FFF', **objects):
+    """Return an evaluated state with the given objects, in that order."""
+    return {"background_color": background,
+            "objects": OrderedDict(objects),
+            "notes": [],
+            "transition": None}
+
+
+def everything():
+    """Return the damage of the whole slide."""
+    return [QRectF(0, 0, SLIDE_SIZE[0], SLIDE_SIZE[1])]
+
+
+class TestDiff(unittest.TestCase):
+    """Finding the changed objects and the damaged part of the slide."""
+
+    @classmethod
+    def setUpClass(cls):
+        application()
+
+    def test_same(self):
+        before = state(a=picture(10, 10))
+        after = state(a=picture(10, 10))
+
+        self.assertEqual(diff(before, after), ([], []))
+
+    def test_moved(self):
+        before = state(a=picture(10, 10), b=picture(1000, 800))
+        after = state(a=picture(500, 10), b=picture(1000, 800))
+
+        changes = diff(before, after)
+        self.assertEqual(changes.changed, ["a"])
+
+        # Both the old and the new place, with a margin
+        m = DAMAGE_MARGIN
+        self.assertEqual(sorted(rect.getRect() for rect in changes.damage),
+                         [(10 - m, 10 - m, 100 + 2*m, 100 + 2*m),
+                          (500 - m, 10 - m, 100 + 2*m, 100 + 2*m)])
+
+    def test_added_and_removed(self):
+        before = state(a=picture(10, 10))
+        after = state(b=picture(500, 500))
+
+        changes = diff(before, after)
+        self.assertEqual(sorted(changes.changed), ["a", "b"])
+        self.assertEqual(len(changes.damage), 2)
+
+    def test_whole_slide(self):
+        first = state(a=picture(10, 10), b=picture(500, 500))
+
+        # Without a frame before, after another background and when the
+        # objects are drawn in another order
+        self.assertEqual(diff(None, first).damage, everything())
+        self.assertEqual(diff(first, state('#000', a=picture(10, 10),
+                                           b=picture(500, 500))).damage,
+                         everything())
+        self.assertEqual(diff(first, state(b=picture(500, 500),
+                                           a=picture(10, 10))).damage,
+                         everything())
+
+    def test_added_bullet(self):
+        before = state(p=points(["One"]))
+        after = state(p=points(["One", "Two"]))
+
+        # Only the new line is damaged, below the first one
+        damage = diff(before, after).damage
+        self.assertTrue(damage)
+        for rect in damage:
+            self.assertGreater(rect.top(), 400 + DAMAGE_MARGIN)
+            self.assertLess(rect.bottom(), 1000)
+
+    def test_merge(self):
+        rects = [QRectF(0, 0, 10, 10), QRectF(100, 100, 10, 10),
+                 QRectF(5, 5, 10, 10), QRectF(12, 12, 95, 95)]
+
+        # The last rectangle joins the others into one
+        self.assertEqual(merge(rects), [QRectF(0, 0, 110, 110)])
+        self.assertEqual(len(merge(rects[:3])), 2)
+
+    def test_repaint(self):
+        before = state(a=picture(10, 10), p=points(["One"]))
+        after = state(a=picture(300, 10), p=points(["One", "Two"]))
+
+        image = repaint(render(before, 0.5), after, diff(before, after),
+                        0.5)
+        self.assertEqual(image, render(after, 0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
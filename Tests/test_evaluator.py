@@ -0,0 +1,148 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of evaluating frames, and of the problems reported on the way.
+"""
+
+import unittest
+from Tests import TEMPLATE
+from Core.PyShowLanguage import parse_script
+from Core.PyShowEvaluator import frames, evaluate, TRANSITION_DURATION
+from Core.PyShowDiagnostics import PyShowDiagnostics, ERROR, WARNING
+
+
+def evaluate_all(text):
+    """Return the states of all frames of a script, and the diagnostics."""
+    show = parse_script(text)
+    diagnostics = PyShowDiagnostics()
+    states = [evaluate(show, cursor, diagnostics) for cursor in frames(show)]
+
+    return states, diagnostics.entries()
+
+
+def messages(entries, level):
+    """Return the messages of the diagnostics with the given level."""
+    return [entry.message for entry in entries if entry.level == level]
+
+
+class TestEvaluate(unittest.TestCase):
+    """Evaluating a show into the objects on its frames."""
+
+    def test_frames(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox('Title', text='First')
+\tpause()
+\tsetBulletList('Points', text=['a', 'b'])
+}
+""")
+        self.assertEqual(len(states), 2)
+        self.assertEqual(entries, [])
+        self.assertEqual(states[0]["background_color"], '#500')
+        self.assertEqual(list(states[0]["objects"]), ["Title"])
+        self.assertEqual(states[0]["objects"]["Title"]["text"], 'First')
+        self.assertEqual(states[1]["objects"]["Points"]["text"], ['a', 'b'])
+
+    def test_template_without_arguments(self):
+        states, entries = evaluate_all("""beginTemplate('T')
+{
+\tsetBackgroundColor()
+\taddTextBox()
+\taddTextBox('Title', text='Title')
+}
+beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox('Title', text='First')
+}
+""")
+        self.assertEqual(states[0]["objects"]["Title"]["text"], 'First')
+        self.assertEqual(len(messages(entries, ERROR)), 2)
+
+    def test_show_command_without_arguments(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox()
+}
+""")
+        self.assertEqual(len(states), 1)
+        self.assertEqual(len(messages(entries, ERROR)), 1)
+
+    def test_wrong_object_type(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetBulletList('Title', text=['a'])
+}
+""")
+        self.assertNotIn("Title", states[0]["objects"])
+        self.assertEqual(len(messages(entries, ERROR)), 1)
+
+    def test_wrong_setting_type(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox('Title', text=5, fontsize=20)
+}
+""")
+        title = states[0]["objects"]["Title"]
+        self.assertEqual(title["text"], 'Title')
+        self.assertEqual(title["fontsize"], 20)
+        self.assertEqual(len(messages(entries, ERROR)), 1)
+
+    def test_unknown_setting(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox('Title', bullet='*')
+}
+""")
+        self.assertNotIn("bullet", states[0]["objects"]["Title"])
+        self.assertEqual(len(messages(entries, WARNING)), 1)
+
+    def test_unknown_template(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('Nope')
+}
+""")
+        self.assertEqual(states, [None])
+        self.assertEqual(len(messages(entries, ERROR)), 1)
+
+    def test_transition(self):
+        states, entries = evaluate_all(TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tpause(transition='fade', duration=250)
+\tpause(transition='push', duration='slow')
+\tpause(transition='spin')
+\tpause()
+}
+""")
+        self.assertEqual([state["transition"] for state in states],
+                         [None,
+                          {"type": "fade", "duration": 250},
+                          {"type": "push", "duration": TRANSITION_DURATION},
+                          None])
+        self.assertEqual(len(messages(entries, WARNING)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of compiling scripts: functions, included files and the parser cache.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from pyparsing import ParseException
+from Tests import TEMPLATE
+from Core import PyShowLanguage
+from Core.PyShowLanguage import (parse_script, dump_compiled, load_compiled,
+                                 PyShowParser, PyShowSetting, modules)
+from Core.PyShowResources import resources
+
+FUNCTION = """beginFunction('pointSlide', title, points)
+{
+\tnewSlide('T')
+\tsetTextBox('Title', text=title)
+\tsetBulletList('Points', text=points)
+}
+"""
+
+
+def show_block(show):
+    """Return the commands of the show block of a compiled script."""
+    return [block for block in show if block.name == "beginShow"][0].contents
+
+
+class TestFunctions(unittest.TestCase):
+    """Expanding the calls of functions while compiling."""
+
+    def test_expand(self):
+        text = TEMPLATE + FUNCTION + """beginShow()
+{
+\tpointSlide('One', ['a', 'b'])
+\tpointSlide(points=[], title='Two')
+}
+"""
+        show = parse_script(text)
+        commands = show_block(show)
+
+        self.assertNotIn("beginFunction", [block.name for block in show])
+        self.assertEqual([command.name for command in commands],
+                         ["newSlide", "setTextBox", "setBulletList"]*2)
+        self.assertEqual(commands[1].args[1].value, 'One')
+        self.assertEqual(commands[2].args[1].value, ['a', 'b'])
+        self.assertEqual(commands[4].args[1].value, 'Two')
+        self.assertEqual(commands[5].args[1].value, [])
+
+    def test_locations(self):
+        text = TEMPLATE + FUNCTION + """beginShow()
+{
+\tpointSlide('One', ['a'])
+\tpointSlide('One', ['a'])
+}
+"""
+        commands = show_block(parse_script(text))
+        calls = [text.index("pointSlide('One'"),
+                 text.rindex("pointSlide('One'")]
+
+        # Commands and their settings all point at their call
+        for command, call in zip(commands, [calls[0]]*3 + [calls[1]]*3):
+            self.assertEqual(command.loc, call)
+            for arg in command.args:
+                if isinstance(arg, PyShowSetting):
+                    self.assertEqual(arg.loc, call)
+
+    def test_memoization(self):
+        text = TEMPLATE + FUNCTION + """beginShow()
+{
+\tpointSlide('One', ['a'])
+\tpointSlide('One', ['a'])
+\tpointSlide('Two', ['a'])
+}
+"""
+        bind = PyShowLanguage.bind
+        with mock.patch.object(PyShowLanguage, 'bind',
+                               side_effect=bind) as counted:
+            commands = show_block(parse_script(text))
+
+        # The function is expanded once for every different call
+        self.assertEqual(counted.call_count, 2)
+        self.assertEqual(len(commands), 9)
+        self.assertEqual(commands[7].args[1].value, 'Two')
+
+    def test_nested_calls(self):
+        text = TEMPLATE + FUNCTION + """beginFunction('twice', title)
+{
+\tpointSlide(title, ['1'])
+\tpointSlide(title, ['2'])
+}
+beginShow()
+{
+\ttwice('Hi')
+}
+"""
+        commands = show_block(parse_script(text))
+        self.assertEqual(len(commands), 6)
+        self.assertEqual(commands[4].args[1].value, 'Hi')
+
+    def test_nested_expression(self):
+        text = TEMPLATE + """beginFunction('f', x)
+{
+\tnewSlide('T', g(x){ pause(y=x) })
+}
+beginShow()
+{
+\tf('T')
+}
+"""
+        show = parse_script(text)
+        nested = show_block(show)[0].args[1][0]
+        self.assertEqual(nested.args, ['T'])
+        self.assertEqual(nested.contents[0].args[0].value, 'T')
+
+        # Nothing of the function is left, so the show can be stored
+        stored = json.loads(json.dumps(dump_compiled(show)))
+        self.assertEqual(load_compiled(stored), show)
+
+    def test_errors(self):
+        scripts = [
+            # Unknown parameter, also in a nested expression
+            "beginFunction('f', x)\n{\n\tnewSlide(y)\n}\n",
+            "beginFunction('f', x)\n{\n\tnewSlide('T', g(z){ pause() })\n}\n",
+            # A name outside of a function
+            "beginShow()\n{\n\tnewSlide(x)\n}\n",
+            "beginShow()\n{\n\tnewSlide('T', g(z){ pause() })\n}\n",
+            # Wrong calls
+            "beginFunction('f', x)\n{\n\tpause()\n}\n"
+            "beginShow()\n{\n\tf()\n}\n",
+            "beginFunction('f', x)\n{\n\tpause()\n}\n"
+            "beginShow()\n{\n\tf(1, 2)\n}\n",
+            "beginFunction('f', x)\n{\n\tpause()\n}\n"
+            "beginShow()\n{\n\tf(1, x=2)\n}\n",
+            # Recursion and names of commands
+            "beginFunction('f')\n{\n\tf()\n}\n"
+            "beginShow()\n{\n\tf()\n}\n",
+            "beginFunction('pause')\n{\n\tnewSlide('T')\n}\n",
+        ]
+
+        for text in scripts:
+            with self.subTest(text=text):
+                with self.assertRaises(ParseException):
+                    parse_script(TEMPLATE + text)
+
+
+class TestIncludes(unittest.TestCase):
+    """Including script files, and reusing what was compiled before."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pyshow-test-')
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(setattr, resources, 'directory', resources.directory)
+        self.addCleanup(modules.clear)
+
+    def write(self, filename, text):
+        path = os.path.join(self.directory, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    def test_include(self):
+        self.write('lib/templates.script', TEMPLATE)
+        text = ("include('lib/templates.script')\n"
+                "beginShow()\n{\n\tnewSlide('T')\n}\n")
+        show = parse_script(text, directory=self.directory)
+
+        self.assertEqual([block.name for block in show],
+                         ["include", "beginTemplate", "beginShow"])
+
+        # Included blocks get the place of the directive
+        self.assertEqual(show[1].loc, 0)
+        self.assertEqual(show[0].args[1],
+                         os.path.join(self.directory, 'lib', 'templates.script'))
+
+    def test_nested_include(self):
+        self.write('lib/templates.script', TEMPLATE)
+        self.write('lib/all.script', "include('templates.script')\n")
+        text = "include('lib/all.script')\n"
+        show = parse_script(text, directory=self.directory)
+
+        self.assertIn("beginTemplate", [block.name for block in show])
+
+    def test_errors(self):
+        self.write('a.script', "include('b.script')\n")
+        self.write('b.script', "include('a.script')\n")
+        self.write('bad.script', "beginShow(\n")
+
+        for text in ("include('missing.script')\n",
+                     "include('a.script')\n",
+                     "include('bad.script')\n"):
+            with self.subTest(text=text):
+                with self.assertRaises(ParseException):
+                    parse_script(text, directory=self.directory)
+
+    def test_parser_cache(self):
+        self.write('templates.script', TEMPLATE)
+        text = "include('templates.script')\n"
+        resources.directory = self.directory
+        parser = PyShowParser(None)
+
+        first = parser.parse_text(text)
+        self.assertIs(parser.parse_text(text), first)
+
+        # A changed included file is compiled again
+        self.write('templates.script', TEMPLATE.replace("'T'", "'Other'"))
+        second = parser.parse_text(text)
+        self.assertIsNot(second, first)
+        self.assertEqual(second[1].args[0], 'Other')
+
+    def test_parser_cache_directory(self):
+        other = tempfile.mkdtemp(prefix='pyshow-test-')
+        self.addCleanup(shutil.rmtree, other)
+
+        self.write('templates.script', TEMPLATE)
+        with open(os.path.join(other, 'templates.script'), 'w',
+                  encoding='utf-8') as file:
+            file.write(TEMPLATE.replace("'T'", "'Other'"))
+
+        # The same text includes another file in another project
+        text = "include('templates.script')\n"
+        parser = PyShowParser(None)
+
+        resources.directory = self.directory
+        self.assertEqual(parser.parse_text(text)[1].args[0], 'T')
+        resources.directory = other
+        self.assertEqual(parser.parse_text(text)[1].args[0], 'Other')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of checking scripts without showing them.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from Tests import TEMPLATE
+from Core import PyShowLint
+from Core.PyShowLint import lint_file, job_count
+from Core.PyShowDiagnostics import ERROR
+
+
+class TestLint(unittest.TestCase):
+    """Reporting the problems of script files."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='pyshow-test-')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def lint(self, text):
+        filename = os.path.join(self.directory, 'deck.script')
+        with open(filename, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+        return lint_file(filename)["diagnostics"]
+
+    def test_clean(self):
+        self.assertEqual(self.lint(TEMPLATE + "beginShow()\n{\n"
+                                   "\tnewSlide('T')\n}\n"), [])
+
+    def test_problems(self):
+        diagnostics = self.lint("beginTemplate('T')\n{\n"
+                                "\tsetBackgroundColor()\n}\n"
+                                "beginShow()\n{\n\tnewSlide('T')\n"
+                                "\tsetTextBox('Title', text='x')\n}\n")
+
+        self.assertEqual([(entry["level"], entry["line"], entry["column"])
+                          for entry in diagnostics],
+                         [(ERROR, 3, 2), (ERROR, 8, 2)])
+
+    def test_parse_error(self):
+        diagnostics = self.lint("beginShow()\n{\n\tnewSlide(\n}\n")
+
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0]["line"], 3)
+
+    def test_unreadable(self):
+        result = lint_file(os.path.join(self.directory, 'missing.script'))
+
+        self.assertEqual(result["diagnostics"][0]["source"], "file")
+
+    def test_internal_error(self):
+        with mock.patch.object(PyShowLint, 'evaluate',
+                               side_effect=RuntimeError("broken")):
+            diagnostics = self.lint(TEMPLATE + "beginShow()\n{\n"
+                                    "\tnewSlide('T')\n}\n")
+
+        self.assertEqual(len(diagnostics), 1)
+        self.assertIn("broken", diagnostics[0]["message"])
+
+    def test_job_count(self):
+        self.assertEqual(job_count("4"), 4)
+        for value in ("0", "-1", "two"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    job_count(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Tests of the index of all frames in a show.
+"""
+
+import unittest
+from unittest import mock
+from Tests import TEMPLATE
+from Core import PyShowTimeline as timeline_module
+from Core.PyShowLanguage import parse_script
+from Core.PyShowTimeline import PyShowTimeline
+
+SHOW = TEMPLATE + """beginShow()
+{
+\tnewSlide('T')
+\tsetTextBox('Title', text='Introduction')
+\tpause()
+\tsetBulletList('Points', text=['a', 'b'])
+\tnewSlide('T')
+\tsetTextBox('Title', text='Results')
+\tnewSlide('T')
+\tsetImage('Picture', source='logo.png')
+}
+"""
+
+
+def timeline(text):
+    """Return a timeline of a script."""
+    result = PyShowTimeline()
+    result.update(text, parse_script(text))
+
+    return result
+
+
+class TestTimeline(unittest.TestCase):
+    """Listing, finding and searching the frames of a show."""
+
+    def test_entries(self):
+        entries = list(timeline(SHOW))
+
+        self.assertEqual([entry.number for entry in entries], [1, 2, 3, 4])
+        self.assertEqual([entry.title for entry in entries],
+                         ["Introduction", "Introduction", "Results",
+                          "Frame 4"])
+
+        # A frame ends at a pause, or right before the next newSlide
+        self.assertEqual(entries[0].loc, SHOW.index("pause()"))
+        self.assertEqual(entries[1].loc, SHOW.index("setBulletList"))
+
+    def test_entry_and_index(self):
+        frames = timeline(SHOW)
+
+        self.assertEqual(frames.entry(3).title, "Results")
+        self.assertIsNone(frames.entry(0))
+        self.assertIsNone(frames.entry(5))
+
+        # A cursor between frames belongs to the next one, and one after
+        # the last frame to the last
+        block = frames.entry(1).cursor[0]
+        self.assertEqual(frames.index((block, 0)), 0)
+        self.assertEqual(frames.index((block, 3)), 1)
+        self.assertEqual(frames.index((block, 4)), 2)
+        self.assertEqual(frames.index((block, 100)), 3)
+
+    def test_search(self):
+        frames = timeline(SHOW)
+
+        self.assertEqual([entry.number for entry in frames.search("intro")],
+                         [1, 2])
+        self.assertEqual([entry.number for entry in frames.search("introx")],
+                         [])
+        self.assertEqual([entry.number for entry in frames.search("RES")],
+                         [3])
+
+    def test_only_changed_slides(self):
+        frames = timeline(SHOW)
+        changed = SHOW.replace("'Results'", "'Conclusions'")
+
+        # Only the frame of the changed slide is evaluated again
+        evaluate = timeline_module.evaluate
+        with mock.patch.object(timeline_module, 'evaluate',
+                               side_effect=evaluate) as counted:
+            frames.update(changed, parse_script(changed))
+
+        self.assertEqual(counted.call_count, 1)
+        self.assertEqual(frames.entry(3).title, "Conclusions")
+
+        # A changed template changes all of its slides
+        changed = changed.replace("text='Title'", "text='Other'")
+        with mock.patch.object(timeline_module, 'evaluate',
+                               side_effect=evaluate) as counted:
+            frames.update(changed, parse_script(changed))
+
+        self.assertEqual(counted.call_count, 4)
+        self.assertEqual(frames.entry(3).title, "Conclusions")
+
+    def test_restore(self):
+        stored = [[entry.number, list(entry.cursor), entry.loc, entry.title]
+                  for entry in timeline(SHOW)]
+
+        restored = PyShowTimeline()
+        restored.restore(stored)
+
+        self.assertEqual(list(restored), list(timeline(SHOW)))
+        self.assertEqual(restored.index(restored.entry(2).cursor), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
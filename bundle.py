@@ -0,0 +1,65 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Build a standalone bundle of a PyShow project, to present with player.py.
+
+The bundle contains the compiled show and its images, and with --frames
+also every frame rendered in advance at the given scale of the slide size:
+
+    python bundle.py [--frames SCALE] [--output FILE] project
+"""
+
+import argparse
+import os
+import sys
+from PyQt6.QtGui import QGuiApplication
+from Core.PyShowLint import run_script
+from Core.PyShowBundle import build_bundle
+
+
+def arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(prog='PyShow bundle',
+                                     description='Build a standalone bundle '
+                                                 'of a PyShow project.')
+    parser.add_argument('project',
+                        help='project (*.psp) or script file to bundle')
+    parser.add_argument('--output', default=None,
+                        help='bundle file to write (default: the project '
+                             'name with .psb)')
+    parser.add_argument('--frames', type=float, default=None, metavar='SCALE',
+                        help='also store every frame, rendered at this scale '
+                             'of the slide size (1 is 1920x1080)')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = arguments()
+
+    # Drawing and decoding images needs Qt, but not a window
+    app = QGuiApplication(sys.argv)
+
+    output = args.output or os.path.splitext(args.project)[0] + '.psb'
+
+    def bundle(text, show):
+        build_bundle(output, text, show,
+                     os.path.splitext(os.path.basename(args.project))[0],
+                     args.frames)
+
+    sys.exit(run_script(args.project, bundle))
@@ -0,0 +1,68 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Export a PyShow project as HTML or SVG pages, one page per frame.
+
+The pages are written to a directory, with an index of all frames, one
+style sheet for all text and every image once in an asset directory:
+
+    python export.py [--format html|svg] [--jobs N] [--output DIR] project
+"""
+
+import argparse
+import os
+import sys
+from PyQt6.QtGui import QGuiApplication
+from Core.PyShowLint import run_script, job_count
+from Core.PyShowExport import export_pages, FORMATS
+
+
+def arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(prog='PyShow export',
+                                     description='Export a PyShow project as '
+                                                 'HTML or SVG pages.')
+    parser.add_argument('project',
+                        help='project (*.psp) or script file to export')
+    parser.add_argument('--format', choices=FORMATS, default='html',
+                        help='format of the pages (default: html)')
+    parser.add_argument('--output', default=None,
+                        help='directory to write to (default: the project '
+                             'name with _html or _svg)')
+    parser.add_argument('--jobs', type=job_count, default=None,
+                        help='number of pages written at the same time '
+                             '(default: based on the number of processors)')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = arguments()
+
+    # Laying out text needs Qt, but not a window
+    app = QGuiApplication(sys.argv)
+
+    output = (args.output or
+              os.path.splitext(args.project)[0] + '_' + args.format)
+
+    def export(text, show):
+        export_pages(text, show, output, args.format,
+                     os.path.splitext(os.path.basename(args.project))[0],
+                     args.jobs)
+
+    sys.exit(run_script(args.project, export))
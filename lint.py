@@ -0,0 +1,53 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Check PyShow projects and scripts for problems, without opening a window.
+
+Every file is parsed and every frame of the show is evaluated. The problems
+are written as JSON (or as text with --text), and the exit code is 1 if any
+file contains an error:
+
+    python lint.py [--jobs N] [--text] files...
+"""
+
+import argparse
+import sys
+from Core.PyShowLint import lint_files, job_count, report
+
+
+def arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(prog='PyShow lint',
+                                     description='Check PyShow projects and '
+                                                 'scripts for problems.')
+    parser.add_argument('files', nargs='+',
+                        help='project (*.psp) or script files to check')
+    parser.add_argument('--jobs', type=job_count, default=None,
+                        help='number of files checked at the same time '
+                             '(default: number of processors)')
+    parser.add_argument('--text', action='store_true',
+                        help='write one line per problem instead of JSON')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = arguments()
+    results = lint_files(args.files, args.jobs)
+
+    sys.exit(report(results, as_json=not args.text))
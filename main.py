@@ -22,19 +22,45 @@ When this script is run, it starts a QApplication with the PyShowWindow as
 the main window container.
 """
 
+from Core import PyShowTiming
+import argparse
 import sys
 import ctypes
 import os
 from PyQt6.QtWidgets import QApplication
 from Interface.PyShowWindow import PyShowWindow
 
+
+def arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(prog='PyShow',
+                                     description='A slide show IDE and '
+                                                 'scripting language.')
+    parser.add_argument('project', nargs='?', default='',
+                        help='project file (*.psp) to open')
+    parser.add_argument('--editor', choices=['plain', 'rich'], default='plain',
+                        help='editor backend; plain is fastest for large '
+                             'scripts, rich is the original editor')
+    parser.add_argument('--timing', action='store_true',
+                        help='print a report of the startup time')
+
+    # Qt removes the arguments it knows itself from sys.argv
+    return parser.parse_args(sys.argv[1:])
+
+
 if __name__ == '__main__':
+    # Everything between importing PyShowTiming and here is importing
+    PyShowTiming.mark('imports')
+
     # Main entry point of PyShow
     app = QApplication(sys.argv)
+    args = arguments()
+    PyShowTiming.report_startup = args.timing
+    PyShowTiming.mark('application')
 
     if os.name == 'nt':
         appid = u'pyshow.application'
         ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(appid)
 
-    w = PyShowWindow(sys.argv)
+    w = PyShowWindow(args)
     sys.exit(app.exec())
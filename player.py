@@ -0,0 +1,75 @@
+# PyShow - a slide show IDE and scripting language.
+#
+# Copyright (C) 2017  Raimond Frentrop
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Present a bundle made with bundle.py, full screen.
+
+Only what is needed to show the slides is imported: not the editor, the
+ribbon or the script parser, so the first slide is on the screen quickly:
+
+    python player.py [--start N] [--timing] bundle
+"""
+
+from Core import PyShowTiming
+import argparse
+import sys
+from zipfile import BadZipFile
+from PyQt6.QtWidgets import QApplication
+PyShowTiming.mark('import Qt')
+from Core.PyShowBundle import PyShowBundle
+from Interface.PyShowPresenter import PyShowPresenter
+PyShowTiming.mark('import PyShow')
+
+
+def arguments():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(prog='PyShow player',
+                                     description='Present a PyShow bundle.')
+    parser.add_argument('bundle',
+                        help='bundle file (*.psb) to present')
+    parser.add_argument('--start', type=int, default=1,
+                        help='number of the frame to start at')
+    parser.add_argument('--timing', action='store_true',
+                        help='print a report of the time to the first slide')
+
+    # Qt removes the arguments it knows itself from sys.argv
+    return parser.parse_args(sys.argv[1:])
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    args = arguments()
+    PyShowTiming.report_startup = args.timing
+    PyShowTiming.mark('application')
+
+    try:
+        bundle = PyShowBundle(args.bundle)
+    except (OSError, ValueError, BadZipFile) as error:
+        print("%s: %s" % (args.bundle, error), file=sys.stderr)
+        sys.exit(1)
+    PyShowTiming.mark('open bundle')
+
+    if not len(bundle.timeline):
+        print("%s: nothing to present" % (args.bundle), file=sys.stderr)
+        sys.exit(1)
+
+    presenter = PyShowPresenter(bundle.show, bundle.timeline, args.start - 1,
+                                frames=bundle.frame)
+    presenter.setWindowTitle(bundle.title or 'PyShow')
+    presenter.showFullScreen()
+
+    sys.exit(app.exec())